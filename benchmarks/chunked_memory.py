@@ -0,0 +1,74 @@
+"""
+Measure the peak memory of converting a posterior lazily opened from
+NetCDF chunk by chunk, as the number of draws grows. With
+`by="chunk"` the peak should stay flat, whereas `gather_draws`
+grows with the number of draws.
+
+Peak memory is measured with `tracemalloc`, which tracks the NumPy
+arrays read from disk but not memory allocated by polars itself.
+
+Usage: python benchmarks/chunked_memory.py [n_draws ...]
+"""
+
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+
+from polarbayes import gather_draws, iter_gather_draws
+
+
+def write_posterior(path: Path, n_draws: int, chunk_draws: int = 500) -> None:
+    """
+    Write a posterior with a scalar and a vector variable to NetCDF,
+    chunked along draws.
+    """
+    rng = np.random.default_rng(0)
+    posterior = xr.Dataset(
+        {
+            "mu": (("chain", "draw"), rng.normal(size=(4, n_draws))),
+            "theta": (
+                ("chain", "draw", "group"),
+                rng.normal(size=(4, n_draws, 50)),
+            ),
+        }
+    )
+    encoding = {
+        "mu": {"chunksizes": (1, chunk_draws)},
+        "theta": {"chunksizes": (1, chunk_draws, 50)},
+    }
+    xr.DataTree.from_dict({"posterior": posterior}).to_netcdf(
+        path, encoding={"/posterior": encoding}
+    )
+
+
+def peak_mib(convert) -> float:
+    tracemalloc.start()
+    convert()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+if __name__ == "__main__":
+    draw_counts = [int(x) for x in sys.argv[1:]] or [2000, 8000, 32000]
+    print(f"{'draws':>8} {'by chunk':>10} {'eager':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_draws in draw_counts:
+            path = Path(tmp) / f"posterior_{n_draws}.nc"
+            write_posterior(path, n_draws)
+            with xr.open_datatree(path) as data:
+                chunked = peak_mib(
+                    lambda: sum(
+                        batch.height
+                        for batch in iter_gather_draws(
+                            data, combined=False, by="chunk"
+                        )
+                    )
+                )
+            with xr.open_datatree(path) as data:
+                eager = peak_mib(lambda: gather_draws(data, combined=False))
+            print(f"{n_draws:>8} {chunked:>9.1f}M {eager:>9.1f}M")
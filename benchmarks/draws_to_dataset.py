@@ -0,0 +1,71 @@
+"""
+Compare `draws_to_dataset` with the pandas `to_xarray` round trip
+on the spread and gathered draws of a synthetic posterior.
+
+Usage: python benchmarks/draws_to_dataset.py [n_variables]
+"""
+
+import sys
+import time
+
+from synthetic import synthetic_posterior
+
+from polarbayes import (
+    draws_to_dataset,
+    gather_draws,
+    spread_draws_and_get_index_cols,
+)
+
+
+def best_time(function, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def pandas_spread(draws, index_cols):
+    return draws.to_pandas().set_index(index_cols).to_xarray()
+
+
+def pandas_gathered(draws, index_cols):
+    # one variable at a time, as the index columns that are null
+    # differ between variables
+    return {
+        name: variable.drop_nulls(index_cols)
+        .drop("variable")
+        .to_pandas()
+        .set_index(
+            [col for col in index_cols if variable[col].null_count() == 0]
+        )["value"]
+        .to_xarray()
+        for (name,), variable in draws.partition_by(
+            "variable", as_dict=True
+        ).items()
+    }
+
+
+if __name__ == "__main__":
+    n_variables = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    data = synthetic_posterior(
+        n_variables=n_variables, n_dims=2, dim_size=10, string_coords=True
+    )
+    spread, index_cols = spread_draws_and_get_index_cols(data)
+    gathered = gather_draws(data)
+    timings = {
+        "spread": (
+            best_time(lambda: draws_to_dataset(spread)),
+            best_time(lambda: pandas_spread(spread, index_cols)),
+        ),
+        "gathered": (
+            best_time(lambda: draws_to_dataset(gathered)),
+            best_time(lambda: pandas_gathered(gathered, index_cols)),
+        ),
+    }
+    for case, (native, pandas) in timings.items():
+        print(
+            f"{case:>8}: native {native:.3f}s, pandas {pandas:.3f}s, "
+            f"speedup {pandas / native:.1f}x"
+        )
@@ -0,0 +1,60 @@
+"""
+Compare the native and pandas engines of `gather_draws` on a
+synthetic posterior with many variables.
+
+Usage: python benchmarks/gather_engines.py [n_variables]
+"""
+
+import sys
+import time
+
+import numpy as np
+import xarray as xr
+
+from polarbayes import gather_draws
+
+
+def many_variable_posterior(
+    n_variables: int, n_chains: int = 4, n_draws: int = 1000
+) -> xr.DataTree:
+    """
+    Build a posterior whose variables alternate between scalars and
+    vectors along one of a few dimensions.
+    """
+    rng = np.random.default_rng(0)
+    dim_sizes = {"region": 50, "age": 8, "week": 20}
+    data_vars = {}
+    for i in range(n_variables):
+        dim = [None, *dim_sizes][i % (len(dim_sizes) + 1)]
+        dims = ("chain", "draw") + (() if dim is None else (dim,))
+        shape = (n_chains, n_draws) + (
+            () if dim is None else (dim_sizes[dim],)
+        )
+        data_vars[f"var_{i}"] = (dims, rng.normal(size=shape))
+    coords = {
+        "region": [f"region_{i}" for i in range(dim_sizes["region"])],
+        "age": np.arange(dim_sizes["age"]),
+    }
+    return xr.DataTree.from_dict(
+        {"posterior": xr.Dataset(data_vars, coords=coords)}
+    )
+
+
+def time_engine(data: xr.DataTree, engine: str, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        gather_draws(data, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    n_variables = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    data = many_variable_posterior(n_variables)
+    timings = {
+        engine: time_engine(data, engine) for engine in ("native", "pandas")
+    }
+    for engine, seconds in timings.items():
+        print(f"{engine:>8}: {seconds:.3f}s")
+    print(f" speedup: {timings['pandas'] / timings['native']:.1f}x")
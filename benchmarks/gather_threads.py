@@ -0,0 +1,36 @@
+"""
+Measure how `gather_draws` scales with the number of threads used
+to convert variables, on a synthetic posterior with many variables.
+
+Usage: python benchmarks/gather_threads.py [n_variables] [n_draws]
+"""
+
+import os
+import sys
+import time
+
+from gather_engines import many_variable_posterior
+
+from polarbayes import gather_draws
+
+
+def time_threads(data, n_jobs: int, repeats: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        gather_draws(data, n_jobs=n_jobs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    n_variables = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_draws = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    data = many_variable_posterior(n_variables, n_draws=n_draws)
+    n_cpus = os.cpu_count() or 1
+    thread_counts = [n for n in (1, 2, 4, 8, 16, 32) if n <= n_cpus]
+    serial = time_threads(data, 1)
+    print(f"{n_cpus} CPUs")
+    for n_jobs in thread_counts:
+        seconds = serial if n_jobs == 1 else time_threads(data, n_jobs)
+        print(f"{n_jobs:>3} threads: {seconds:.3f}s ({serial / seconds:.1f}x)")
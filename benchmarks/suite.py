@@ -0,0 +1,150 @@
+"""
+Benchmark suite for the conversion functions of polarbayes.
+
+Times `spread_draws`, `gather_draws` and `gather_variables` on
+synthetic posteriors of varying shape, and records wall time and peak
+memory for each as JSON. Runs entirely offline.
+
+Peak memory is measured with `tracemalloc`, which tracks allocations
+made through Python and NumPy but not those made by polars itself,
+so it is best read as a relative measure between runs.
+
+Usage:
+    python benchmarks/suite.py [--quick] [--output results.json]
+    python benchmarks/suite.py --compare baseline.json [--tolerance 1.25]
+
+With `--compare`, exit with a non-zero status if any benchmark is
+slower than in the baseline results by more than the tolerance factor.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from importlib.metadata import version
+
+from synthetic import synthetic_posterior
+
+from polarbayes import gather_draws, gather_variables, spread_draws
+
+# shapes to benchmark, as arguments to synthetic_posterior()
+CASES = {
+    "scalars": dict(n_variables=50, n_dims=0),
+    "vectors": dict(n_variables=20, n_dims=1, dim_size=50),
+    "matrices": dict(n_variables=10, n_dims=2, dim_size=20),
+    "string_coords": dict(
+        n_variables=20, n_dims=2, dim_size=20, string_coords=True
+    ),
+    "many_draws": dict(n_variables=5, n_dims=1, dim_size=10, n_draws=20000),
+    "many_chains": dict(n_variables=10, n_dims=1, n_chains=64, n_draws=250),
+}
+
+QUICK_CASES = {
+    "scalars": dict(n_variables=5, n_dims=0, n_draws=100),
+    "string_coords": dict(
+        n_variables=4, n_dims=2, dim_size=3, n_draws=100, string_coords=True
+    ),
+}
+
+
+def measure(function, repeats: int) -> dict:
+    """
+    Call a function `repeats` times, and report the best wall time,
+    the peak traced memory of a separate call and the number of rows
+    of its output.
+    """
+    seconds = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        seconds = min(seconds, time.perf_counter() - start)
+    del result
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dict(seconds=seconds, peak_bytes=peak, rows=result.height)
+
+
+def run(cases: dict[str, dict], repeats: int) -> list[dict]:
+    results = []
+    for case, params in cases.items():
+        data = synthetic_posterior(**params)
+        spread = spread_draws(data)
+        functions = {
+            "spread_draws": lambda: spread_draws(data),
+            "gather_draws": lambda: gather_draws(data),
+            "gather_variables": lambda: gather_variables(spread),
+        }
+        for name, function in functions.items():
+            record = dict(case=case, function=name, params=params)
+            record |= measure(function, repeats)
+            results.append(record)
+            print(
+                f"{case:>14} {name:>16}: {record['seconds']:.4f}s "
+                f"{record['peak_bytes'] / 2**20:8.1f} MiB",
+                file=sys.stderr,
+            )
+    return results
+
+
+def environment() -> dict:
+    return dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        **{
+            package: version(package)
+            for package in ("polarbayes", "polars", "xarray", "arviz-base")
+        },
+    )
+
+
+def regressions(
+    results: list[dict], baseline: list[dict], tolerance: float
+) -> list[str]:
+    """
+    Describe the benchmarks that are slower than in the baseline
+    by more than a factor of `tolerance`.
+    """
+    baseline_seconds = {
+        (x["case"], x["function"]): x["seconds"] for x in baseline
+    }
+    slower = []
+    for x in results:
+        before = baseline_seconds.get((x["case"], x["function"]))
+        if before is not None and x["seconds"] > tolerance * before:
+            slower.append(
+                f"{x['case']}/{x['function']}: "
+                f"{before:.4f}s -> {x['seconds']:.4f}s"
+            )
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="file to write results to")
+    parser.add_argument("--compare", help="baseline results to compare to")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = run(QUICK_CASES if args.quick else CASES, args.repeats)
+    report = json.dumps(
+        dict(environment=environment(), results=results), indent=2
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        slower = regressions(results, baseline, args.tolerance)
+        for line in slower:
+            print(f"regression: {line}", file=sys.stderr)
+        sys.exit(1 if slower else 0)
@@ -0,0 +1,73 @@
+"""
+Synthetic posterior DataTrees of controllable shape for benchmarking.
+"""
+
+import numpy as np
+import xarray as xr
+
+
+def synthetic_posterior(
+    n_chains: int = 4,
+    n_draws: int = 1000,
+    n_variables: int = 10,
+    n_dims: int = 1,
+    dim_size: int = 10,
+    string_coords: bool = False,
+    seed: int = 0,
+) -> xr.DataTree:
+    """
+    Build a DataTree with a single `posterior` group of
+    random normal draws.
+
+    Parameters
+    ----------
+    n_chains
+        Number of chains.
+
+    n_draws
+        Number of draws per chain.
+
+    n_variables
+        Number of variables. Variable `i` is indexed by the
+        first `i % (n_dims + 1)` of the non-sample dimensions, so
+        variables cycle between scalars and arrays of up to
+        `n_dims` dimensions.
+
+    n_dims
+        Number of non-sample dimensions, named `dim_0`, `dim_1`, ...
+
+    dim_size
+        Size of each non-sample dimension.
+
+    string_coords
+        If `True`, label non-sample dimensions with string
+        coordinates (`"dim_0_0"`, `"dim_0_1"`, ...). Otherwise,
+        label them with integer coordinates.
+
+    seed
+        Seed for the random draws.
+
+    Returns
+    -------
+    xr.DataTree
+        The synthetic posterior.
+    """
+    rng = np.random.default_rng(seed)
+    dims = [f"dim_{i}" for i in range(n_dims)]
+    data_vars = {}
+    for i in range(n_variables):
+        var_dims = dims[: i % (n_dims + 1)]
+        data_vars[f"var_{i}"] = (
+            ("chain", "draw", *var_dims),
+            rng.normal(size=(n_chains, n_draws) + (dim_size,) * len(var_dims)),
+        )
+    coords = {
+        dim: [f"{dim}_{j}" for j in range(dim_size)]
+        if string_coords
+        else np.arange(dim_size)
+        for dim in dims
+    }
+    coords |= dict(chain=np.arange(n_chains), draw=np.arange(n_draws))
+    return xr.DataTree.from_dict(
+        {"posterior": xr.Dataset(data_vars, coords=coords)}
+    )
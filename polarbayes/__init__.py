@@ -1,9 +1,129 @@
-from polarbayes.gather import gather_draws, gather_variables
-from polarbayes.spread import spread_draws, spread_draws_and_get_index_cols
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from polarbayes.arrow import ArrowDraws
+    from polarbayes.batch import gather_draws_batch
+    from polarbayes.cache import CacheStats, ConversionCache, DiskCache
+    from polarbayes.dataset import draws_to_dataset, draws_to_datatree
+    from polarbayes.diagnostics import convergence_diagnostics
+    from polarbayes.gather import gather_draws, iter_gather_draws
+    from polarbayes.groups import gather_groups, spread_groups
+    from polarbayes.incremental import IncrementalGather
+    from polarbayes.instrument import StageRecord, record_stages
+    from polarbayes.rvar import gather_rvars
+    from polarbayes.scan import scan_gather_draws, scan_spread_draws
+    from polarbayes.sink import sink_draws
+    from polarbayes.sketch import QuantileSketch
+    from polarbayes.spread import (
+        join_spread_draws,
+        spread_draws,
+        spread_draws_and_get_index_cols,
+        spread_draws_by_dims,
+    )
+    from polarbayes.star import StarDraws, gather_draws_star
+    from polarbayes.subsample import subsample_draws
+    from polarbayes.summary import (
+        mean_hdi,
+        mean_qi,
+        median_hdi,
+        median_qi,
+        point_interval,
+    )
+    from polarbayes.unpivot import gather_variables
+
+# submodule defining each public name. Submodules are only imported
+# when one of their names is first accessed, so that importing
+# polarbayes does not import xarray, arviz, pandas or polars.
+_SUBMODULES = {
+    "spread_draws": "spread",
+    "spread_draws_and_get_index_cols": "spread",
+    "spread_draws_by_dims": "spread",
+    "join_spread_draws": "spread",
+    "gather_variables": "unpivot",
+    "gather_draws": "gather",
+    "iter_gather_draws": "gather",
+    "scan_spread_draws": "scan",
+    "scan_gather_draws": "scan",
+    "sink_draws": "sink",
+    "record_stages": "instrument",
+    "StageRecord": "instrument",
+    "ConversionCache": "cache",
+    "CacheStats": "cache",
+    "DiskCache": "cache",
+    "draws_to_dataset": "dataset",
+    "draws_to_datatree": "dataset",
+    "gather_rvars": "rvar",
+    "point_interval": "summary",
+    "median_qi": "summary",
+    "mean_qi": "summary",
+    "median_hdi": "summary",
+    "mean_hdi": "summary",
+    "QuantileSketch": "sketch",
+    "convergence_diagnostics": "diagnostics",
+    "gather_draws_batch": "batch",
+    "IncrementalGather": "incremental",
+    "spread_groups": "groups",
+    "gather_groups": "groups",
+    "subsample_draws": "subsample",
+    "gather_draws_star": "star",
+    "StarDraws": "star",
+    "ArrowDraws": "arrow",
+}
 
 __all__ = [
     "spread_draws",
     "spread_draws_and_get_index_cols",
+    "spread_draws_by_dims",
+    "join_spread_draws",
     "gather_variables",
     "gather_draws",
+    "iter_gather_draws",
+    "scan_spread_draws",
+    "scan_gather_draws",
+    "sink_draws",
+    "record_stages",
+    "StageRecord",
+    "ConversionCache",
+    "CacheStats",
+    "DiskCache",
+    "draws_to_dataset",
+    "draws_to_datatree",
+    "gather_rvars",
+    "point_interval",
+    "median_qi",
+    "mean_qi",
+    "median_hdi",
+    "mean_hdi",
+    "QuantileSketch",
+    "convergence_diagnostics",
+    "gather_draws_batch",
+    "IncrementalGather",
+    "spread_groups",
+    "gather_groups",
+    "subsample_draws",
+    "gather_draws_star",
+    "StarDraws",
+    "ArrowDraws",
 ]
+
+
+def __getattr__(name: str):
+    if name not in _SUBMODULES:
+        # submodules, e.g. polarbayes.gather, are imported on access
+        try:
+            return importlib.import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as error:
+            if error.name != f"{__name__}.{name}":
+                raise
+        raise AttributeError(f"module 'polarbayes' has no attribute '{name}'")
+    value = getattr(
+        importlib.import_module(f"polarbayes.{_SUBMODULES[name]}"), name
+    )
+    # cache, so that later accesses skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,183 @@
+"""
+Export of converted draws as an Arrow stream, through the Arrow
+PyCapsule interface.
+"""
+
+from typing import Iterable, Iterator
+
+import numpy as np
+import polars as pl
+import xarray as xr
+
+from polarbayes.gather import (
+    _compact_dtypes,
+    _conform_to_schema,
+    _gather_batches,
+    _gather_dataset,
+)
+from polarbayes.schema import VALUE_NAME, VARIABLE_NAME
+from polarbayes.spread import _empty_dataset
+from polarbayes.subsample import _extract
+
+
+class ArrowDraws:
+    """
+    Tidy (gathered) draws of an [`xarray.DataTree`][] group, exposed
+    as an Arrow stream of record batches through the
+    [Arrow PyCapsule interface](https://arrow.apache.org/docs/format/CDataInterface/PyCapsuleInterface.html),
+    so that engines that accept Arrow streams, such as DuckDB,
+    pyarrow or polars itself, can read them without an intermediate
+    DataFrame.
+
+    The group is extracted once, when the object is created. Each
+    call to `__arrow_c_stream__` then converts the extracted arrays
+    to one record batch per variable (or per block of `max_rows`
+    rows), with the same schema as the output of
+    [`gather_draws`][polarbayes.gather.gather_draws], and exports the
+    batches without concatenating them. Where a variable's array is
+    C-contiguous in row order and has the dtype of the value column,
+    the value buffer of its batches is that array itself, not a copy.
+    This is the case for the draws of a DataTree held in memory with
+    `combined=False`; with `combined=True`, it is the array of
+    stacked draws made once by [`arviz.extract`][].
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    num_samples
+        `num_samples` parameter of
+        [`gather_draws`][polarbayes.gather.gather_draws].
+
+    random_seed
+        `random_seed` parameter passed to [`arviz.extract`][].
+
+    value_name
+        Name for the value column. If `None` (default),
+        use `"value"`.
+
+    variable_name
+        Name for the variable column. If `None` (default),
+        use `"variable"`.
+
+    max_rows
+        `max_rows` parameter of
+        [`iter_gather_draws`][polarbayes.gather.iter_gather_draws].
+        Blocks of rows of a variable are slices of its array, so
+        their value buffers are shared in the same way.
+
+    compact
+        `compact` parameter of
+        [`gather_draws`][polarbayes.gather.gather_draws].
+
+    Examples
+    --------
+    ```python
+    draws = pb.ArrowDraws(idata, combined=False)
+    duckdb.sql("SELECT variable, avg(value) FROM draws GROUP BY variable")
+    reader = pyarrow.RecordBatchReader.from_stream(draws)
+    ```
+    """
+
+    def __init__(
+        self,
+        data: xr.DataTree,
+        group: str = "posterior",
+        combined: bool = True,
+        var_names: Iterable[str] | None = None,
+        filter_vars: str | None = None,
+        num_samples: int | None = None,
+        random_seed: int | np.random.Generator | None = None,
+        value_name: str | None = None,
+        variable_name: str | None = None,
+        max_rows: int | None = None,
+        compact: bool = False,
+    ) -> None:
+        self.value_name = VALUE_NAME if value_name is None else value_name
+        self.variable_name = (
+            VARIABLE_NAME if variable_name is None else variable_name
+        )
+        self.max_rows = max_rows
+        self._extracted = _extract(
+            data,
+            group=group,
+            combined=combined,
+            var_names=var_names,
+            filter_vars=filter_vars,
+            num_samples=num_samples,
+            keep_dataset=True,
+            random_seed=random_seed,
+        )
+        self._dtypes = (
+            _compact_dtypes(data[group], self.variable_name) if compact else {}
+        )
+        self.schema = _gather_dataset(
+            _empty_dataset(self._extracted),
+            variable_name=self.variable_name,
+            value_name=self.value_name,
+            dtypes=self._dtypes,
+        ).schema
+
+    def batches(self) -> Iterator[pl.DataFrame]:
+        """
+        Convert the draws to the DataFrames of the record batches of
+        the stream, one at a time.
+
+        Returns
+        -------
+        Iterator[pl.DataFrame]
+            Iterator over the batches, each with the schema of the
+            stream. Concatenating them reproduces the output of
+            [`gather_draws`][polarbayes.gather.gather_draws].
+        """
+        for batch in _gather_batches(
+            self._extracted, by="variable", max_rows=self.max_rows
+        ):
+            yield _conform_to_schema(
+                _gather_dataset(
+                    batch,
+                    variable_name=self.variable_name,
+                    value_name=self.value_name,
+                    dtypes=self._dtypes,
+                    share_values=True,
+                ),
+                self.schema,
+            )
+
+    def __arrow_c_stream__(self, requested_schema: object | None = None):
+        """
+        Export the draws as an Arrow C stream of record batches.
+
+        Parameters
+        ----------
+        requested_schema
+            Schema capsule requested by the consumer, passed on to
+            polars, which exports in its own schema if it cannot
+            honour the request.
+
+        Returns
+        -------
+        object
+            A PyCapsule holding an `ArrowArrayStream`.
+        """
+        # a struct Series exports each of its chunks as one record
+        # batch, whereas a DataFrame would first be rechunked
+        chunks = [batch.to_struct() for batch in self.batches()] or [
+            pl.DataFrame(schema=self.schema).to_struct()
+        ]
+        return pl.concat(chunks, rechunk=False).__arrow_c_stream__(
+            requested_schema
+        )
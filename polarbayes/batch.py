@@ -0,0 +1,248 @@
+"""
+Conversion of many DataTrees at once, in a pool of worker processes.
+"""
+
+import copy
+import multiprocessing
+import os
+from collections.abc import Hashable, Iterable, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Literal
+
+import polars as pl
+import xarray as xr
+
+from polarbayes.gather import _conform_to_schema, gather_draws
+from polarbayes.schema import (
+    VALUE_NAME,
+    VARIABLE_NAME,
+    order_index_column_names,
+)
+from polarbayes.sink import _EXTENSIONS, _partition_path
+
+Source = xr.DataTree | str | os.PathLike
+
+
+def _gather_source(
+    source: Source,
+    ids: dict[str, Hashable],
+    kwargs: dict,
+    path: Path | None,
+    format: str,
+) -> pl.DataFrame | pl.Schema:
+    """
+    Gather the draws of one DataTree, or of the file holding it,
+    with identifier columns first. If `path` is given, write them to
+    the partition of their identifiers and return only their schema.
+    """
+    if isinstance(source, xr.DataTree):
+        draws = gather_draws(source, **kwargs)
+    else:
+        with xr.open_datatree(source) as data:
+            draws = gather_draws(data, **kwargs)
+    draws = draws.select(
+        *(pl.lit(value).alias(name) for name, value in ids.items()),
+        pl.all(),
+    )
+    if path is None:
+        return draws
+    directory = _partition_path(path, list(ids), tuple(ids.values()))
+    directory.mkdir(parents=True, exist_ok=True)
+    getattr(draws, f"write_{format}")(
+        directory / f"part-00000.{_EXTENSIONS[format]}"
+    )
+    return draws.schema
+
+
+def _unify_schemas(
+    schemas: list[pl.Schema],
+    id_names: list[str],
+    variable_name: str,
+    value_name: str,
+) -> pl.Schema:
+    """
+    Get the schema that all gathered draws can be cast to: the union
+    of their columns, cast to their supertypes, with identifier
+    columns first and index columns in the usual order.
+    Enum columns (of `compact` draws) get the union of their
+    categories, in order of first appearance.
+    """
+    categories = {}
+    for schema in schemas:
+        for name, dtype in schema.items():
+            if isinstance(dtype, pl.Enum):
+                categories.setdefault(name, {}).update(
+                    dict.fromkeys(dtype.categories.to_list())
+                )
+    empty = pl.concat(
+        [
+            pl.DataFrame(
+                schema={
+                    name: pl.String if name in categories else dtype
+                    for name, dtype in schema.items()
+                }
+            )
+            for schema in schemas
+        ],
+        how="diagonal_relaxed",
+    ).cast({name: pl.Enum(list(c)) for name, c in categories.items()})
+    index_cols = order_index_column_names(
+        name
+        for name in empty.columns
+        if name not in (*id_names, variable_name, value_name)
+    )
+    return empty.select(
+        *id_names, *index_cols, variable_name, value_name
+    ).schema
+
+
+def gather_draws_batch(
+    sources: Mapping[Hashable, Source] | Iterable[Source],
+    id_names: str | Sequence[str] = "model",
+    n_workers: int = 1,
+    path: str | os.PathLike | None = None,
+    format: Literal["parquet", "ipc"] = "parquet",
+    **kwargs,
+) -> pl.DataFrame | None:
+    """
+    Convert many [`xarray.DataTree`][] objects, e.g. fits of the same
+    model to different datasets, to a single polars DataFrame of
+    tidy (gathered) draws, converting them in parallel worker
+    processes.
+
+    The draws of each DataTree are converted by
+    [`gather_draws`][polarbayes.gather.gather_draws] and tagged with
+    identifier columns. All results are cast to one unified schema:
+    the union of their columns, each cast to its supertype, with
+    null index columns where a DataTree lacks a dimension.
+
+    Parameters
+    ----------
+    sources
+        DataTrees to convert, or paths to files that
+        [`xarray.open_datatree`][] can open, which are then opened
+        by the worker processes themselves rather than sent to them.
+        Either a mapping from identifiers to sources, or an iterable
+        of sources, identified by their position. Identifiers are
+        tuples of values, one per column in `id_names`, or single
+        values if there is only one.
+
+    id_names
+        Name, or sequence of names, of the identifier columns.
+        Default `"model"`.
+
+    n_workers
+        Number of worker processes. `1` (default) converts the
+        sources one at a time in the calling process, and `-1` uses
+        one process per CPU. The output is identical whatever the
+        number of workers.
+
+    path
+        If given, write the draws of each source to a Hive-partitioned
+        directory of files at this path, e.g.
+        `path/model=a/part-00000.parquet`, rather than returning
+        them. The directory must not already contain any files.
+        Files are rewritten as needed so that all of them have
+        the unified schema.
+
+    format
+        File format to write when `path` is given, `"parquet"`
+        (default) or `"ipc"`.
+
+    **kwargs
+        Further arguments to
+        [`gather_draws`][polarbayes.gather.gather_draws], the same
+        for all sources. A `random_seed` generator is copied for
+        each source, so that each source is subsampled from the same
+        generator state whatever the number of workers.
+
+    Returns
+    -------
+    pl.DataFrame | None
+        The gathered draws of all sources, in the order of `sources`,
+        with the identifier columns first; or `None` if `path`
+        is given.
+
+    Raises
+    ------
+    ValueError
+        If there are no sources, an identifier does not have one
+        value per identifier column, or `n_workers` is not a
+        positive integer or `-1`.
+
+    FileExistsError
+        If `path` is a non-empty directory.
+    """
+    if format not in _EXTENSIONS:
+        raise ValueError(
+            f"Unknown format '{format}'. Expected 'parquet' or 'ipc'."
+        )
+    if n_workers == -1:
+        n_workers = os.cpu_count() or 1
+    if n_workers < 1:
+        raise ValueError(
+            f"n_workers must be a positive integer or -1, not {n_workers}."
+        )
+    id_names = [id_names] if isinstance(id_names, str) else list(id_names)
+    if not isinstance(sources, Mapping):
+        sources = dict(enumerate(sources))
+    if not sources:
+        raise ValueError("No sources to convert.")
+    ids = []
+    for key in sources:
+        values = key if isinstance(key, tuple) else (key,)
+        if len(values) != len(id_names):
+            raise ValueError(
+                f"Identifier {key!r} does not have one value for "
+                f"each of the identifier columns {id_names}."
+            )
+        ids.append(dict(zip(id_names, values)))
+    if path is not None:
+        path = Path(path)
+        if path.is_dir() and any(path.iterdir()):
+            raise FileExistsError(
+                f"Cannot write draws to non-empty directory '{path}'."
+            )
+
+    arguments = [
+        (source, source_ids, copy.deepcopy(kwargs), path, format)
+        for source, source_ids in zip(sources.values(), ids)
+    ]
+    if n_workers == 1:
+        results = [_gather_source(*args) for args in arguments]
+    else:
+        # spawn rather than fork, which is unsafe with the thread
+        # pool of polars in the parent process
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            results = list(executor.map(_gather_source, *zip(*arguments)))
+
+    schemas = [r if path is not None else r.schema for r in results]
+    schema = _unify_schemas(
+        schemas,
+        id_names,
+        kwargs.get("variable_name") or VARIABLE_NAME,
+        kwargs.get("value_name") or VALUE_NAME,
+    )
+    if path is None:
+        return pl.concat(
+            [_conform_to_schema(draws, schema) for draws in results]
+        )
+    for source_ids, source_schema in zip(ids, schemas):
+        if source_schema != schema:
+            directory = _partition_path(
+                path, id_names, tuple(source_ids.values())
+            )
+            file = directory / f"part-00000.{_EXTENSIONS[format]}"
+            draws = getattr(pl, f"read_{format}")(file)
+            # write next to the file and move into place, as the file
+            # being read may be memory-mapped
+            temporary = file.with_name(f".{file.name}")
+            getattr(_conform_to_schema(draws, schema), f"write_{format}")(
+                temporary
+            )
+            os.replace(temporary, file)
+    return None
@@ -0,0 +1,429 @@
+"""
+In-memory and on-disk caching of converted draws.
+"""
+
+import hashlib
+import inspect
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Hashable, Literal
+
+import numpy as np
+import polars as pl
+import xarray as xr
+
+from polarbayes.gather import gather_draws
+from polarbayes.spread import spread_draws
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """
+    Usage statistics of a
+    [`ConversionCache`][polarbayes.cache.ConversionCache].
+
+    Attributes
+    ----------
+    hits
+        Number of calls answered from the cache.
+
+    misses
+        Number of calls that converted the data, including
+        calls that could not be cached.
+
+    evictions
+        Number of frames evicted to stay within the memory budget.
+
+    entries
+        Number of frames currently held.
+
+    bytes
+        Estimated size in bytes of the frames currently held.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+
+
+def _fingerprint_group(group: xr.Dataset) -> str:
+    """
+    Hash the content of a DataTree group: the names, dimensions,
+    dtypes and values of all its variables and coordinates.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(group.variables, key=str):
+        variable = group.variables[name]
+        values = variable.values
+        digest.update(
+            repr(
+                (name, variable.dims, values.shape, str(values.dtype))
+            ).encode()
+        )
+        if values.dtype.hasobject:
+            digest.update("\0".join(map(str, values.ravel())).encode())
+        else:
+            digest.update(np.ascontiguousarray(values).data)
+    return digest.hexdigest()
+
+
+def _cacheable_arguments(
+    function: Callable, data: Any, kwargs: dict
+) -> dict[str, Any] | None:
+    """
+    Bind the arguments of a call to a conversion function, with
+    defaults applied, other than the data. Return `None` if the
+    conversion is not deterministic, and so cannot be cached.
+    """
+    arguments = inspect.signature(function).bind(data, **kwargs)
+    arguments.apply_defaults()
+    args = dict(arguments.arguments)
+    del args["data"]
+    seed = args.get("random_seed")
+    if args.get("num_samples") is not None and not isinstance(seed, int):
+        return None
+    if args.get("var_names") is not None and not isinstance(
+        args["var_names"], str
+    ):
+        args["var_names"] = tuple(args["var_names"])
+    return args
+
+
+class ConversionCache:
+    """
+    Cache of converted draws, keyed on the converted data and the
+    arguments of the conversion, with least-recently-used eviction
+    under a memory budget.
+
+    Cache hits return the cached DataFrame itself rather than a copy.
+    polars DataFrames are immutable, so this is safe unless the
+    cached frame is modified in place (e.g. with `df[col] = ...`).
+
+    Conversions that are not deterministic, i.e. those that
+    subsample draws (`num_samples`) without an integer `random_seed`,
+    are never cached.
+
+    Parameters
+    ----------
+    max_bytes
+        Memory budget, as the total estimated size in bytes of the
+        cached frames. Frames larger than the budget are not cached.
+
+    fingerprint
+        How to identify the data being converted. `"content"`
+        (default) hashes the values of the converted group, so
+        a modified or reloaded DataTree is recognized correctly,
+        at the cost of reading the group on every call.
+        `"identity"` uses the identity of the DataTree object,
+        which is instantaneous but does not detect in-place
+        modification of the DataTree.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 2**30,
+        fingerprint: Literal["content", "identity"] = "content",
+    ) -> None:
+        if fingerprint not in ("content", "identity"):
+            raise ValueError(
+                f"Unknown fingerprint '{fingerprint}'. "
+                "Expected 'content' or 'identity'."
+            )
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint
+        # frames and their sizes, least recently used first
+        self._frames: OrderedDict[Hashable, tuple[pl.DataFrame, int]] = (
+            OrderedDict()
+        )
+        self._finalizers: dict[int, weakref.finalize] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Current usage statistics of the cache.
+        """
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._frames),
+                bytes=self._bytes,
+            )
+
+    def clear(self) -> None:
+        """
+        Remove all cached frames. Statistics are kept.
+        """
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+    def spread_draws(self, data: xr.DataTree, **kwargs) -> pl.DataFrame:
+        """
+        Cached [`spread_draws`][polarbayes.spread.spread_draws].
+
+        Parameters
+        ----------
+        data
+            Data to convert.
+
+        **kwargs
+            Further arguments passed to
+            [`spread_draws`][polarbayes.spread.spread_draws].
+
+        Returns
+        -------
+        pl.DataFrame
+            The output of [`spread_draws`][polarbayes.spread.spread_draws].
+        """
+        return self._convert(spread_draws, data, kwargs)
+
+    def gather_draws(self, data: xr.DataTree, **kwargs) -> pl.DataFrame:
+        """
+        Cached [`gather_draws`][polarbayes.gather.gather_draws].
+
+        Parameters
+        ----------
+        data
+            Data to convert.
+
+        **kwargs
+            Further arguments passed to
+            [`gather_draws`][polarbayes.gather.gather_draws].
+
+        Returns
+        -------
+        pl.DataFrame
+            The output of [`gather_draws`][polarbayes.gather.gather_draws].
+        """
+        return self._convert(gather_draws, data, kwargs)
+
+    def _data_key(self, data: xr.DataTree, group: str) -> Hashable:
+        if self.fingerprint == "content":
+            return _fingerprint_group(data[group].to_dataset())
+        # drop entries for a DataTree once it is garbage collected,
+        # as its id may then be reused by another object
+        with self._lock:
+            if id(data) not in self._finalizers:
+                self._finalizers[id(data)] = weakref.finalize(
+                    data, self._forget, id(data)
+                )
+        return id(data)
+
+    def _forget(self, data_id: int) -> None:
+        with self._lock:
+            self._finalizers.pop(data_id, None)
+            for key in [k for k in self._frames if k[1] == data_id]:
+                self._bytes -= self._frames.pop(key)[1]
+
+    def _convert(
+        self, function: Callable, data: xr.DataTree, kwargs: dict
+    ) -> pl.DataFrame:
+        args = _cacheable_arguments(function, data, kwargs)
+        if args is None:
+            with self._lock:
+                self._misses += 1
+            return function(data, **kwargs)
+        key = (
+            function.__name__,
+            self._data_key(data, args["group"]),
+            tuple(sorted(args.items())),
+        )
+        with self._lock:
+            if key in self._frames:
+                self._hits += 1
+                self._frames.move_to_end(key)
+                return self._frames[key][0]
+            self._misses += 1
+        # convert outside the lock, so that other threads can
+        # still be answered from the cache in the meantime
+        result = function(data, **kwargs)
+        self._store(key, result)
+        return result
+
+    def _store(self, key: Hashable, frame: pl.DataFrame) -> None:
+        size = frame.estimated_size()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._frames:
+                return
+            self._frames[key] = (frame, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._frames.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+
+def _fingerprint_file(path: Path) -> str:
+    """
+    Hash the content of a file.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while block := f.read(2**20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Persistent cache of draws converted from files, stored as
+    uncompressed Arrow IPC files in a cache directory.
+
+    Cached draws are read back with memory mapping, so loading them
+    is near-instant and does not copy the data into memory until it
+    is used. Each cached file records the state of its source file,
+    so a modified source file is converted again rather than served
+    from a stale cache.
+
+    Conversions that are not deterministic, i.e. those that
+    subsample draws (`num_samples`) without an integer `random_seed`,
+    are never cached.
+
+    Parameters
+    ----------
+    directory
+        Directory in which to store the cached draws. Created if it
+        does not exist.
+
+    validate
+        How to detect changes to the source files. `"mtime"`
+        (default) compares their size and modification time, which
+        is instantaneous. `"content"` compares a hash of their
+        content, which reads the whole source file on every call,
+        but also recognizes an identical file that was rewritten
+        or copied.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        validate: Literal["mtime", "content"] = "mtime",
+    ) -> None:
+        if validate not in ("mtime", "content"):
+            raise ValueError(
+                f"Unknown validation '{validate}'. "
+                "Expected 'mtime' or 'content'."
+            )
+        self.directory = Path(directory)
+        self.validate = validate
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def spread_draws(
+        self, source: str | os.PathLike, **kwargs
+    ) -> pl.DataFrame:
+        """
+        Cached [`spread_draws`][polarbayes.spread.spread_draws]
+        of the DataTree stored in a file.
+
+        Parameters
+        ----------
+        source
+            Path to a file that [`xarray.open_datatree`][] can open,
+            e.g. a NetCDF file.
+
+        **kwargs
+            Further arguments passed to
+            [`spread_draws`][polarbayes.spread.spread_draws].
+
+        Returns
+        -------
+        pl.DataFrame
+            The output of
+            [`spread_draws`][polarbayes.spread.spread_draws].
+        """
+        return self._convert(spread_draws, source, kwargs)
+
+    def gather_draws(
+        self, source: str | os.PathLike, **kwargs
+    ) -> pl.DataFrame:
+        """
+        Cached [`gather_draws`][polarbayes.gather.gather_draws]
+        of the DataTree stored in a file.
+
+        Parameters
+        ----------
+        source
+            Path to a file that [`xarray.open_datatree`][] can open,
+            e.g. a NetCDF file.
+
+        **kwargs
+            Further arguments passed to
+            [`gather_draws`][polarbayes.gather.gather_draws].
+
+        Returns
+        -------
+        pl.DataFrame
+            The output of
+            [`gather_draws`][polarbayes.gather.gather_draws].
+        """
+        return self._convert(gather_draws, source, kwargs)
+
+    def clear(self) -> None:
+        """
+        Remove all cached draws from the cache directory.
+        """
+        for path in self.directory.glob("*.arrow"):
+            path.unlink(missing_ok=True)
+
+    def _source_state(self, source: Path) -> str:
+        if self.validate == "content":
+            return _fingerprint_file(source)
+        stat = source.stat()
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _convert(
+        self, function: Callable, source: str | os.PathLike, kwargs: dict
+    ) -> pl.DataFrame:
+        source = Path(source).resolve()
+        args = _cacheable_arguments(function, source, kwargs)
+        if args is None:
+            with xr.open_datatree(source) as data:
+                return function(data, **kwargs)
+        # one entry per source and arguments, whose file name also
+        # records the state of the source it was converted from
+        entry = hashlib.blake2b(
+            repr(
+                (function.__name__, str(source), sorted(args.items()))
+            ).encode(),
+            digest_size=16,
+        ).hexdigest()
+        state = hashlib.blake2b(
+            self._source_state(source).encode(), digest_size=8
+        ).hexdigest()
+        path = self.directory / f"{entry}-{state}.arrow"
+        if path.exists():
+            return pl.read_ipc(path)
+
+        with xr.open_datatree(source) as data:
+            result = function(data, **kwargs)
+        # write to a temporary file first, so that concurrent readers
+        # never see a partially written file
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                result.write_ipc(f, compression="uncompressed")
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        # remove entries converted from earlier states of the source
+        for stale in self.directory.glob(f"{entry}-*.arrow"):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        return pl.read_ipc(path)
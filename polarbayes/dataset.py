@@ -0,0 +1,274 @@
+"""
+Conversion of polars frames of draws back to xarray.
+"""
+
+from collections.abc import Iterator, Sequence
+
+import numpy as np
+import polars as pl
+import xarray as xr
+from polars._typing import ColumnNameOrSelector
+
+from polarbayes.instrument import _record_stage
+from polarbayes.schema import (
+    VALUE_NAME,
+    VARIABLE_NAME,
+    order_index_column_names,
+)
+from polarbayes.unpivot import _default_index
+
+
+def _coordinate(column: pl.Series) -> pl.Series:
+    """
+    Get the coordinate values of an index column: its distinct
+    non-null values, sorted if numeric and in order of first
+    appearance otherwise.
+    """
+    values = column.drop_nulls()
+    if values.dtype.is_numeric():
+        return values.unique().sort()
+    return values.unique(maintain_order=True)
+
+
+def _codes(column: pl.Series, coordinate: pl.Series) -> pl.Series:
+    """
+    Get the position of each value of an index column
+    in its coordinate values. Null values stay null.
+    """
+    if coordinate.dtype.is_numeric():
+        # coordinates are sorted, so binary search them
+        return coordinate.search_sorted(column).set(column.is_null(), None)
+    if coordinate.dtype in (pl.String, pl.Categorical, pl.Enum):
+        return column.cast(pl.Enum(coordinate.cast(pl.String))).to_physical()
+    # e.g. temporal or boolean values, which cannot be cast to Enum
+    positions = coordinate.rename("value").to_frame().with_row_index("code")
+    return (
+        column.rename("value")
+        .to_frame()
+        .join(positions, on="value", how="left", maintain_order="left")
+        .get_column("code")
+    )
+
+
+def _variables(
+    draws: pl.DataFrame, variable_name: str
+) -> Iterator[tuple[str, pl.DataFrame]]:
+    """
+    Split long format draws by variable, slicing rather than copying
+    when the draws of each variable are contiguous, as they are in
+    [`gather_draws`][polarbayes.gather.gather_draws] output.
+    """
+    runs = draws[variable_name].rle().struct.unnest()
+    if runs["value"].is_unique().all():
+        offsets = runs["len"].cum_sum() - runs["len"]
+        for name, length, offset in zip(*runs["value", "len"], offsets):
+            yield name, draws.slice(offset, length)
+    else:
+        for (name,), variable in draws.partition_by(
+            variable_name, maintain_order=True, as_dict=True
+        ).items():
+            yield name, variable
+
+
+def _scatter(
+    positions: np.ndarray, values: pl.Series, shape: tuple[int, ...]
+) -> np.ndarray:
+    """
+    Scatter values into a preallocated dense array at flat positions.
+    Cells without a value are NaN, for which integer and boolean
+    values are cast to float.
+    """
+    values = values.to_numpy()
+    size = int(np.prod(shape))
+    filled = np.zeros(size, dtype=bool)
+    filled[positions] = True
+    n_filled = np.count_nonzero(filled)
+    if n_filled < len(positions):
+        raise ValueError(
+            f"Found {len(positions)} draws for {n_filled} distinct cells. "
+            "The index columns must uniquely identify each draw."
+        )
+    if n_filled == size:
+        array = np.empty(size, dtype=values.dtype)
+    else:
+        dtype = np.result_type(values.dtype, np.float16)
+        array = np.full(size, np.nan, dtype=dtype)
+    array[positions] = values
+    return array.reshape(shape)
+
+
+def _draws_to_dataset(
+    draws: pl.DataFrame,
+    index: ColumnNameOrSelector | Sequence[ColumnNameOrSelector] | None,
+    variable_name: str,
+    value_name: str,
+) -> xr.Dataset:
+    long = variable_name in draws.columns
+    if index is None:
+        index = _default_index(long, variable_name, value_name)
+    dims = order_index_column_names(draws.select(index).columns)
+    coords = {dim: _coordinate(draws[dim]) for dim in dims}
+    # position of each draw along each dimension
+    codes = pl.DataFrame(
+        [_codes(draws[dim], coords[dim]).alias(dim) for dim in dims]
+    )
+
+    data_vars = {}
+    if long:
+        codes = codes.with_columns(
+            draws[variable_name].alias(variable_name),
+            draws[value_name].alias(value_name),
+        )
+        for name, variable in _variables(codes, variable_name):
+            # dimensions along which the variable is indexed,
+            # with the others null as in gather_draws() output
+            var_dims = [dim for dim in dims if variable[dim].null_count() == 0]
+            shape = tuple(len(coords[dim]) for dim in var_dims)
+            positions = np.ravel_multi_index(
+                [variable[dim].to_numpy() for dim in var_dims], shape
+            )
+            data_vars[name] = (
+                var_dims,
+                _scatter(positions, variable[value_name], shape),
+            )
+    else:
+        shape = tuple(len(coords[dim]) for dim in dims)
+        positions = np.ravel_multi_index(
+            [codes[dim].to_numpy() for dim in dims], shape
+        )
+        for name in draws.columns:
+            if name not in dims:
+                data_vars[name] = (
+                    dims,
+                    _scatter(positions, draws[name], shape),
+                )
+    return xr.Dataset(
+        data_vars,
+        coords={dim: values.to_numpy() for dim, values in coords.items()},
+    )
+
+
+def draws_to_dataset(
+    draws: pl.DataFrame | pl.LazyFrame,
+    index: ColumnNameOrSelector | Sequence[ColumnNameOrSelector] | None = None,
+    variable_name: str | None = None,
+    value_name: str | None = None,
+) -> xr.Dataset:
+    """
+    Convert a data frame of tidy draws back to an [`xarray.Dataset`][],
+    with one dimension per index column.
+
+    Accepts both the wide (spread) format of
+    [`spread_draws`][polarbayes.spread.spread_draws] and the long
+    (gathered) format of [`gather_draws`][polarbayes.gather.gather_draws],
+    including frames derived from them, e.g. with additional computed
+    variables. The draws are scattered directly into dense NumPy
+    arrays, without going through pandas.
+
+    Parameters
+    ----------
+    draws
+        Data frame of draws to convert. Treated as long format if it
+        has a column named `variable_name`, and as wide format
+        otherwise.
+
+    index
+        Columns indexing the draws, which become the dimensions of
+        the output. Dimensions are ordered as by
+        [`order_index_column_names`][polarbayes.schema.order_index_column_names].
+        If `None` (default), use all columns other than the variable
+        and value columns for long format, and the `"chain"` and
+        `"draw"` columns and any string, categorical or enum columns
+        for wide format. Integer index columns of wide frames other
+        than `"chain"` and `"draw"` must be given explicitly.
+
+    variable_name
+        Name of the variable column of long format frames.
+        If `None` (default), use `"variable"`.
+
+    value_name
+        Name of the value column of long format frames.
+        If `None` (default), use `"value"`.
+
+    Returns
+    -------
+    xr.Dataset
+        Dataset with one data variable per variable of `draws`.
+        Coordinates are the distinct values of each index column,
+        sorted for numeric columns and in order of first appearance
+        otherwise. In long format, each variable only has the
+        dimensions whose index column is not null for it; in wide
+        format, every variable has all dimensions. Cells without a
+        draw are NaN.
+
+    Raises
+    ------
+    ValueError
+        If there are more draws for a variable than cells in its
+        array, i.e. the index columns do not identify each draw.
+    """
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    if value_name is None:
+        value_name = VALUE_NAME
+    if isinstance(draws, pl.LazyFrame):
+        draws = draws.collect()
+    return _record_stage(
+        "draws_to_dataset",
+        "scatter",
+        _draws_to_dataset,
+        draws,
+        index,
+        variable_name,
+        value_name,
+    )
+
+
+def draws_to_datatree(
+    draws: pl.DataFrame | pl.LazyFrame,
+    group: str = "posterior",
+    index: ColumnNameOrSelector | Sequence[ColumnNameOrSelector] | None = None,
+    variable_name: str | None = None,
+    value_name: str | None = None,
+) -> xr.DataTree:
+    """
+    Convert a data frame of tidy draws back to an [`xarray.DataTree`][]
+    with a single group, e.g. for use with ArviZ.
+
+    Parameters
+    ----------
+    draws
+        Data frame of draws to convert, as for
+        [`draws_to_dataset`][polarbayes.dataset.draws_to_dataset].
+
+    group
+        Name of the group to hold the draws. Default `"posterior"`.
+
+    index
+        Passed to
+        [`draws_to_dataset`][polarbayes.dataset.draws_to_dataset].
+
+    variable_name
+        Passed to
+        [`draws_to_dataset`][polarbayes.dataset.draws_to_dataset].
+
+    value_name
+        Passed to
+        [`draws_to_dataset`][polarbayes.dataset.draws_to_dataset].
+
+    Returns
+    -------
+    xr.DataTree
+        DataTree whose group `group` holds the output of
+        [`draws_to_dataset`][polarbayes.dataset.draws_to_dataset].
+    """
+    return xr.DataTree.from_dict(
+        {
+            group: draws_to_dataset(
+                draws,
+                index=index,
+                variable_name=variable_name,
+                value_name=value_name,
+            )
+        }
+    )
@@ -0,0 +1,285 @@
+"""
+Convergence diagnostics of polars frames of draws, computed for
+all parameter cells at once.
+"""
+
+import functools
+from collections.abc import Sequence
+from statistics import NormalDist
+
+import numpy as np
+import polars as pl
+from polars._typing import ColumnNameOrSelector
+
+from polarbayes.schema import CHAIN_NAME, DRAW_NAME, VALUE_NAME
+
+# largest number of draws converted to arrays at once, to bound the
+# memory used by the autocovariance FFTs of models with many cells
+_MAX_BLOCK_VALUES = 2**21
+
+
+def _split_chains(x: np.ndarray) -> np.ndarray:
+    """
+    Split each chain of an array of shape (cell, chain, draw) into
+    its first and last halves, dropping the middle draw of chains
+    with an odd number of draws.
+    """
+    half = x.shape[2] // 2
+    return np.concatenate([x[:, :, :half], x[:, :, -half:]], axis=1)
+
+
+@functools.cache
+def _normal_scores(size: int) -> np.ndarray:
+    """
+    Normal quantiles of the possible average ranks among `size`
+    draws, which are multiples of 1/2, so that they are looked up
+    rather than computed once per draw.
+    """
+    ranks = np.arange(1, size + 0.5, 0.5)
+    levels = (ranks - 0.375) / (size + 0.25)
+    return np.array([NormalDist().inv_cdf(p) for p in levels])
+
+
+def _z_scale(x: np.ndarray) -> np.ndarray:
+    """
+    Rank-normalize the draws of each cell: replace each draw by the
+    normal quantile of its average rank among the draws of its cell.
+    """
+    n_cells = x.shape[0]
+    size = x[0].size
+    flat = x.reshape(n_cells, size)
+    order = np.argsort(flat, axis=1)
+    values = np.take_along_axis(flat, order, axis=1)
+    # tied draws get the average of the positions of their run
+    positions = np.broadcast_to(np.arange(size), (n_cells, size))
+    starts = np.ones((n_cells, size), dtype=bool)
+    starts[:, 1:] = values[:, 1:] != values[:, :-1]
+    ends = np.ones((n_cells, size), dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=1)
+    last = np.minimum.accumulate(
+        np.where(ends, positions, size)[:, ::-1], axis=1
+    )[:, ::-1]
+    z = np.empty_like(flat, dtype=float)
+    np.put_along_axis(z, order, _normal_scores(size)[first + last], axis=1)
+    return z.reshape(x.shape)
+
+
+def _rhat(x: np.ndarray) -> np.ndarray:
+    """
+    Potential scale reduction of the draws of each cell,
+    for an array of shape (cell, chain, draw).
+    """
+    n_draws = x.shape[2]
+    between = n_draws * x.mean(axis=2).var(axis=1, ddof=1)
+    within = x.var(axis=2, ddof=1).mean(axis=1)
+    return np.sqrt((between / within + n_draws - 1) / n_draws)
+
+
+def _autocovariance(x: np.ndarray) -> np.ndarray:
+    """
+    Autocovariance of each chain of each cell at all lags,
+    computed by FFT along the last axis.
+    """
+    n = x.shape[-1]
+    length = 1 << (2 * n - 1).bit_length()
+    centered = x - x.mean(axis=-1, keepdims=True)
+    transform = np.fft.rfft(centered, n=length, axis=-1)
+    return (
+        np.fft.irfft(transform * np.conjugate(transform), n=length)[..., :n]
+        / n
+    )
+
+
+def _ess(x: np.ndarray) -> np.ndarray:
+    """
+    Effective sample size of the draws of each cell, for an array
+    of shape (cell, chain, draw), using Geyer's initial monotone
+    sequence estimator as in ArviZ, vectorized over cells.
+    """
+    n_cells, n_chains, n_draws = x.shape
+    acov = _autocovariance(x)
+    mean_var = acov[:, :, 0].mean(axis=1) * n_draws / (n_draws - 1)
+    var_plus = mean_var * (n_draws - 1) / n_draws
+    if n_chains > 1:
+        var_plus = var_plus + x.mean(axis=2).var(axis=1, ddof=1)
+    rho = 1 - (mean_var[:, None] - acov.mean(axis=1)) / var_plus[:, None]
+    rho[:, 0] = 1
+
+    # pairs of autocorrelations at lags (2k, 2k + 1), up to the last
+    # pair that ArviZ would consider
+    n_pairs = max((n_draws - 3) // 2, 0) + 1
+    even = rho[:, 0 : 2 * n_pairs : 2]
+    pairs = even + rho[:, 1 : 2 * n_pairs : 2]
+    # initial positive sequence: stop at the first pair (after the
+    # first) whose sum is not positive, or at the last pair
+    stops = np.concatenate(
+        [pairs[:, 1:] <= 0, np.ones((n_cells, 1), dtype=bool)], axis=1
+    )
+    end = np.minimum(stops.argmax(axis=1) + 1, n_pairs - 1)
+    end_even = np.take_along_axis(even, end[:, None], axis=1)[:, 0]
+    end_pair = np.take_along_axis(pairs, end[:, None], axis=1)[:, 0]
+    # initial monotone sequence over the pairs before the end
+    monotone = np.minimum.accumulate(pairs, axis=1)
+    included = np.arange(n_pairs)[None, :] < end[:, None]
+    tau = (
+        -1
+        + 2 * np.where(included, monotone, 0).sum(axis=1)
+        + np.where((end_even > 0) | (end_pair >= 0) | (end == 0), end_even, 0)
+    )
+    size = n_chains * n_draws
+    tau = np.maximum(tau, 1 / np.log10(size))
+    ess = size / tau
+    # constant draws are as good as independent
+    constant = (
+        np.ptp(x.reshape(n_cells, -1), axis=1) < np.finfo(float).resolution
+    )
+    return np.where(constant, size, ess)
+
+
+def _diagnose(x: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Compute all diagnostics of an array of draws of shape
+    (cell, chain, draw).
+    """
+    n_cells = x.shape[0]
+    flat = x.reshape(n_cells, -1)
+    finite = np.isfinite(flat).all(axis=1)
+    x = np.where(finite[:, None, None], x, 0)
+    flat = x.reshape(n_cells, -1)
+    split = _split_chains(x)
+    folded = np.abs(x - np.median(flat, axis=1)[:, None, None])
+    z = _z_scale(split)
+    rhat = np.maximum(_rhat(z), _rhat(_z_scale(_split_chains(folded))))
+    ess_bulk = _ess(z)
+    lower, upper = np.quantile(flat, [0.05, 0.95], axis=1)
+    ess_tail = np.minimum(
+        _ess(_split_chains(x <= lower[:, None, None]).astype(float)),
+        _ess(_split_chains(x <= upper[:, None, None]).astype(float)),
+    )
+    ess_mean = _ess(split)
+    mcse_mean = flat.std(axis=1, ddof=1) / np.sqrt(ess_mean)
+    squares = (x - flat.mean(axis=1)[:, None, None]) ** 2
+    variance = squares.reshape(n_cells, -1).mean(axis=1)
+    variance_of_variance = (
+        (squares**2).reshape(n_cells, -1).mean(axis=1) - variance**2
+    ) / _ess(_split_chains(squares))
+    mcse_sd = np.sqrt(variance_of_variance / variance / 4)
+    diagnostics = dict(
+        rhat=rhat,
+        ess_bulk=ess_bulk,
+        ess_tail=ess_tail,
+        mcse_mean=mcse_mean,
+        mcse_sd=mcse_sd,
+    )
+    return {
+        name: np.where(finite, values, np.nan)
+        for name, values in diagnostics.items()
+    }
+
+
+def convergence_diagnostics(
+    draws: pl.DataFrame | pl.LazyFrame,
+    by: ColumnNameOrSelector | Sequence[ColumnNameOrSelector] | None = None,
+    value_name: str | None = None,
+) -> pl.DataFrame:
+    """
+    Compute convergence diagnostics of each parameter cell of
+    long format draws: rank-normalized split R-hat, bulk and tail
+    effective sample sizes, and Monte Carlo standard errors of the
+    mean and standard deviation, following Vehtari et al. (2021)
+    and matching the corresponding ArviZ functions.
+
+    Draws are sorted and reshaped by polars into one array of shape
+    (cell, chain, draw), and each diagnostic is then computed for all
+    cells at once, without a Python loop over cells.
+
+    Parameters
+    ----------
+    draws
+        Data frame of draws in the long format of
+        [`gather_draws`][polarbayes.gather.gather_draws] called with
+        `combined=False`, with `"chain"` and `"draw"` columns.
+        Every cell must have the same chains and number of draws.
+
+    by
+        Columns identifying each cell. If `None` (default), use all
+        columns other than `"chain"`, `"draw"` and the value column,
+        e.g. the variable column and any index columns.
+
+    value_name
+        Name of the value column. If `None` (default), use `"value"`.
+
+    Returns
+    -------
+    pl.DataFrame
+        One row per cell, in order of first appearance, with the
+        `by` columns followed by `rhat`, `ess_bulk`, `ess_tail`,
+        `mcse_mean` and `mcse_sd` columns. Diagnostics of cells with
+        missing or non-finite draws are NaN.
+
+    Raises
+    ------
+    ValueError
+        If cells have different numbers of chains or draws, or
+        fewer than 4 draws per chain.
+    """
+    if value_name is None:
+        value_name = VALUE_NAME
+    if isinstance(draws, pl.LazyFrame):
+        draws = draws.collect()
+    if by is None:
+        by = [
+            name
+            for name in draws.columns
+            if name not in (CHAIN_NAME, DRAW_NAME, value_name)
+        ]
+    else:
+        by = draws.select(by).columns
+
+    cell = "_".join(["cell", *draws.columns])
+    # dense cell ids in sorted key order, so that sorting by id,
+    # chain and draw lays the draws out as (cell, chain, draw)
+    draws = draws.with_columns(
+        (pl.struct(by).rank("dense") - 1 if by else pl.lit(0)).alias(cell)
+    )
+    lengths = draws.group_by(cell, CHAIN_NAME).len()
+    n_chains = lengths.group_by(cell).len()["len"].unique()
+    n_draws = lengths["len"].unique()
+    if len(n_chains) != 1 or len(n_draws) != 1:
+        raise ValueError(
+            "All cells must have draws for the same number of chains "
+            "and the same number of draws per chain."
+        )
+    n_chains, n_draws = n_chains[0], n_draws[0]
+    if n_draws < 4:
+        raise ValueError(
+            f"Diagnostics need at least 4 draws per chain, not {n_draws}."
+        )
+    values = (
+        draws.sort(cell, CHAIN_NAME, DRAW_NAME)[value_name]
+        .cast(pl.Float64)
+        .to_numpy()
+        .reshape(-1, n_chains, n_draws)
+    )
+
+    block = max(_MAX_BLOCK_VALUES // (n_chains * n_draws), 1)
+    # constant cells have no within-chain variance, and so a NaN R-hat
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results = [
+            _diagnose(values[start : start + block])
+            for start in range(0, len(values), block)
+        ]
+    keys = draws.group_by(cell, maintain_order=True).agg(pl.col(by).first())
+    order = keys[cell].to_numpy()
+    return pl.DataFrame(
+        [
+            *keys.select(by),
+            *(
+                pl.Series(
+                    name, np.concatenate([r[name] for r in results])[order]
+                )
+                for name in results[0]
+            ),
+        ]
+    )
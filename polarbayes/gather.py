@@ -1,13 +1,16 @@
-from collections.abc import Sequence
-from typing import Iterable
+import contextvars
+import itertools
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Literal
 
-import arviz_base as az
 import numpy as np
+import pandas as pd
 import polars as pl
-import polars.selectors as cs
 import xarray as xr
-from polars._typing import ColumnNameOrSelector
 
+from polarbayes.instrument import _record_stage
 from polarbayes.schema import (
     CHAIN_NAME,
     DRAW_NAME,
@@ -15,113 +18,418 @@ from polarbayes.schema import (
     VARIABLE_NAME,
     order_index_column_names,
 )
-from polarbayes.spread import spread_draws_and_get_index_cols
+from polarbayes.spread import (
+    _dim_index_coords,
+    _empty_dataset,
+    _index_positions,
+    spread_draws_and_get_index_cols,
+)
+from polarbayes.subsample import _extract
+from polarbayes.unpivot import (
+    _assert_not_in_index_columns,
+    gather_variables,
+)
+
+# sentinel marking rows whose variable is not indexed by a given column
+_NO_POSITION = np.iinfo(np.uint32).max
+
+
+def _map_in_threads(
+    function: Callable, *iterables: Iterable, n_jobs: int = 1
+) -> list:
+    """
+    Map a function over iterables, as [`map`][], in a pool of
+    `n_jobs` threads (one per CPU if `n_jobs` is `-1`). Results
+    are returned in input order whatever the number of threads.
+    """
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError(
+            f"n_jobs must be a positive integer or -1, not {n_jobs}."
+        )
+    if n_jobs == 1:
+        return list(map(function, *iterables))
+    # run each call in a copy of the caller's context, so that
+    # context variables (e.g. stage recording) carry over to threads
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        return list(
+            executor.map(
+                lambda *args: context.copy().run(function, *args), *iterables
+            )
+        )
 
 
-def _assert_not_in_index_columns(
-    arg_name: str, arg_value: str, index_columns: Iterable[str]
-) -> None:
+def _compact_dtypes(
+    group: xr.Dataset, variable_name: str
+) -> dict[str, pl.DataType]:
     """
-    Assert that a specified value is not present in a set of index columns,
-    with an informative error message.
+    Get compact dtypes for the index and variable columns of
+    the gathered draws of a DataTree group.
+
+    Dtypes are derived from the whole group, rather than from
+    a subset of its variables or draws, so that they are the same
+    for any conversion of that group.
 
     Parameters
     ----------
-    arg_name
-        The name of the argument being validated.
-    arg_value
-        The value of the argument to check against index columns.
-    index_columns
-        Iterable of index column names to check against.
+    group
+        The DataTree group being converted.
+
+    variable_name
+        Name of the variable column.
 
     Returns
     -------
-    None
-       If validation passes.
+    dict[str, pl.DataType]
+        Mapping from column name to dtype. The variable column
+        and the index column of each string-valued dimension are
+        [`polars.Enum`][] whose categories are the variable names
+        and coordinate values of the group, in order. The chain
+        column is `UInt8` (or `UInt16` if there are more chains)
+        and the draw column is `UInt32`, provided their coordinates
+        are non-negative integers that fit.
+    """
+    dtypes = {variable_name: pl.Enum(list(group.data_vars))}
+    for name, candidates in (
+        (CHAIN_NAME, [(pl.UInt8, np.uint8), (pl.UInt16, np.uint16)]),
+        (DRAW_NAME, [(pl.UInt32, np.uint32)]),
+    ):
+        if name not in group.coords:
+            continue
+        values = group[name].values
+        if values.dtype.kind not in "iu" or values.size == 0:
+            continue
+        for dtype, np_dtype in candidates:
+            if 0 <= values.min() and values.max() <= np.iinfo(np_dtype).max:
+                dtypes[name] = dtype
+                break
+    for dim in group.dims:
+        index = group.indexes.get(dim)
+        if (
+            index is not None
+            and not isinstance(index, pd.MultiIndex)
+            and index.inferred_type == "string"
+        ):
+            dtypes[dim] = pl.Enum(list(dict.fromkeys(index)))
+    return dtypes
+
 
-    Raises
-    ------
-    ValueError
-        If `arg_value` is found in `index_columns`.
+def _variable_dims_and_coords(
+    data: xr.Dataset,
+) -> tuple[list[dict[str, int]], dict[str, tuple[str, pl.Series]]]:
     """
-    if arg_value in index_columns:
-        raise ValueError(
-            f"Specified {arg_name}='{arg_value}' for the output data frame "
-            f"but there is an index column named '{arg_value}' "
-            f"in the input data frame. Either specify a different "
-            f" {arg_name} or rename the index column named '{arg_value}'."
-        )
-    return None
+    Get the dimension sizes of each data variable of a Dataset, in
+    the order of `data.data_vars`, and the dimension and coordinate
+    values of each index column of their gathered draws.
+    """
+    var_dims = []
+    coords = {}
+    for var in data.data_vars:
+        # mirror the dimension order of a per-variable extraction
+        # so that rows are ordered as by spread_draws()
+        var_data = data[[var]]
+        var_dims.append({dim: var_data.sizes[dim] for dim in var_data.dims})
+        for dim in var_data.dims:
+            for name, coord in _dim_index_coords(var_data, dim).items():
+                coords.setdefault(name, (dim, coord))
+    return var_dims, coords
 
 
-def gather_variables(
-    data: pl.LazyFrame | pl.DataFrame,
-    index: ColumnNameOrSelector | Sequence[ColumnNameOrSelector] | None = None,
-    value_name: str | None = None,
-    variable_name: str | None = None,
-):
+def _gather_dataset(
+    data: xr.Dataset,
+    variable_name: str,
+    value_name: str,
+    dtypes: dict[str, pl.DataType] | None = None,
+    n_jobs: int = 1,
+    encode: bool = False,
+    share_values: bool = False,
+) -> pl.DataFrame:
     """
-    Gather variable columns into key-value pairs.
-    Light wrapper of [`pl.DataFrame.unpivot`][polars.DataFrame.unpivot]
-    designed for use with
-    [`spread_draws`][polarbayes.spread.spread_draws] output.
+    Gather the data variables of an [`xarray.Dataset`][] into a
+    long polars DataFrame in a single pass.
+
+    Each variable contributes one contiguous block of rows, in the
+    order of `data.data_vars`. Values are raveled from the underlying
+    NumPy arrays and concatenated once into a single value column
+    of their common supertype. Index columns are the union of
+    the index columns of each variable, and are null for the rows
+    of variables that are not indexed by them.
+
+    Only data variables are gathered. Non-index coordinates
+    (e.g. a `region` coordinate along a `school` dimension) and
+    scalar coordinates are not treated as variables and do not
+    appear in the output.
 
     Parameters
     ----------
     data
-        Input DataFrame to (un)pivot from wide to long format.
-    index
-        Polars expression selecting mandatory or optional columns to
-        index the gather. Passed as the `index` argument to
-        [`pl.DataFrame.unpivot`][polars.DataFrame.unpivot].
-        If `None` (default), use the columns
-        `["chain", "draw"]` if they are present. Those are the MCMC
-        index columns created when
-        [`spread_draws`][polarbayes.spread.spread_draws] is called on
-        a compatible [`xarray.DataTree`][]
+        Dataset to convert, typically the output of
+        [`arviz.extract`][] with `keep_dataset=True`.
+
+    variable_name
+        Name for the variable column in the output DataFrame.
 
     value_name
         Name for the value column in the output DataFrame.
-        If `None` (default), use `"value"`.
 
-    variable_name
-        Name for the variable column in the output DataFrame.
-        If `None` (default), use `"variable"`.
+    dtypes
+        Optional mapping from index or variable column name to
+        the dtype of that column. Index values are cast before
+        they are gathered into rows, so this costs one cast per
+        coordinate value rather than per row.
+
+    n_jobs
+        Number of threads used to fill in the rows of different
+        variables concurrently. `-1` uses one thread per CPU.
+
+    encode
+        If `True`, index columns other than the chain and draw
+        columns hold the `UInt32` position of each row's coordinate
+        value along its dimension, and the variable column holds
+        the `UInt32` position of each row's variable in
+        `data.data_vars`, rather than the values and names
+        themselves. `dtypes` then only applies to the chain and
+        draw columns.
+
+    share_values
+        If `True` and `data` has a single variable whose array is
+        C-contiguous in the order of its dimensions and has the
+        dtype of the value column, use that array as the buffer of
+        the value column rather than copying it, so that the output
+        shares memory with `data`.
 
     Returns
     -------
-    pl.LazyFrame | pl.DataFrame
-        Unpivoted (pivoted longer) tidy data frame with index columns plus
-        variable name and value columns.
-
-    Raises
-    ------
-    ValueError
-        If `value_name` or `variable_name` conflicts with requested
-        index columns.
+    pl.DataFrame
+        The DataFrame of gathered draws, with ordered index columns
+        followed by the variable and value columns.
     """
-    if variable_name is None:
-        variable_name = VARIABLE_NAME
-    if value_name is None:
-        value_name = VALUE_NAME
-    if index is None:
-        index = cs.by_name(CHAIN_NAME, DRAW_NAME, require_all=False)
+    if dtypes is None:
+        dtypes = {}
+    var_names = list(data.data_vars)
+    if not var_names:
+        raise ValueError(
+            "No variables to gather. Check var_names and filter_vars."
+        )
+    var_dims, coords = _variable_dims_and_coords(data)
+    n_rows = [int(np.prod(list(dims.values()))) for dims in var_dims]
+    offsets = np.concatenate([[0], np.cumsum(n_rows)])
+
+    index_cols = order_index_column_names(coords)
+    for k, v in dict(
+        value_name=value_name, variable_name=variable_name
+    ).items():
+        _assert_not_in_index_columns(k, v, index_cols)
+
+    value_dtype = pl.concat(
+        [
+            pl.Series(
+                value_name, np.empty(0, dtype=data[var].dtype)
+            ).to_frame()
+            for var in var_names
+        ],
+        how="vertical_relaxed",
+    ).schema[value_name]
+    value_np_dtype = (
+        pl.Series(dtype=value_dtype).to_numpy().dtype
+        if value_dtype.is_numeric() or value_dtype == pl.Boolean
+        else None
+    )
+    shared = None
+    if share_values and len(var_names) == 1 and value_np_dtype is not None:
+        array = data[var_names[0]].variable.transpose(*var_dims[0]).values
+        if array.dtype == value_np_dtype and array.flags.c_contiguous:
+            shared = array.reshape(-1)
+    if shared is not None:
+        values = shared
+    elif value_np_dtype is not None:
+        # write each variable straight into one contiguous buffer
+        values = np.empty(offsets[-1], dtype=value_np_dtype)
+    positions = {
+        name: np.full(offsets[-1], _NO_POSITION, dtype=np.uint32)
+        for name in index_cols
+    }
 
-    index_names = order_index_column_names(
-        data.select(index).collect_schema().names()
+    def fill(
+        var: str, dims: dict[str, int], start: int, stop: int
+    ) -> pl.Series | None:
+        # each variable writes only its own block of rows,
+        # so variables can be filled concurrently
+        shape = tuple(dims.values())
+        for name, (dim, _) in coords.items():
+            if dim in dims:
+                axis = list(dims).index(dim)
+                positions[name][start:stop] = _index_positions(shape, axis)
+        if shared is not None:
+            return None
+        var_values = data[var].variable.transpose(*dims).values
+        if value_np_dtype is not None:
+            values[start:stop].reshape(shape)[...] = var_values
+            return None
+        return pl.Series(value_name, var_values.reshape(-1)).cast(value_dtype)
+
+    filled = _map_in_threads(
+        fill, var_names, var_dims, offsets[:-1], offsets[1:], n_jobs=n_jobs
+    )
+    if value_np_dtype is None:
+        values = filled
+
+    index = {}
+    for name in index_cols:
+        pos = pl.Series(positions.pop(name))
+        if pos.max() == _NO_POSITION:
+            # null index where a variable is not indexed by this column
+            pos = pl.select(pl.when(pos != _NO_POSITION).then(pos)).to_series()
+        if encode and name not in (CHAIN_NAME, DRAW_NAME):
+            index[name] = pos.alias(name)
+            continue
+        index[name] = (
+            coords[name][1].cast(dtypes.get(name, coords[name][1].dtype))
+        ).gather(pos)
+    var_positions = np.repeat(
+        np.arange(len(var_names), dtype=np.uint32), n_rows
+    )
+    return pl.DataFrame(
+        {
+            **index,
+            variable_name: pl.Series(variable_name, var_positions)
+            if encode
+            else pl.Series(
+                variable_name,
+                var_names,
+                dtype=dtypes.get(variable_name, pl.String),
+            ).gather(var_positions),
+            value_name: (
+                pl.Series(value_name, values)
+                if value_np_dtype is not None
+                else pl.concat(values, rechunk=True)
+            ),
+        }
+    )
+
+
+def _conform_to_schema(df: pl.DataFrame, schema: pl.Schema) -> pl.DataFrame:
+    """
+    Select, order and cast the columns of a DataFrame to match a schema,
+    adding all-null columns for any schema columns it lacks.
+    """
+    return df.select(
+        pl.col(name).cast(dtype)
+        if name in df.columns
+        else pl.lit(None, dtype=dtype).alias(name)
+        for name, dtype in schema.items()
     )
 
-    # more informative error message than `unpivot()` gives on its own
-    [
-        _assert_not_in_index_columns(k, v, index_names)
-        for k, v in dict(
-            value_name=value_name, variable_name=variable_name
-        ).items()
-    ]
 
-    return data.unpivot(
-        index=index, variable_name=variable_name, value_name=value_name
-    ).select(index_names + [variable_name, value_name])  # order output columns
+def _split_rows(
+    data: xr.Dataset, max_rows: int | None, dims: list[str] | None = None
+) -> Iterator[xr.Dataset]:
+    """
+    Split a single-variable Dataset into contiguous pieces that
+    each convert to at most `max_rows` rows, slicing the leading
+    dimension first and recursing into the next dimension when
+    a single position along the leading one is too large.
+    Converting the pieces in order reproduces the rows of
+    converting `data` at once.
+    """
+    if dims is None:
+        dims = list(data.dims)
+    if max_rows is None or not dims:
+        yield data
+        return
+    leading, *rest = dims
+    n_inner = int(np.prod([data.sizes[d] for d in rest]))
+    if n_inner > max_rows and rest:
+        for i in range(data.sizes[leading]):
+            yield from _split_rows(
+                data.isel({leading: slice(i, i + 1)}), max_rows, rest
+            )
+        return
+    step = max(1, max_rows // n_inner)
+    for start in range(0, data.sizes[leading], step):
+        yield data.isel({leading: slice(start, start + step)})
+
+
+def _chunk_blocks(data: xr.Dataset) -> Iterator[xr.Dataset]:
+    """
+    Split a single-variable Dataset into the blocks of its storage
+    chunks, in C order. Chunks are taken from dask if the variable
+    is dask-backed, and otherwise from the chunks preferred by the
+    backend it was lazily opened with (e.g. NetCDF or Zarr).
+    Dimensions without chunks are not split.
+    """
+    (variable,) = data.data_vars.values()
+    if variable.chunks is not None:
+        chunks = dict(variable.chunksizes)
+    else:
+        preferred = variable.encoding.get("preferred_chunks", {})
+        chunks = {
+            dim: (step,) * (size // step)
+            + ((size % step,) if size % step else ())
+            for dim, size in variable.sizes.items()
+            if (step := preferred.get(dim, size)) > 0
+        }
+    bounds = {
+        dim: np.cumsum((0,) + tuple(sizes)) for dim, sizes in chunks.items()
+    }
+    for block in itertools.product(
+        *(zip(b[:-1], b[1:]) for b in bounds.values())
+    ):
+        yield data.isel(
+            {
+                dim: slice(start, stop)
+                for dim, (start, stop) in zip(bounds, block)
+            }
+        )
+
+
+def _gather_batches(
+    data: xr.Dataset,
+    by: Literal["variable", "chain", "chunk"],
+    max_rows: int | None,
+) -> Iterator[xr.Dataset]:
+    """
+    Split an extracted Dataset into the pieces converted by
+    [`iter_gather_draws`][polarbayes.gather.iter_gather_draws].
+    """
+    # label dimensions without coordinates by position, so that
+    # positions are kept rather than renumbered when they are split
+    data = data.assign_coords(
+        {
+            dim: np.arange(size)
+            for dim, size in data.sizes.items()
+            if dim not in data.xindexes
+        }
+    )
+    if by == "chain":
+        # works whether chain is a dimension or a level of
+        # the stacked sample dimension
+        chain = data[CHAIN_NAME]
+        (sample_dim,) = chain.dims
+        # a generator, so only one chain's selection is held at a time
+        units = (
+            data.isel({sample_dim: np.flatnonzero(chain.values == c)})
+            for c in dict.fromkeys(chain.values.tolist())
+        )
+    elif by in ("variable", "chunk"):
+        units = [data]
+    else:
+        raise ValueError(
+            f"Unknown batching '{by}'. "
+            "Expected 'variable', 'chain' or 'chunk'."
+        )
+    for unit in units:
+        if by == "chain" and max_rows is None:
+            yield unit
+        elif by == "chunk":
+            for var in unit.data_vars:
+                for block in _chunk_blocks(unit[[var]]):
+                    yield from _split_rows(block, max_rows)
+        else:
+            for var in unit.data_vars:
+                yield from _split_rows(unit[[var]], max_rows)
 
 
 def gather_draws(
@@ -134,6 +442,9 @@ def gather_draws(
     random_seed: int | np.random.Generator | None = None,
     value_name: str | None = None,
     variable_name: str | None = None,
+    engine: Literal["native", "pandas"] = "native",
+    compact: bool = False,
+    n_jobs: int = 1,
 ) -> pl.DataFrame:
     """
     Convert an [`xarray.DataTree`][] group to a polars
@@ -158,7 +469,11 @@ def gather_draws(
         `filter_vars` parameter passed to [`arviz.extract`][].
 
     num_samples
-        `num_samples` parameter passed to [`arviz.extract`][].
+        `num_samples` parameter of [`arviz.extract`][]. Samples are
+        drawn as by [`arviz.extract`][], but before any data are
+        stacked, so only the chains and draws of the selected
+        samples are read, and the result is the same. See also
+        [`subsample_draws`][polarbayes.subsample.subsample_draws].
 
     random_seed
         `random_seed` parameter passed to [`arviz.extract`][].
@@ -171,6 +486,34 @@ def gather_draws(
         Name for the variable column in the output DataFrame. if `None` (default),
         use `"variable"`.
 
+    engine
+        Conversion engine. `"native"` (default) gathers all
+        variables in a single pass over the extracted arrays.
+        `"pandas"` spreads each variable via pandas, unpivots it
+        with [`gather_variables`][polarbayes.gather.gather_variables]
+        and concatenates the results, and is kept as a fallback.
+        The engines differ in how they treat coordinates that are
+        not indexes: the `"native"` engine gathers only the data
+        variables, whereas the `"pandas"` engine also gathers
+        non-index and scalar coordinates as if they were
+        variables, which adds rows for them and can force the
+        value column to a string dtype.
+
+    compact
+        If `True`, use compact dtypes for the index and variable
+        columns: `UInt8` (or `UInt16`) chain, `UInt32` draw, and
+        [`polars.Enum`][] for the variable column and the index
+        column of each string-valued dimension. Enum categories
+        are taken from the whole `group`, so they are the same
+        across calls and batches. If `False` (default), use the
+        dtypes of the coordinates and a `String` variable column.
+
+    n_jobs
+        Number of threads used to convert variables concurrently.
+        `1` (default) converts them one at a time, and `-1` uses
+        one thread per CPU. The output is identical whatever the
+        number of threads.
+
     Returns
     -------
     pl.DataFrame
@@ -186,7 +529,10 @@ def gather_draws(
         value_name = VALUE_NAME
     # need to extract all variables jointly to ensure same
     # draws for each
-    extracted = az.extract(
+    extracted = _record_stage(
+        "gather_draws",
+        "extract",
+        _extract,
         data,
         group=group,
         combined=combined,
@@ -196,24 +542,46 @@ def gather_draws(
         keep_dataset=True,
         random_seed=random_seed,
     )
+    dtypes = _compact_dtypes(data[group], variable_name) if compact else {}
+    if engine == "native":
+        return _record_stage(
+            "gather_draws",
+            "gather",
+            _gather_dataset,
+            extracted,
+            variable_name=variable_name,
+            value_name=value_name,
+            dtypes=dtypes,
+            n_jobs=n_jobs,
+        )
+    elif engine != "pandas":
+        raise ValueError(
+            f"Unknown engine '{engine}'. Expected 'native' or 'pandas'."
+        )
     var_names = extracted.data_vars.keys()
-    result = pl.concat(
-        [
-            gather_variables(
-                *spread_draws_and_get_index_cols(
-                    extracted,
-                    group=group,
-                    var_names=var,
-                    combined=False,
-                    filter_vars=None,
-                    num_samples=None,
-                    random_seed=None,
-                ),
-                variable_name=variable_name,
-                value_name=value_name,
-            )
-            for var in var_names
-        ],
+    gathered = _map_in_threads(
+        lambda var: gather_variables(
+            *spread_draws_and_get_index_cols(
+                extracted,
+                group=group,
+                var_names=var,
+                combined=False,
+                filter_vars=None,
+                num_samples=None,
+                random_seed=None,
+                engine="pandas",
+            ),
+            variable_name=variable_name,
+            value_name=value_name,
+        ),
+        var_names,
+        n_jobs=n_jobs,
+    )
+    result = _record_stage(
+        "gather_draws",
+        "concat",
+        pl.concat,
+        gathered,
         how="diagonal_relaxed",
     )
     # Need to order output columns here as well as
@@ -224,4 +592,123 @@ def gather_draws(
         [x for x in result.columns if x not in [variable_name, value_name]]
     )
 
-    return result.select(index_cols_ordered + [variable_name, value_name])
+    return result.select(
+        index_cols_ordered + [variable_name, value_name]
+    ).cast({k: v for k, v in dtypes.items() if k in result.columns})
+
+
+def iter_gather_draws(
+    data: xr.DataTree,
+    group: str = "posterior",
+    combined: bool = True,
+    var_names: Iterable[str] | None = None,
+    filter_vars: str | None = None,
+    num_samples: int | None = None,
+    random_seed: int | np.random.Generator | None = None,
+    value_name: str | None = None,
+    variable_name: str | None = None,
+    by: Literal["variable", "chain", "chunk"] = "variable",
+    max_rows: int | None = None,
+    compact: bool = False,
+) -> Iterator[pl.DataFrame]:
+    """
+    Convert an [`xarray.DataTree`][] group to tidy (gathered)
+    draws in batches, holding only one converted batch in
+    memory at a time.
+
+    Every batch has the same schema (column names, order and dtypes)
+    as the output of [`gather_draws`][polarbayes.gather.gather_draws]
+    called with the same arguments, so batches can be concatenated
+    or written out incrementally.
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    num_samples
+        `num_samples` parameter passed to [`arviz.extract`][].
+
+    random_seed
+        `random_seed` parameter passed to [`arviz.extract`][].
+
+    value_name
+        Name for the value column in the output DataFrames.
+        If `None` (default), use `"value"`.
+
+    variable_name
+        Name for the variable column in the output DataFrames.
+        If `None` (default), use `"variable"`.
+
+    by
+        How to batch the output. `"variable"` (default) yields one
+        batch per variable, and concatenating the batches reproduces
+        the output of [`gather_draws`][polarbayes.gather.gather_draws]
+        exactly. `"chain"` yields one batch per chain containing
+        all variables. `"chunk"` yields one batch per storage chunk
+        of each variable, taken from dask chunks or, for data lazily
+        opened from NetCDF or Zarr without dask, from the chunks
+        on disk, so that only one chunk is read into memory at a
+        time. Note that stacking the sample dimensions
+        (`combined=True`) reads data lazily opened without dask
+        into memory; use `combined=False` to avoid this.
+
+    max_rows
+        If not `None`, further split batches so that each has at
+        most `max_rows` rows, by splitting each variable into
+        contiguous blocks of rows. With `by="variable"`,
+        concatenating the batches still reproduces the output of
+        [`gather_draws`][polarbayes.gather.gather_draws] exactly.
+
+    compact
+        `compact` parameter of
+        [`gather_draws`][polarbayes.gather.gather_draws].
+
+    Returns
+    -------
+    Iterator[pl.DataFrame]
+        Iterator over the batches of tidy (gathered) draws.
+    """
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    if value_name is None:
+        value_name = VALUE_NAME
+    extracted = _extract(
+        data,
+        group=group,
+        combined=combined,
+        var_names=var_names,
+        filter_vars=filter_vars,
+        num_samples=num_samples,
+        keep_dataset=True,
+        random_seed=random_seed,
+    )
+    dtypes = _compact_dtypes(data[group], variable_name) if compact else {}
+    schema = _gather_dataset(
+        _empty_dataset(extracted),
+        variable_name=variable_name,
+        value_name=value_name,
+        dtypes=dtypes,
+    ).schema
+    for batch in _gather_batches(extracted, by=by, max_rows=max_rows):
+        yield _conform_to_schema(
+            _gather_dataset(
+                batch,
+                variable_name=variable_name,
+                value_name=value_name,
+                dtypes=dtypes,
+            ),
+            schema,
+        )
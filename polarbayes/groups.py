@@ -0,0 +1,325 @@
+"""
+Conversion of several DataTree groups in one pass, with the same
+draws in every group.
+"""
+
+from collections.abc import Iterable, Mapping, Sequence
+
+import arviz_base as az
+import numpy as np
+import polars as pl
+import polars.selectors as cs
+import xarray as xr
+from arviz_base.validate import validate_sample_dims
+
+from polarbayes.gather import _compact_dtypes, _gather_dataset
+from polarbayes.instrument import _record_stage
+from polarbayes.schema import (
+    VALUE_NAME,
+    VARIABLE_NAME,
+    order_index_column_names,
+)
+from polarbayes.spread import _dataset_to_polars
+from polarbayes.subsample import _extract_samples, _sample_positions
+
+# default name of the group column
+GROUP_NAME = "group"
+
+
+def _extract_groups(
+    data: xr.DataTree,
+    groups: Sequence[str],
+    combined: bool,
+    var_names: Mapping[str, Iterable[str]] | None,
+    filter_vars: str | None,
+    num_samples: int | None,
+    random_seed: int | np.random.Generator | None,
+) -> dict[str, xr.Dataset]:
+    """
+    Extract several groups with [`arviz.extract`][], subsampling
+    all of them at the same sample positions before stacking them.
+    """
+    if num_samples is not None and not combined:
+        raise ValueError("num_samples is only compatible with combined=True.")
+    if var_names is None:
+        var_names = {}
+    unknown = [group for group in var_names if group not in groups]
+    if unknown:
+        raise ValueError(
+            f"var_names given for groups {unknown} that are not converted."
+        )
+    datasets = {
+        group: az.convert_to_dataset(data, group=group) for group in groups
+    }
+    # the same draws, with the same coordinates, in every group
+    first, *rest = groups
+    sample_dims = validate_sample_dims(None, data=datasets[first])
+    for group in rest:
+        for dim in sample_dims:
+            this, other = datasets[first], datasets[group]
+            if other.sizes.get(dim) != this.sizes[dim] or not np.array_equal(
+                other[dim].values, this[dim].values
+            ):
+                raise ValueError(
+                    f"Groups '{first}' and '{group}' do not have the same "
+                    "chains and draws."
+                )
+    if num_samples is None:
+        return {
+            group: az.extract(
+                dataset,
+                combined=combined,
+                var_names=var_names.get(group),
+                filter_vars=filter_vars,
+                keep_dataset=True,
+            )
+            for group, dataset in datasets.items()
+        }
+    positions = _sample_positions(datasets[first], num_samples, random_seed)
+    return {
+        group: _extract_samples(
+            dataset,
+            *positions,
+            combined=True,
+            var_names=var_names.get(group),
+            filter_vars=filter_vars,
+            keep_dataset=True,
+        )
+        for group, dataset in datasets.items()
+    }
+
+
+def spread_groups(
+    data: xr.DataTree,
+    groups: Sequence[str] = ("posterior", "sample_stats"),
+    combined: bool = True,
+    var_names: Mapping[str, Iterable[str]] | None = None,
+    filter_vars: str | None = None,
+    num_samples: int | None = None,
+    random_seed: int | np.random.Generator | None = None,
+) -> dict[str, pl.DataFrame]:
+    """
+    Convert several [`xarray.DataTree`][] groups to polars
+    DataFrames of tidy (spread) draws in one call, with the same
+    draws in every group.
+
+    Each group is extracted once with [`arviz.extract`][], and
+    subsampling (`num_samples`) selects the same sample positions
+    in all groups, as if their variables had been extracted jointly.
+    The DataFrames of groups with the same index columns, e.g.
+    scalar `posterior` variables and `sample_stats`, are therefore
+    aligned row for row, so their variable columns can be
+    concatenated horizontally without a join.
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    groups
+        Names of the groups to convert. Default
+        `("posterior", "sample_stats")`. All groups must have the
+        same chains and draws.
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+
+    var_names
+        Mapping from group name to the `var_names` parameter passed
+        to [`arviz.extract`][] for that group. Groups that are not
+        in the mapping are converted in full.
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    num_samples
+        Number of combined samples to draw, without replacement,
+        from all groups at once. Requires `combined=True`.
+
+    random_seed
+        Seed or generator for subsampling. With the same seed,
+        each group has the same draws as
+        [`spread_draws`][polarbayes.spread.spread_draws] called on
+        that group alone with the same `num_samples`.
+
+    Returns
+    -------
+    dict[str, pl.DataFrame]
+        Mapping from group name to its DataFrame of tidy (spread)
+        draws, laid out as by
+        [`spread_draws`][polarbayes.spread.spread_draws].
+
+    Raises
+    ------
+    ValueError
+        If the groups do not have the same chains and draws.
+    """
+    extracted = _record_stage(
+        "spread_groups",
+        "extract",
+        _extract_groups,
+        data,
+        groups,
+        combined,
+        var_names,
+        filter_vars,
+        num_samples,
+        random_seed,
+    )
+    result = {}
+    for group, dataset in extracted.items():
+        df, index_cols = _record_stage(
+            "spread_groups", "to_polars", _dataset_to_polars, dataset
+        )
+        index_cols_ordered = order_index_column_names(index_cols)
+        result[group] = df.select(
+            cs.by_name(index_cols_ordered, require_all=True),
+            cs.exclude(index_cols_ordered),
+        )
+    return result
+
+
+def _union_dtypes(
+    dtypes: Iterable[dict[str, pl.DataType]],
+) -> dict[str, pl.DataType]:
+    """
+    Merge the compact dtypes of several groups, taking the union of
+    the categories of Enum columns in order of first appearance.
+    """
+    merged = {}
+    for group_dtypes in dtypes:
+        for name, dtype in group_dtypes.items():
+            if name in merged and isinstance(dtype, pl.Enum):
+                categories = [*merged[name].categories, *dtype.categories]
+                merged[name] = pl.Enum(list(dict.fromkeys(categories)))
+            else:
+                merged.setdefault(name, dtype)
+    return merged
+
+
+def gather_groups(
+    data: xr.DataTree,
+    groups: Sequence[str] = ("posterior", "sample_stats"),
+    combined: bool = True,
+    var_names: Mapping[str, Iterable[str]] | None = None,
+    filter_vars: str | None = None,
+    num_samples: int | None = None,
+    random_seed: int | np.random.Generator | None = None,
+    value_name: str | None = None,
+    variable_name: str | None = None,
+    group_name: str | None = None,
+    compact: bool = False,
+) -> pl.DataFrame:
+    """
+    Convert several [`xarray.DataTree`][] groups to a single polars
+    DataFrame of tidy (gathered) draws, with a column naming the
+    group of each row and the same draws in every group.
+
+    Groups are extracted and subsampled as by
+    [`spread_groups`][polarbayes.groups.spread_groups].
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    groups
+        Names of the groups to convert. Default
+        `("posterior", "sample_stats")`.
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+
+    var_names
+        Mapping from group name to the `var_names` parameter passed
+        to [`arviz.extract`][] for that group.
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    num_samples
+        Number of combined samples to draw, without replacement,
+        from all groups at once. Requires `combined=True`.
+
+    random_seed
+        Seed or generator for subsampling, as for
+        [`spread_groups`][polarbayes.groups.spread_groups].
+
+    value_name
+        Name for the value column in the output DataFrame.
+        If `None` (default), use `"value"`.
+
+    variable_name
+        Name for the variable column in the output DataFrame.
+        If `None` (default), use `"variable"`.
+
+    group_name
+        Name for the group column in the output DataFrame.
+        If `None` (default), use `"group"`.
+
+    compact
+        `compact` parameter of
+        [`gather_draws`][polarbayes.gather.gather_draws]. Enum
+        categories of the variable column and of index columns
+        shared by several groups are the union of those of
+        each group.
+
+    Returns
+    -------
+    pl.DataFrame
+        The DataFrame of tidy (gathered) draws of all groups, in
+        the order of `groups`, with the group column first, then the
+        index columns of all groups (null where a group is not
+        indexed by them), the variable column and the value column,
+        cast to the supertype of the values of all groups.
+
+    Raises
+    ------
+    ValueError
+        If the groups do not have the same chains and draws.
+    """
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    if value_name is None:
+        value_name = VALUE_NAME
+    if group_name is None:
+        group_name = GROUP_NAME
+    extracted = _record_stage(
+        "gather_groups",
+        "extract",
+        _extract_groups,
+        data,
+        groups,
+        combined,
+        var_names,
+        filter_vars,
+        num_samples,
+        random_seed,
+    )
+    dtypes = (
+        _union_dtypes(
+            _compact_dtypes(data[group], variable_name) for group in groups
+        )
+        if compact
+        else {}
+    )
+    group_dtype = pl.Enum(list(groups)) if compact else pl.String
+    frames = [
+        _record_stage(
+            "gather_groups",
+            "gather",
+            _gather_dataset,
+            dataset,
+            variable_name=variable_name,
+            value_name=value_name,
+            dtypes=dtypes,
+        ).select(pl.lit(group, dtype=group_dtype).alias(group_name), pl.all())
+        for group, dataset in extracted.items()
+    ]
+    result = pl.concat(frames, how="diagonal_relaxed")
+    index_cols = order_index_column_names(
+        name
+        for name in result.columns
+        if name not in (group_name, variable_name, value_name)
+    )
+    return result.select(group_name, *index_cols, variable_name, value_name)
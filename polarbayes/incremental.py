@@ -0,0 +1,312 @@
+"""
+Incremental conversion of draws from samplers that are still running.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Literal
+
+import numpy as np
+import polars as pl
+import xarray as xr
+
+from polarbayes.gather import _variable_dims_and_coords, gather_draws
+from polarbayes.schema import CHAIN_NAME, DRAW_NAME, VARIABLE_NAME
+from polarbayes.sink import _EXTENSIONS
+
+
+@dataclass(frozen=True)
+class _Chunk:
+    """
+    Draws converted by one call to `gather_draws`: draws `start`
+    to `start + n_draws` (in order of conversion) of each of
+    `chains`, with `lengths[v]` rows for the `v`-th variable, whose
+    rows are ordered as its dimensions `var_dims[v]`.
+    """
+
+    chains: tuple
+    start: int
+    n_draws: int
+    lengths: tuple[int, ...]
+    var_dims: tuple[dict[str, int], ...]
+
+
+class IncrementalGather:
+    """
+    Tidy (gathered) draws of a DataTree group that grows as
+    a sampler runs, converting only the draws that are new since
+    the last update.
+
+    The converter remembers how many draws of each chain it has
+    converted. On each [`update`][polarbayes.incremental.IncrementalGather.update],
+    it selects only the draws of each chain whose `"draw"`
+    coordinate is beyond the last one converted, converts them with
+    [`gather_draws`][polarbayes.gather.gather_draws], and appends
+    them, in memory or as a new file of an on-disk dataset.
+    [`draws`][polarbayes.incremental.IncrementalGather.draws] then
+    returns all converted draws in the same order as a conversion of
+    all of them at once, so that it is identical to the output of
+    [`gather_draws`][polarbayes.gather.gather_draws] on the full
+    DataTree.
+
+    Parameters
+    ----------
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    value_name
+        Name for the value column in the output.
+        If `None` (default), use `"value"`.
+
+    variable_name
+        Name for the variable column in the output.
+        If `None` (default), use `"variable"`.
+
+    compact
+        `compact` parameter of
+        [`gather_draws`][polarbayes.gather.gather_draws].
+
+    path
+        If given, a directory in which to write the draws of each
+        update as a new file, `part-00000.parquet` and so on, rather
+        than keeping them in memory. The directory must not already
+        contain any files.
+
+    format
+        File format to write when `path` is given, `"parquet"`
+        (default) or `"ipc"`.
+
+    Examples
+    --------
+    ```python
+    converter = pb.IncrementalGather()
+    while sampling:
+        new = converter.update(xr.open_datatree("checkpoint.nc"))
+        ...
+    draws = converter.draws()
+    ```
+    """
+
+    def __init__(
+        self,
+        group: str = "posterior",
+        combined: bool = True,
+        var_names: Iterable[str] | None = None,
+        filter_vars: str | None = None,
+        value_name: str | None = None,
+        variable_name: str | None = None,
+        compact: bool = False,
+        path: str | os.PathLike | None = None,
+        format: Literal["parquet", "ipc"] = "parquet",
+    ) -> None:
+        if format not in _EXTENSIONS:
+            raise ValueError(
+                f"Unknown format '{format}'. Expected 'parquet' or 'ipc'."
+            )
+        if path is not None:
+            path = Path(path)
+            if path.is_dir() and any(path.iterdir()):
+                raise FileExistsError(
+                    f"Cannot write draws to non-empty directory '{path}'."
+                )
+            path.mkdir(parents=True, exist_ok=True)
+        self.group = group
+        self.combined = combined
+        self.var_names = var_names
+        self.filter_vars = filter_vars
+        self.value_name = value_name
+        self.variable_name = (
+            VARIABLE_NAME if variable_name is None else variable_name
+        )
+        self.compact = compact
+        self.path = path
+        self.format = format
+        # number of converted draws and last converted draw
+        # coordinate of each chain, in chain order
+        self._n_draws: dict = {}
+        self._last_draw: dict = {}
+        self._chunks: list[_Chunk] = []
+        self._frames: list[pl.DataFrame] = []
+
+    @property
+    def n_draws(self) -> dict:
+        """
+        Number of draws converted so far for each chain.
+        """
+        return dict(self._n_draws)
+
+    def _new_draws(self, group: xr.Dataset) -> dict[tuple, list]:
+        """
+        Group the chains of a Dataset by the positions of their
+        draws that have not been converted yet.
+        """
+        draws = group[DRAW_NAME].values
+        new = {}
+        for chain in group[CHAIN_NAME].values.tolist():
+            last = self._last_draw.get(chain)
+            positions = np.arange(len(draws))
+            if last is not None:
+                positions = positions[draws > last]
+            if len(positions):
+                key = (tuple(positions), self._n_draws.get(chain, 0))
+                new.setdefault(key, []).append(chain)
+        return new
+
+    def update(self, data: xr.DataTree) -> pl.DataFrame:
+        """
+        Convert the draws of a DataTree that are new since the last
+        update, and append them to the converted draws.
+
+        Parameters
+        ----------
+        data
+            Either the full DataTree so far, or a DataTree holding
+            only new draws. Draws are identified by their `"draw"`
+            coordinate, which must increase with each new draw.
+
+        Returns
+        -------
+        pl.DataFrame
+            The draws converted by this update, in the format of
+            [`gather_draws`][polarbayes.gather.gather_draws].
+            Empty if there are no new draws.
+        """
+        group = data[self.group].to_dataset()
+        frames = []
+        for (positions, start), chains in self._new_draws(group).items():
+            chunk = group.isel(
+                {
+                    CHAIN_NAME: np.flatnonzero(
+                        np.isin(group[CHAIN_NAME].values, chains)
+                    ),
+                    DRAW_NAME: list(positions),
+                }
+            )
+            frame = gather_draws(
+                xr.DataTree.from_dict({self.group: chunk}),
+                group=self.group,
+                combined=self.combined,
+                var_names=self.var_names,
+                filter_vars=self.filter_vars,
+                value_name=self.value_name,
+                variable_name=self.variable_name,
+                compact=self.compact,
+            )
+            runs = frame[self.variable_name].rle().struct.unnest()
+            var_dims, _ = _variable_dims_and_coords(
+                chunk[runs["value"].cast(pl.String).to_list()]
+            )
+            self._chunks.append(
+                _Chunk(
+                    chains=tuple(chains),
+                    start=start,
+                    n_draws=len(positions),
+                    lengths=tuple(runs["len"]),
+                    var_dims=tuple(var_dims),
+                )
+            )
+            if self.path is None:
+                self._frames.append(frame)
+            else:
+                getattr(frame, f"write_{self.format}")(
+                    self.path / f"part-{len(self._chunks) - 1:05d}."
+                    f"{_EXTENSIONS[self.format]}"
+                )
+            last = group[DRAW_NAME].values[positions[-1]]
+            for chain in chains:
+                self._n_draws[chain] = start + len(positions)
+                self._last_draw[chain] = last
+            frames.append(frame)
+        return pl.concat(frames) if frames else pl.DataFrame()
+
+    def _frames_in_order(self) -> list[pl.DataFrame]:
+        if self.path is None:
+            return self._frames
+        read = getattr(pl, f"read_{self.format}")
+        return [
+            read(self.path / f"part-{i:05d}.{_EXTENSIONS[self.format]}")
+            for i in range(len(self._chunks))
+        ]
+
+    def _positions(self) -> np.ndarray:
+        """
+        Get a key of each row of the concatenated chunks that sorts
+        them in the order of the full conversion.
+        """
+        chains = list(self._n_draws)
+        counts = np.array([self._n_draws[c] for c in chains])
+        chain_index = {c: i for i, c in enumerate(chains)}
+        chain_offset = dict(zip(chains, np.cumsum(counts) - counts))
+        n_samples = int(counts.sum())
+        # number of cells of each variable
+        first = self._chunks[0]
+        cells = [
+            length // (len(first.chains) * first.n_draws)
+            for length in first.lengths
+        ]
+        # the (chain, draw) grid of combined=False has room for the
+        # draws of the longest chain, leaving gaps in the keys of
+        # chains with fewer draws
+        n_keys = n_samples if self.combined else len(chains) * counts.max()
+        variable_offset = np.cumsum([0, *cells[:-1]]) * n_keys
+        positions = []
+        for chunk in self._chunks:
+            n_chains, k = len(chunk.chains), chunk.n_draws
+            offsets = np.array([chain_offset[c] for c in chunk.chains])
+            indices = np.array([chain_index[c] for c in chunk.chains])
+            for v, (length, dims) in enumerate(
+                zip(chunk.lengths, chunk.var_dims)
+            ):
+                row = np.arange(length)
+                if self.combined:
+                    # cell, then chain, then draw
+                    cell = row // (n_chains * k)
+                    chain = row // k % n_chains
+                    draw = row % k
+                    sample = offsets[chain] + chunk.start + draw
+                    position = cell * n_samples + sample
+                else:
+                    # in the order of the variable's own dimensions
+                    full_index, full_shape = [], []
+                    for dim, index in zip(
+                        dims, np.unravel_index(row, tuple(dims.values()))
+                    ):
+                        if dim == CHAIN_NAME:
+                            full_index.append(indices[index])
+                            full_shape.append(len(chains))
+                        elif dim == DRAW_NAME:
+                            full_index.append(chunk.start + index)
+                            full_shape.append(counts.max())
+                        else:
+                            full_index.append(index)
+                            full_shape.append(dims[dim])
+                    position = np.ravel_multi_index(full_index, full_shape)
+                positions.append(variable_offset[v] + position)
+        return np.concatenate(positions)
+
+    def draws(self) -> pl.DataFrame:
+        """
+        Get all the draws converted so far.
+
+        Returns
+        -------
+        pl.DataFrame
+            The converted draws, in the same order and with the same
+            schema as the output of
+            [`gather_draws`][polarbayes.gather.gather_draws] on
+            a DataTree holding all of them.
+        """
+        if not self._chunks:
+            raise ValueError("No draws have been converted yet.")
+        frame = pl.concat(self._frames_in_order(), rechunk=False)
+        return frame[np.argsort(self._positions(), kind="stable")]
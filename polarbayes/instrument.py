@@ -0,0 +1,189 @@
+"""
+Opt-in timing and memory instrumentation of the stages
+of a conversion.
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+import polars as pl
+
+
+@dataclass(frozen=True)
+class StageRecord:
+    """
+    Measurements of one stage of a conversion.
+
+    Attributes
+    ----------
+    function
+        Name of the polarbayes function the stage belongs to,
+        e.g. `"gather_draws"`.
+
+    stage
+        Name of the stage, e.g. `"extract"` or `"concat"`.
+
+    seconds
+        Wall time spent in the stage.
+
+    rows
+        Number of rows the stage produced, or `None` if its
+        output is not tabular or not yet computed.
+
+    bytes
+        Estimated size in bytes of the output of the stage,
+        or `None` if unknown.
+
+    peak_bytes
+        Peak memory allocated during the stage over the memory
+        allocated when it started, as traced by [`tracemalloc`][],
+        or `None` if memory was not traced. Allocations that
+        polars makes outside of Python are not traced.
+    """
+
+    function: str
+    stage: str
+    seconds: float
+    rows: int | None
+    bytes: int | None
+    peak_bytes: int | None
+
+
+@dataclass
+class _Frame:
+    start_memory: int
+    peak_memory: int
+
+
+_handlers: ContextVar[tuple[Callable[[StageRecord], None], ...]] = ContextVar(
+    "polarbayes_stage_handlers", default=()
+)
+# memory of the stages currently running, innermost last
+_frames: ContextVar[tuple[_Frame, ...]] = ContextVar(
+    "polarbayes_stage_frames", default=()
+)
+
+
+@contextmanager
+def record_stages(
+    callback: Callable[[StageRecord], None] | None = None,
+    trace_memory: bool = False,
+) -> Iterator[list[StageRecord]]:
+    """
+    Record the stages of the conversions run within a context.
+
+    Within the context, each call to
+    [`spread_draws`][polarbayes.spread.spread_draws],
+    [`gather_draws`][polarbayes.gather.gather_draws] and
+    [`gather_variables`][polarbayes.gather.gather_variables]
+    (and the functions built on them) reports the wall time,
+    output size and, optionally, peak memory of each of its stages.
+    Outside of such a context, stages are not measured at all.
+
+    Parameters
+    ----------
+    callback
+        Optional function called with each
+        [`StageRecord`][polarbayes.instrument.StageRecord]
+        as soon as its stage finishes, e.g. to forward it
+        to a metrics system.
+
+    trace_memory
+        If `True`, trace peak memory with [`tracemalloc`][], which
+        slows down conversions. If `False` (default), record
+        `None` as the peak memory of each stage.
+
+    Returns
+    -------
+    Iterator[list[StageRecord]]
+        Context manager yielding the list to which the records
+        of the stages are appended, in the order the stages finish.
+        The list converts directly to a DataFrame with
+        `pl.DataFrame(records)`.
+    """
+    records = []
+
+    def handle(record: StageRecord) -> None:
+        records.append(record)
+        if callback is not None:
+            callback(record)
+
+    start_tracing = trace_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    token = _handlers.set(_handlers.get() + (handle,))
+    try:
+        yield records
+    finally:
+        _handlers.reset(token)
+        if start_tracing:
+            tracemalloc.stop()
+
+
+def _output_size(output: Any) -> tuple[int | None, int | None]:
+    """
+    Get the number of rows and estimated size in bytes
+    of the output of a stage.
+    """
+    if isinstance(output, tuple) and output:
+        # e.g. a DataFrame and its index column names
+        return _output_size(output[0])
+    if isinstance(output, pl.DataFrame):
+        return output.height, output.estimated_size()
+    # duck-typed, so that pandas and xarray need not be imported
+    if hasattr(output, "memory_usage"):
+        # pandas DataFrame
+        return len(output), int(output.memory_usage(index=True).sum())
+    # e.g. xarray Dataset
+    return None, getattr(output, "nbytes", None)
+
+
+def _record_stage(
+    function: str, stage: str, run: Callable, *args, **kwargs
+) -> Any:
+    """
+    Call `run(*args, **kwargs)` as a stage of a conversion,
+    reporting it to any active
+    [`record_stages`][polarbayes.instrument.record_stages] contexts.
+    """
+    handlers = _handlers.get()
+    if not handlers:
+        return run(*args, **kwargs)
+
+    tracing = tracemalloc.is_tracing()
+    frame = None
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        for outer in _frames.get():
+            outer.peak_memory = max(outer.peak_memory, peak)
+        tracemalloc.reset_peak()
+        frame = _Frame(start_memory=current, peak_memory=current)
+    token = _frames.set(_frames.get() + ((frame,) if tracing else ()))
+    start = time.perf_counter()
+    try:
+        output = run(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        _frames.reset(token)
+    peak_bytes = None
+    if tracing:
+        _, peak = tracemalloc.get_traced_memory()
+        for outer in (*_frames.get(), frame):
+            outer.peak_memory = max(outer.peak_memory, peak)
+        peak_bytes = frame.peak_memory - frame.start_memory
+    rows, nbytes = _output_size(output)
+    record = StageRecord(
+        function=function,
+        stage=stage,
+        seconds=seconds,
+        rows=rows,
+        bytes=nbytes,
+        peak_bytes=peak_bytes,
+    )
+    for handle in handlers:
+        handle(record)
+    return output
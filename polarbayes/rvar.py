@@ -0,0 +1,188 @@
+"""
+Conversion of DataTree groups to one row per variable cell,
+with the draws of each cell in an array column.
+"""
+
+from typing import Iterable
+
+import numpy as np
+import polars as pl
+import xarray as xr
+
+from polarbayes.gather import _compact_dtypes
+from polarbayes.instrument import _record_stage
+from polarbayes.schema import (
+    CHAIN_NAME,
+    DRAW_NAME,
+    VARIABLE_NAME,
+    order_index_column_names,
+)
+from polarbayes.spread import _dim_index_coords, _index_positions
+from polarbayes.subsample import _extract
+from polarbayes.unpivot import _assert_not_in_index_columns
+
+# default name of the column of draws
+DRAWS_NAME = "draws"
+
+
+def _gather_cells(
+    data: xr.Dataset,
+    sample_dims: list[str],
+    variable_name: str,
+    draws_name: str,
+    dtypes: dict[str, pl.DataType],
+) -> pl.DataFrame:
+    """
+    Gather the data variables of an [`xarray.Dataset`][] into one
+    row per cell, with the draws of each cell in an array column
+    over the sample dimensions.
+    """
+    var_names = list(data.data_vars)
+    # common dtype, so that all cells share one array dtype
+    dtype = np.result_type(*(data[var].dtype for var in var_names))
+    sample_shape = tuple(data.sizes[dim] for dim in sample_dims)
+    frames = []
+    for var in var_names:
+        variable = data[var].variable
+        cell_dims = [dim for dim in variable.dims if dim not in sample_dims]
+        # sample dimensions last, so that the draws of each cell are
+        # contiguous. A no-op, and so zero-copy, if they already are.
+        values = np.ascontiguousarray(
+            variable.transpose(*cell_dims, *sample_dims).values,
+            dtype=dtype,
+        )
+        cell_shape = values.shape[: len(cell_dims)]
+        columns = {}
+        for axis, dim in enumerate(cell_dims):
+            positions = _index_positions(cell_shape, axis)
+            for name, coord in _dim_index_coords(data[[var]], dim).items():
+                columns[name] = coord.cast(
+                    dtypes.get(name, coord.dtype)
+                ).gather(positions)
+        for k, v in dict(
+            draws_name=draws_name, variable_name=variable_name
+        ).items():
+            _assert_not_in_index_columns(k, v, columns)
+        columns[variable_name] = pl.Series(
+            variable_name,
+            [var] * int(np.prod(cell_shape)),
+            dtype=dtypes.get(variable_name, pl.String),
+        )
+        columns[draws_name] = pl.Series(
+            draws_name, values.reshape(-1)
+        ).reshape((-1, *sample_shape))
+        frames.append(pl.DataFrame(columns))
+    result = pl.concat(frames, how="diagonal")
+    index_cols = order_index_column_names(
+        name
+        for name in result.columns
+        if name not in (variable_name, draws_name)
+    )
+    return result.select(index_cols + [variable_name, draws_name])
+
+
+def gather_rvars(
+    data: xr.DataTree,
+    group: str = "posterior",
+    combined: bool = False,
+    var_names: Iterable[str] | None = None,
+    filter_vars: str | None = None,
+    num_samples: int | None = None,
+    random_seed: int | np.random.Generator | None = None,
+    draws_name: str | None = None,
+    variable_name: str | None = None,
+    compact: bool = False,
+) -> pl.DataFrame:
+    """
+    Convert an [`xarray.DataTree`][] group to a polars DataFrame
+    with one row per variable cell, holding all the draws of that
+    cell in a single [`polars.Array`][] column, using the syntax of
+    [`arviz.extract`][].
+
+    Compared to the long format of
+    [`gather_draws`][polarbayes.gather.gather_draws], the chain,
+    draw, variable and index values are stored once per cell
+    rather than once per draw, which makes per-cell summaries and
+    contrasts much cheaper. The draws column is built directly
+    from the buffers of the extracted arrays, without copying when
+    the sample dimensions of a variable are already its last ones.
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+        If `False` (default), the draws of each cell form an array
+        of shape `(chain, draw)`. If `True`, they form a
+        one-dimensional array over the combined samples.
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    num_samples
+        `num_samples` parameter passed to [`arviz.extract`][].
+
+    random_seed
+        `random_seed` parameter passed to [`arviz.extract`][].
+
+    draws_name
+        Name for the column of draws in the output DataFrame.
+        If `None` (default), use `"draws"`.
+
+    variable_name
+        Name for the variable column in the output DataFrame.
+        If `None` (default), use `"variable"`.
+
+    compact
+        If `True`, use [`polars.Enum`][] dtypes for the variable
+        column and the index column of each string-valued
+        dimension, as in [`gather_draws`][polarbayes.gather.gather_draws].
+
+    Returns
+    -------
+    pl.DataFrame
+        The DataFrame of cells, with the index columns of
+        array-valued variables (null for variables that are not
+        indexed by them), a column of variable names and a column
+        of draws. The draws of all variables are cast to their
+        common supertype. Per-cell summaries can use the
+        [`arr`][polars.Expr.arr] namespace, e.g.
+        `pl.col("draws").reshape((-1, n_chains * n_draws)).arr.mean()`.
+    """
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    if draws_name is None:
+        draws_name = DRAWS_NAME
+    extracted = _record_stage(
+        "gather_rvars",
+        "extract",
+        _extract,
+        data,
+        group=group,
+        combined=combined,
+        var_names=var_names,
+        filter_vars=filter_vars,
+        num_samples=num_samples,
+        keep_dataset=True,
+        random_seed=random_seed,
+    )
+    sample_dims = ["sample"] if combined else [CHAIN_NAME, DRAW_NAME]
+    dtypes = _compact_dtypes(data[group], variable_name) if compact else {}
+    return _record_stage(
+        "gather_rvars",
+        "gather",
+        _gather_cells,
+        extracted,
+        sample_dims,
+        variable_name=variable_name,
+        draws_name=draws_name,
+        dtypes=dtypes,
+    )
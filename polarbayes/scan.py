@@ -0,0 +1,363 @@
+"""
+Lazy conversion of DataTree groups to polars LazyFrames, with
+predicate and projection pushdown into the underlying xarray data.
+"""
+
+from typing import Iterable, Iterator
+
+import numpy as np
+import polars as pl
+import polars.selectors as cs
+import xarray as xr
+from polars.io.plugins import register_io_source
+
+from polarbayes.gather import _conform_to_schema, _gather_dataset
+from polarbayes.schema import (
+    VALUE_NAME,
+    VARIABLE_NAME,
+    order_index_column_names,
+)
+from polarbayes.spread import (
+    _dataset_to_polars,
+    _dim_index_coords,
+    _empty_dataset,
+)
+from polarbayes.subsample import _extract
+
+
+def _split_conjunction(predicate: pl.Expr) -> list[pl.Expr]:
+    """
+    Split a predicate into the terms of its top-level conjunction.
+
+    Parameters
+    ----------
+    predicate
+        Boolean polars expression.
+
+    Returns
+    -------
+    list[pl.Expr]
+        Expressions whose conjunction (`&`) is equivalent
+        to `predicate`. A predicate that is not a conjunction
+        is returned as the only entry.
+    """
+    inputs = predicate.meta.pop()
+    if len(inputs) == 2 and any(
+        predicate.meta.eq(left & right)
+        for left, right in (inputs, inputs[::-1])
+    ):
+        return [term for x in inputs for term in _split_conjunction(x)]
+    return [predicate]
+
+
+def _matching_positions(
+    frame: pl.DataFrame, predicate: pl.Expr
+) -> np.ndarray | None:
+    """
+    Find the rows of a frame of coordinate values that satisfy a
+    predicate, provided the predicate can be evaluated on those
+    coordinate values alone.
+
+    Only elementwise predicates are pushed down, i.e. those whose
+    result for a row depends on the values in that row alone.
+    This is checked by evaluating the predicate on each row
+    separately and requiring the same result as evaluating it on
+    the whole frame, which rules out predicates that contain
+    aggregations (e.g. `pl.col("draw").mean()`) or whose result
+    depends on row counts or row order (e.g. `pl.len()`, `rank()`
+    or `shift()`). Such predicates would select different rows once
+    the converted frame has been reduced to the pushed-down
+    positions and the predicate is applied to it again.
+
+    Parameters
+    ----------
+    frame
+        DataFrame with one row per position along a dimension.
+
+    predicate
+        Boolean polars expression referencing only columns
+        of `frame`.
+
+    Returns
+    -------
+    np.ndarray | None
+        Positions of the rows satisfying `predicate`, or
+        `None` if the predicate cannot be pushed down.
+    """
+    row = "_".join(["row", *frame.columns])
+    try:
+        mask = frame.select(predicate).to_series()
+        row_mask = (
+            frame.with_row_index(row).select(predicate.over(row)).to_series()
+        )
+    except pl.exceptions.PolarsError:
+        return None
+    if mask.dtype != pl.Boolean or mask.len() != frame.height:
+        return None
+    if not row_mask.equals(mask, null_equal=True):
+        return None
+    return np.flatnonzero(mask.fill_null(False).to_numpy())
+
+
+def _pushdown(
+    frames: dict[str, pl.DataFrame], predicate: pl.Expr | None
+) -> dict[str, np.ndarray]:
+    """
+    Translate a predicate into positional selections along
+    the dimensions it filters.
+
+    Parameters
+    ----------
+    frames
+        Mapping from dimension name to a DataFrame of the
+        coordinate values at each position along it.
+
+    predicate
+        Boolean polars expression, or `None`.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        Mapping from dimension name to the (sorted) positions
+        that may satisfy `predicate`, for each dimension that
+        at least one term of the predicate could be pushed down to.
+        Rows outside these positions are guaranteed not to
+        satisfy `predicate`; rows inside them still need to
+        be filtered.
+    """
+    if predicate is None:
+        return {}
+    selection = {}
+    for term in _split_conjunction(predicate):
+        roots = set(term.meta.root_names())
+        for dim, frame in frames.items():
+            if roots and roots.issubset(frame.columns):
+                positions = _matching_positions(frame, term)
+                if positions is not None:
+                    selection[dim] = np.intersect1d(
+                        selection.get(dim, positions), positions
+                    )
+                break
+    return selection
+
+
+def _coordinate_frames(data: xr.Dataset) -> dict[str, pl.DataFrame]:
+    """
+    Get a DataFrame of index column values for each dimension
+    of a Dataset.
+    """
+    return {
+        dim: pl.DataFrame(_dim_index_coords(data, dim)) for dim in data.dims
+    }
+
+
+def _conform(
+    df: pl.DataFrame,
+    schema: pl.Schema,
+    predicate: pl.Expr | None,
+    with_columns: list[str] | None,
+    n_rows: int | None,
+    batch_size: int | None,
+) -> Iterator[pl.DataFrame]:
+    """
+    Apply the parts of a query that the IO source must
+    always apply itself, and yield the result in batches.
+    """
+    df = _conform_to_schema(df, schema)
+    if predicate is not None:
+        df = df.filter(predicate)
+    if with_columns is not None:
+        df = df.select(with_columns)
+    if n_rows is not None:
+        df = df.head(n_rows)
+    yield from df.iter_slices(batch_size or max(df.height, 1))
+
+
+def scan_spread_draws(
+    data: xr.DataTree,
+    group: str = "posterior",
+    var_names: Iterable[str] | None = None,
+    filter_vars: str | None = None,
+) -> pl.LazyFrame:
+    """
+    Lazily convert an [`xarray.DataTree`][] group to a polars
+    LazyFrame of tidy (spread) draws.
+
+    Nothing is converted until the LazyFrame is collected.
+    Filters on the chain, draw and other index columns are pushed
+    down into [`xarray.Dataset.isel`][] before any data are
+    converted, and only the variable columns that the query
+    selects are converted.
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    Returns
+    -------
+    pl.LazyFrame
+        LazyFrame that collects to the same DataFrame as
+        [`spread_draws`][polarbayes.spread.spread_draws]
+        with `combined=False`.
+    """
+    extracted = _extract(
+        data,
+        group=group,
+        combined=False,
+        var_names=var_names,
+        filter_vars=filter_vars,
+        keep_dataset=True,
+    )
+
+    def _convert(
+        data: xr.Dataset, columns: Iterable[str] | None = None
+    ) -> pl.DataFrame:
+        df, index_cols = _dataset_to_polars(data, columns=columns)
+        index_cols_ordered = order_index_column_names(index_cols)
+        return df.select(
+            cs.by_name(index_cols_ordered, require_all=True),
+            cs.exclude(index_cols_ordered),
+        )
+
+    schema = _convert(_empty_dataset(extracted)).schema
+
+    def source(
+        with_columns: list[str] | None,
+        predicate: pl.Expr | None,
+        n_rows: int | None,
+        batch_size: int | None,
+    ) -> Iterator[pl.DataFrame]:
+        selected = extracted.isel(
+            _pushdown(_coordinate_frames(extracted), predicate)
+        )
+        columns = None
+        if with_columns is not None:
+            columns = set(with_columns)
+            if predicate is not None:
+                columns |= set(predicate.meta.root_names())
+        yield from _conform(
+            _convert(selected, columns=columns),
+            pl.Schema(
+                {
+                    k: v
+                    for k, v in schema.items()
+                    if columns is None or k in columns
+                }
+            ),
+            predicate,
+            with_columns,
+            n_rows,
+            batch_size,
+        )
+
+    return register_io_source(source, schema=schema)
+
+
+def scan_gather_draws(
+    data: xr.DataTree,
+    group: str = "posterior",
+    var_names: Iterable[str] | None = None,
+    filter_vars: str | None = None,
+    value_name: str | None = None,
+    variable_name: str | None = None,
+) -> pl.LazyFrame:
+    """
+    Lazily convert an [`xarray.DataTree`][] group to a polars
+    LazyFrame of tidy (gathered) draws.
+
+    Nothing is converted until the LazyFrame is collected.
+    Filters on the chain, draw and other index columns are pushed
+    down into [`xarray.Dataset.isel`][], and filters on the variable
+    column restrict which variables are converted.
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    value_name
+        Name for the value column in the output LazyFrame.
+        If `None` (default), use `"value"`.
+
+    variable_name
+        Name for the variable column in the output LazyFrame.
+        If `None` (default), use `"variable"`.
+
+    Returns
+    -------
+    pl.LazyFrame
+        LazyFrame that collects to the same DataFrame as
+        [`gather_draws`][polarbayes.gather.gather_draws]
+        with `combined=False`.
+    """
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    if value_name is None:
+        value_name = VALUE_NAME
+    extracted = _extract(
+        data,
+        group=group,
+        combined=False,
+        var_names=var_names,
+        filter_vars=filter_vars,
+        keep_dataset=True,
+    )
+    schema = _gather_dataset(
+        _empty_dataset(extracted),
+        variable_name=variable_name,
+        value_name=value_name,
+    ).schema
+    all_vars = list(extracted.data_vars)
+
+    def source(
+        with_columns: list[str] | None,
+        predicate: pl.Expr | None,
+        n_rows: int | None,
+        batch_size: int | None,
+    ) -> Iterator[pl.DataFrame]:
+        frames = {
+            variable_name: pl.DataFrame({variable_name: all_vars}),
+            **_coordinate_frames(extracted),
+        }
+        selection = _pushdown(frames, predicate)
+        var_positions = selection.pop(variable_name, range(len(all_vars)))
+        # the selected variables may lack dimensions that the
+        # predicate filters on, whose rows it then rejects anyway
+        selected = extracted[[all_vars[i] for i in var_positions]].isel(
+            selection, missing_dims="ignore"
+        )
+        if selected.data_vars:
+            df = _gather_dataset(
+                selected, variable_name=variable_name, value_name=value_name
+            )
+        else:
+            df = pl.DataFrame(schema=schema)
+        yield from _conform(
+            df,
+            schema,
+            predicate,
+            with_columns,
+            n_rows,
+            batch_size,
+        )
+
+    return register_io_source(source, schema=schema)
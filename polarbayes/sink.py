@@ -0,0 +1,227 @@
+"""
+Stream tidy draws to Parquet or Arrow IPC files without
+materializing the full DataFrame in memory.
+"""
+
+import itertools
+from pathlib import Path
+from typing import Iterable, Iterator, Literal
+from urllib.parse import quote
+
+import numpy as np
+import polars as pl
+import xarray as xr
+from polars.io.plugins import register_io_source
+
+from polarbayes.gather import iter_gather_draws
+from polarbayes.schema import CHAIN_NAME, VARIABLE_NAME
+
+_EXTENSIONS = {"parquet": "parquet", "ipc": "arrow"}
+
+
+def _stream(
+    batches: Iterator[pl.DataFrame], schema: pl.Schema
+) -> pl.LazyFrame:
+    """
+    Wrap an iterator over DataFrames in a LazyFrame that pulls
+    one DataFrame at a time from the iterator when collected
+    or sunk.
+    """
+
+    def source(
+        with_columns: list[str] | None,
+        predicate: pl.Expr | None,
+        n_rows: int | None,
+        batch_size: int | None,
+    ) -> Iterator[pl.DataFrame]:
+        for batch in batches:
+            if predicate is not None:
+                batch = batch.filter(predicate)
+            if with_columns is not None:
+                batch = batch.select(with_columns)
+            if n_rows is not None:
+                batch = batch.head(n_rows)
+                n_rows -= batch.height
+            yield batch
+            if n_rows == 0:
+                return
+
+    return register_io_source(source, schema=schema)
+
+
+def _partition_path(path: Path, columns: list[str], key: tuple) -> Path:
+    """
+    Get the Hive-style directory for a partition, e.g.
+    `path/variable=mu/chain=0`.
+    """
+    return path.joinpath(
+        *(f"{col}={quote(str(k), safe='')}" for col, k in zip(columns, key))
+    )
+
+
+def sink_draws(
+    data: xr.DataTree,
+    path: str | Path,
+    group: str = "posterior",
+    combined: bool = True,
+    var_names: Iterable[str] | None = None,
+    filter_vars: str | None = None,
+    num_samples: int | None = None,
+    random_seed: int | np.random.Generator | None = None,
+    value_name: str | None = None,
+    variable_name: str | None = None,
+    format: Literal["parquet", "ipc"] = "parquet",
+    partition_by: Literal["variable", "chain"]
+    | Iterable[Literal["variable", "chain"]]
+    | None = None,
+    row_group_size: int | None = None,
+    max_rows: int | None = None,
+    compact: bool = False,
+) -> None:
+    """
+    Write tidy (gathered) draws from an [`xarray.DataTree`][] group
+    to Parquet or Arrow IPC, one batch at a time.
+
+    Draws are converted in the batches of
+    [`iter_gather_draws`][polarbayes.gather.iter_gather_draws]
+    and written out as they are converted, so the full gathered
+    DataFrame is never held in memory.
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    path
+        Path to write to. Without `partition_by`, a single file.
+        With `partition_by`, a directory of Hive-partitioned files
+        (e.g. `path/variable=mu/chain=0/part-00000.parquet`),
+        which must not already contain any files.
+
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    num_samples
+        `num_samples` parameter passed to [`arviz.extract`][].
+
+    random_seed
+        `random_seed` parameter passed to [`arviz.extract`][].
+
+    value_name
+        Name for the value column in the output.
+        If `None` (default), use `"value"`.
+
+    variable_name
+        Name for the variable column in the output.
+        If `None` (default), use `"variable"`.
+
+    format
+        File format to write, `"parquet"` (default) or `"ipc"`.
+
+    partition_by
+        `"variable"`, `"chain"`, both, or `None` (default) to
+        write a single file. Partition columns are also kept in
+        the files themselves, so that reading the output back
+        with [`polars.scan_parquet`][] or [`polars.scan_ipc`][]
+        yields the same schema as
+        [`gather_draws`][polarbayes.gather.gather_draws].
+
+    row_group_size
+        Maximum number of rows per Parquet row group. If `None`
+        (default), use the polars default. Only supported
+        for `format="parquet"`.
+
+    max_rows
+        `max_rows` parameter passed to
+        [`iter_gather_draws`][polarbayes.gather.iter_gather_draws],
+        bounding the number of rows converted at a time.
+
+    compact
+        `compact` parameter of
+        [`gather_draws`][polarbayes.gather.gather_draws].
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    ValueError
+        If the conversion yields no draws to write.
+    """
+    if format not in _EXTENSIONS:
+        raise ValueError(
+            f"Unknown format '{format}'. Expected 'parquet' or 'ipc'."
+        )
+    if row_group_size is not None and format != "parquet":
+        raise ValueError(
+            "row_group_size is only supported for format='parquet'."
+        )
+    if partition_by is None:
+        partition_by = []
+    elif isinstance(partition_by, str):
+        partition_by = [partition_by]
+    else:
+        partition_by = list(partition_by)
+    unknown = [x for x in partition_by if x not in ("variable", "chain")]
+    if unknown:
+        raise ValueError(
+            f"Cannot partition by {unknown}. "
+            "Expected 'variable' and/or 'chain'."
+        )
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    options = {} if format == "ipc" else dict(row_group_size=row_group_size)
+    path = Path(path)
+    if partition_by and path.is_dir() and any(path.iterdir()):
+        raise FileExistsError(
+            f"Cannot write partitioned draws to non-empty directory '{path}'."
+        )
+
+    batches = iter_gather_draws(
+        data,
+        group=group,
+        combined=combined,
+        var_names=var_names,
+        filter_vars=filter_vars,
+        num_samples=num_samples,
+        random_seed=random_seed,
+        value_name=value_name,
+        variable_name=variable_name,
+        by="chain" if partition_by == ["chain"] else "variable",
+        max_rows=max_rows,
+        compact=compact,
+    )
+
+    # all batches share a schema, so take it from the first
+    first = next(batches, None)
+    if first is None:
+        raise ValueError("No draws to write.")
+    batches = itertools.chain([first], batches)
+
+    if not partition_by:
+        lf = _stream(batches, first.schema)
+        getattr(lf, f"sink_{format}")(path, **options)
+        return
+
+    columns = [
+        variable_name if x == "variable" else CHAIN_NAME for x in partition_by
+    ]
+    for i, batch in enumerate(batches):
+        for key, part in batch.partition_by(
+            columns, as_dict=True, maintain_order=True
+        ).items():
+            directory = _partition_path(path, columns, key)
+            directory.mkdir(parents=True, exist_ok=True)
+            getattr(part, f"write_{format}")(
+                directory / f"part-{i:05d}.{_EXTENSIONS[format]}", **options
+            )
@@ -1,13 +1,14 @@
-from typing import Iterable
+from typing import Iterable, Literal
 
-import arviz_base as az
 import numpy as np
 import pandas as pd
 import polars as pl
 import polars.selectors as cs
 import xarray as xr
 
+from polarbayes.instrument import _record_stage
 from polarbayes.schema import order_index_column_names
+from polarbayes.subsample import _extract
 
 
 def spread_draws_to_pandas_(
@@ -56,7 +57,10 @@ def spread_draws_to_pandas_(
        `var_names` or `filter_vars`, with columns containing
        the associated values of those variables.
     """
-    return az.extract(
+    extracted = _record_stage(
+        "spread_draws",
+        "extract",
+        _extract,
         data,
         group=group,
         combined=combined,
@@ -65,7 +69,125 @@ def spread_draws_to_pandas_(
         num_samples=num_samples,
         keep_dataset=True,
         random_seed=random_seed,
-    ).to_dataframe()
+    )
+    return _record_stage(
+        "spread_draws", "to_dataframe", extracted.to_dataframe
+    )
+
+
+def _dim_index_coords(data: xr.Dataset, dim: str) -> dict[str, pl.Series]:
+    """
+    Get the coordinate values that label each position along
+    a dimension of an [`xarray.Dataset`][], keyed by the name
+    of the index column they should populate.
+
+    Parameters
+    ----------
+    data
+        Dataset containing the dimension.
+
+    dim
+        Name of the dimension.
+
+    Returns
+    -------
+    dict[str, pl.Series]
+        One entry for a dimension with an ordinary index, one entry
+        per level for a dimension with a MultiIndex (e.g. the stacked
+        `"sample"` dimension created by [`arviz.extract`][]), and
+        an integer range for a dimension without an index, matching
+        the index that [`xarray.Dataset.to_dataframe`][] would build.
+        Values are converted from the pandas index, so that
+        extension dtypes such as categoricals are preserved.
+    """
+    index = data.indexes.get(dim)
+    if index is None:
+        return {dim: pl.Series(dim, np.arange(data.sizes[dim]))}
+    if isinstance(index, pd.MultiIndex):
+        return {
+            name: pl.Series(name, index.get_level_values(name))
+            for name in index.names
+        }
+    return {dim: pl.Series(dim, index)}
+
+
+def _index_positions(shape: tuple[int, ...], axis: int) -> np.ndarray:
+    """
+    Get the position along `axis` of each element of a C-ordered,
+    raveled array of the given shape.
+
+    Parameters
+    ----------
+    shape
+        Shape of the (unraveled) array.
+
+    axis
+        Axis along which to report positions.
+
+    Returns
+    -------
+    np.ndarray
+        One-dimensional integer array of length `prod(shape)`.
+    """
+    expand = [1] * len(shape)
+    expand[axis] = shape[axis]
+    return np.broadcast_to(
+        np.arange(shape[axis]).reshape(expand), shape
+    ).reshape(-1)
+
+
+def _dataset_to_polars(
+    data: xr.Dataset, columns: Iterable[str] | None = None
+) -> tuple[pl.DataFrame, list[str]]:
+    """
+    Convert an [`xarray.Dataset`][] directly to a polars DataFrame,
+    without an intermediate pandas DataFrame.
+
+    Rows, index columns and value columns match those of
+    `pl.DataFrame(data.to_dataframe().reset_index())`, but values
+    are raveled straight from the underlying NumPy arrays and index
+    columns are built by gathering each dimension's coordinate values
+    at integer positions.
+
+    Parameters
+    ----------
+    data
+        Dataset to convert.
+
+    columns
+        Names of the (non-index) variables to convert. Rows are
+        unaffected, as index columns always span all dimensions
+        of `data`. If `None` (default), convert all of them.
+
+    Returns
+    -------
+    tuple[pl.DataFrame, list[str]]
+        The DataFrame, with index columns first, and the
+        (unordered) names of its index columns.
+    """
+    if columns is not None:
+        columns = set(columns)
+    dims = {dim: data.sizes[dim] for dim in data.dims}
+    shape = tuple(dims.values())
+    index = {}
+    for axis, dim in enumerate(dims):
+        positions = _index_positions(shape, axis)
+        for name, values in _dim_index_coords(data, dim).items():
+            index[name] = values.gather(positions)
+    columns = {
+        name: pl.Series(name, variable.set_dims(dims).values.reshape(-1))
+        for name, variable in data.variables.items()
+        if name not in data.xindexes and (columns is None or name in columns)
+    }
+    return pl.DataFrame({**index, **columns}), list(index)
+
+
+def _empty_dataset(data: xr.Dataset) -> xr.Dataset:
+    """
+    Select no positions along any dimension of a Dataset,
+    to compute output schemas without converting any data.
+    """
+    return data.isel({dim: slice(0, 0) for dim in data.dims})
 
 
 def spread_draws_and_get_index_cols(
@@ -76,6 +198,7 @@ def spread_draws_and_get_index_cols(
     filter_vars: str | None = None,
     num_samples: int | None = None,
     random_seed: int | np.random.Generator | None = None,
+    engine: Literal["native", "pandas"] = "native",
 ) -> tuple[pl.DataFrame, tuple]:
     """
     Convert an [`xarray.DataTree`][] group to a polars
@@ -106,6 +229,12 @@ def spread_draws_and_get_index_cols(
     random_seed
         `random_seed` parameter passed to [`arviz.extract`][].
 
+    engine
+        Conversion engine. `"native"` (default) builds the polars
+        DataFrame directly from the extracted arrays. `"pandas"`
+        converts via [`xarray.Dataset.to_dataframe`][] and is kept
+        as a fallback.
+
     Returns
     -------
     tuple[pl.DataFrame, tuple]
@@ -119,8 +248,7 @@ def spread_draws_and_get_index_cols(
         columns that index array-valued variables.
     """
 
-    df = spread_draws_to_pandas_(
-        data,
+    extract_kwargs = dict(
         group=group,
         combined=combined,
         var_names=var_names,
@@ -128,7 +256,32 @@ def spread_draws_and_get_index_cols(
         num_samples=num_samples,
         random_seed=random_seed,
     )
-    df, index_cols = pl.DataFrame(df.reset_index()), df.index.names
+    if engine == "native":
+        extracted = _record_stage(
+            "spread_draws",
+            "extract",
+            _extract,
+            data,
+            keep_dataset=True,
+            **extract_kwargs,
+        )
+        df, index_cols = _record_stage(
+            "spread_draws", "to_polars", _dataset_to_polars, extracted
+        )
+    elif engine == "pandas":
+        df = spread_draws_to_pandas_(data, **extract_kwargs)
+        df, index_cols = (
+            _record_stage(
+                "spread_draws",
+                "from_pandas",
+                lambda: pl.DataFrame(df.reset_index()),
+            ),
+            df.index.names,
+        )
+    else:
+        raise ValueError(
+            f"Unknown engine '{engine}'. Expected 'native' or 'pandas'."
+        )
     index_cols_ordered = order_index_column_names(index_cols)
 
     return (
@@ -148,6 +301,7 @@ def spread_draws(
     filter_vars: str | None = None,
     num_samples: int | None = None,
     random_seed: int | np.random.Generator | None = None,
+    engine: Literal["native", "pandas"] = "native",
 ) -> pl.DataFrame:
     """
     Convert an [`xarray.DataTree`][] group to a polars
@@ -172,11 +326,21 @@ def spread_draws(
         `var_names` parameter passed to [`arviz.extract`][].
 
     num_samples
-        `num_samples` parameter passed to [`arviz.extract`][].
+        `num_samples` parameter of [`arviz.extract`][]. Samples are
+        drawn as by [`arviz.extract`][], but before any data are
+        stacked, so only the chains and draws of the selected
+        samples are read, and the result is the same. See also
+        [`subsample_draws`][polarbayes.subsample.subsample_draws].
 
     random_seed
         `random_seed` parameter passed to [`arviz.extract`][].
 
+    engine
+        Conversion engine. `"native"` (default) builds the polars
+        DataFrame directly from the extracted arrays. `"pandas"`
+        converts via [`xarray.Dataset.to_dataframe`][] and is kept
+        as a fallback.
+
     Returns
     -------
     pl.DataFrame
@@ -195,5 +359,133 @@ def spread_draws(
         filter_vars=filter_vars,
         num_samples=num_samples,
         random_seed=random_seed,
+        engine=engine,
     )
     return result
+
+
+def spread_draws_by_dims(
+    data: xr.DataTree,
+    group: str = "posterior",
+    combined: bool = True,
+    var_names: Iterable[str] | None = None,
+    filter_vars: str | None = None,
+    num_samples: int | None = None,
+    random_seed: int | np.random.Generator | None = None,
+) -> dict[tuple[str, ...], pl.DataFrame]:
+    """
+    Convert an [`xarray.DataTree`][] group to polars DataFrames
+    of tidy (spread) draws, one per distinct set of index columns
+    among the selected variables.
+
+    Unlike [`spread_draws`][polarbayes.spread.spread_draws], variables
+    are never broadcast against dimensions they do not have, so the
+    total number of output values equals the number of stored values.
+    All variables are extracted jointly, so every DataFrame contains
+    the same draws.
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    num_samples
+        `num_samples` parameter passed to [`arviz.extract`][].
+
+    random_seed
+        `random_seed` parameter passed to [`arviz.extract`][].
+
+    Returns
+    -------
+    dict[tuple[str, ...], pl.DataFrame]
+        Mapping from a tuple of ordered index column names to the
+        DataFrame of tidy draws of all variables indexed by exactly
+        those columns. Each DataFrame is laid out as by
+        [`spread_draws`][polarbayes.spread.spread_draws].
+        Pass the result to
+        [`join_spread_draws`][polarbayes.spread.join_spread_draws]
+        to broadcast the DataFrames against each other on demand.
+    """
+    extracted = _extract(
+        data,
+        group=group,
+        combined=combined,
+        var_names=var_names,
+        filter_vars=filter_vars,
+        num_samples=num_samples,
+        keep_dataset=True,
+        random_seed=random_seed,
+    )
+    var_names_by_dims = {}
+    for var, variable in extracted.data_vars.items():
+        var_names_by_dims.setdefault(frozenset(variable.dims), []).append(var)
+
+    result = {}
+    for var_names_with_dims in var_names_by_dims.values():
+        df, index_cols = _dataset_to_polars(extracted[var_names_with_dims])
+        index_cols_ordered = order_index_column_names(index_cols)
+        result[tuple(index_cols_ordered)] = df.select(
+            cs.by_name(index_cols_ordered, require_all=True),
+            cs.exclude(index_cols_ordered),
+        )
+    return result
+
+
+def join_spread_draws(
+    frames: dict[tuple[str, ...], pl.DataFrame | pl.LazyFrame],
+) -> pl.LazyFrame:
+    """
+    Lazily broadcast the output of
+    [`spread_draws_by_dims`][polarbayes.spread.spread_draws_by_dims]
+    into a single frame of tidy (spread) draws.
+
+    DataFrames are joined on the columns they share (at least the
+    chain and draw columns, plus any other shared index columns and
+    the coordinates that depend on them), starting from those with
+    the most index columns. Nothing is broadcast until
+    the result is collected, and filters or selections applied to
+    the result beforehand are pushed down into the joins.
+
+    Parameters
+    ----------
+    frames
+        Mapping from a tuple of index column names to a DataFrame
+        or LazyFrame containing those index columns.
+
+    Returns
+    -------
+    pl.LazyFrame
+        LazyFrame with the same columns as
+        [`spread_draws`][polarbayes.spread.spread_draws] on the same
+        variables, although rows and variable columns are not
+        guaranteed to be in the same order.
+    """
+    ordered = sorted(frames.items(), key=lambda item: -len(item[0]))
+    (index_cols, result), *rest = ordered
+    index_cols = list(index_cols)
+    result = result.lazy()
+    for frame_index_cols, frame in rest:
+        frame = frame.lazy()
+        result_cols = result.collect_schema().names()
+        on = [
+            col for col in frame.collect_schema().names() if col in result_cols
+        ]
+        result = result.join(frame, on=on, how="inner")
+        index_cols += [col for col in frame_index_cols if col not in on]
+    index_cols_ordered = order_index_column_names(index_cols)
+    return result.select(
+        cs.by_name(index_cols_ordered, require_all=True),
+        cs.exclude(index_cols_ordered),
+    )
@@ -0,0 +1,256 @@
+"""
+Conversion of draws to a star schema: a purely numeric table of
+draws with small lookup tables of coordinate values.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable
+
+import numpy as np
+import polars as pl
+import xarray as xr
+
+from polarbayes.gather import _gather_dataset, _variable_dims_and_coords
+from polarbayes.instrument import _record_stage
+from polarbayes.schema import (
+    CHAIN_NAME,
+    DRAW_NAME,
+    VALUE_NAME,
+    VARIABLE_NAME,
+    order_index_column_names,
+)
+from polarbayes.subsample import _extract
+
+# suffix of the name of the id column that replaces a dimension's
+# index columns, or the variable column, in the table of draws
+ID_SUFFIX = "_id"
+
+
+@dataclass(frozen=True)
+class StarDraws:
+    """
+    Tidy (gathered) draws in a star schema, as returned by
+    [`gather_draws_star`][polarbayes.star.gather_draws_star].
+
+    Attributes
+    ----------
+    facts
+        Table of draws with one row per row of the output of
+        [`gather_draws`][polarbayes.gather.gather_draws], in the same
+        order. The chain and draw columns hold their values, and the
+        index columns of every other dimension and the variable
+        column are replaced by a single unsigned integer id column
+        each, e.g. `"school_id"` and `"variable_id"`, holding the
+        position of each row's coordinate value along its dimension
+        and of its variable in the group. Ids are null for the rows
+        of variables that are not indexed by a dimension.
+
+    lookups
+        Mapping from each id column name to its lookup table: the
+        id column, holding every id once in increasing order,
+        followed by the index columns (or the variable column) that
+        it replaces.
+
+    variable_name
+        Name of the variable column of the labeled draws.
+
+    value_name
+        Name of the value column.
+    """
+
+    facts: pl.DataFrame
+    lookups: dict[str, pl.DataFrame]
+    variable_name: str = VARIABLE_NAME
+    value_name: str = VALUE_NAME
+
+    def labeled(self) -> pl.LazyFrame:
+        """
+        Join the lookup tables back onto the table of draws.
+
+        Returns
+        -------
+        pl.LazyFrame
+            A LazyFrame that, when collected, is identical to the
+            output of [`gather_draws`][polarbayes.gather.gather_draws]
+            called with the same arguments. Select only the columns
+            needed before collecting, to skip joining the other
+            lookup tables.
+        """
+        result = self.facts.lazy()
+        for id_name, lookup in self.lookups.items():
+            result = result.join(
+                lookup.lazy(),
+                on=id_name,
+                how="left",
+                maintain_order="left",
+            ).drop(id_name)
+        index_cols = order_index_column_names(
+            name
+            for name in result.collect_schema().names()
+            if name not in (self.variable_name, self.value_name)
+        )
+        return result.select(*index_cols, self.variable_name, self.value_name)
+
+
+def _id_dtype(n: int) -> pl.DataType:
+    """
+    Get the smallest unsigned integer dtype that holds the ids
+    `0` to `n - 1`.
+    """
+    for dtype, np_dtype in (
+        (pl.UInt8, np.uint8),
+        (pl.UInt16, np.uint16),
+    ):
+        if n - 1 <= np.iinfo(np_dtype).max:
+            return dtype
+    return pl.UInt32
+
+
+def gather_draws_star(
+    data: xr.DataTree,
+    group: str = "posterior",
+    combined: bool = True,
+    var_names: Iterable[str] | None = None,
+    filter_vars: str | None = None,
+    num_samples: int | None = None,
+    random_seed: int | np.random.Generator | None = None,
+    value_name: str | None = None,
+    variable_name: str | None = None,
+) -> StarDraws:
+    """
+    Convert an [`xarray.DataTree`][] group to tidy (gathered) draws
+    in a star schema: a purely numeric table of draws, in which each
+    dimension other than the chain and draw dimensions is encoded as
+    an integer id column, and small lookup tables mapping ids to
+    coordinate values and variable names.
+
+    The output of [`gather_draws`][polarbayes.gather.gather_draws]
+    repeats the coordinate values and variable name of each cell
+    on every one of its rows. Here they are stored once each, in
+    the lookup tables, and only joined back where labels are needed,
+    e.g. after filtering or aggregating by id.
+
+    Parameters
+    ----------
+    data
+        Data to convert.
+
+    group
+        `group` parameter passed to [`arviz.extract`][].
+
+    combined
+        `combined` parameter passed to [`arviz.extract`][].
+
+    var_names
+        `var_names` parameter passed to [`arviz.extract`][].
+
+    filter_vars
+        `filter_vars` parameter passed to [`arviz.extract`][].
+
+    num_samples
+        `num_samples` parameter of
+        [`gather_draws`][polarbayes.gather.gather_draws].
+
+    random_seed
+        `random_seed` parameter passed to [`arviz.extract`][].
+
+    value_name
+        Name for the value column. If `None` (default),
+        use `"value"`.
+
+    variable_name
+        Name for the variable column of the labeled draws, whose
+        id column is named with an `"_id"` suffix. If `None`
+        (default), use `"variable"`.
+
+    Returns
+    -------
+    StarDraws
+        The table of draws and its lookup tables. Call
+        [`labeled`][polarbayes.star.StarDraws.labeled] to join them
+        into the output of
+        [`gather_draws`][polarbayes.gather.gather_draws].
+
+    Raises
+    ------
+    ValueError
+        If the name of an id column is already the name of another
+        column.
+    """
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    if value_name is None:
+        value_name = VALUE_NAME
+    extracted = _record_stage(
+        "gather_draws_star",
+        "extract",
+        _extract,
+        data,
+        group=group,
+        combined=combined,
+        var_names=var_names,
+        filter_vars=filter_vars,
+        num_samples=num_samples,
+        keep_dataset=True,
+        random_seed=random_seed,
+    )
+    facts = _record_stage(
+        "gather_draws_star",
+        "gather",
+        _gather_dataset,
+        extracted,
+        variable_name=variable_name,
+        value_name=value_name,
+        encode=True,
+    )
+    _, coords = _variable_dims_and_coords(extracted)
+    dim_cols = {}
+    for name in order_index_column_names(coords):
+        dim_cols.setdefault(coords[name][0], []).append(name)
+    # chain and draw stay values, so that draws can be filtered and
+    # matched across conversions without a lookup
+    encoded = {
+        dim: names
+        for dim, names in dim_cols.items()
+        if CHAIN_NAME not in names and DRAW_NAME not in names
+    }
+    id_names = {
+        f"{dim}{ID_SUFFIX}": names for dim, names in encoded.items()
+    } | {f"{variable_name}{ID_SUFFIX}": [variable_name]}
+    for id_name in id_names:
+        if id_name in facts.columns:
+            raise ValueError(
+                f"Id column name '{id_name}' is already the name of "
+                "another column."
+            )
+
+    lookups = {}
+    columns = []
+    for name in facts.columns:
+        id_name = next(
+            (k for k, names in id_names.items() if name == names[0]), None
+        )
+        if id_name is None:
+            # further levels of an encoded dimension share its id
+            if not any(name in names for names in id_names.values()):
+                columns.append(pl.col(name))
+            continue
+        labels = (
+            [coords[level][1].alias(level) for level in id_names[id_name]]
+            if name != variable_name
+            else [pl.Series(variable_name, list(extracted.data_vars))]
+        )
+        dtype = _id_dtype(len(labels[0]))
+        lookups[id_name] = pl.DataFrame(
+            [
+                pl.Series(id_name, np.arange(len(labels[0]))).cast(dtype),
+                *labels,
+            ]
+        )
+        columns.append(pl.col(name).cast(dtype).alias(id_name))
+    return StarDraws(
+        facts=facts.select(columns),
+        lookups=lookups,
+        variable_name=variable_name,
+        value_name=value_name,
+    )
@@ -0,0 +1,183 @@
+"""
+Subsampling of draws that selects sample positions before touching
+the data.
+"""
+
+from typing import Iterable
+
+import arviz_base as az
+import numpy as np
+import polars as pl
+import xarray as xr
+from arviz_base.validate import validate_sample_dims
+
+from polarbayes.schema import CHAIN_NAME, DRAW_NAME
+
+
+def _sample_indices(
+    n_samples: int,
+    num_samples: int,
+    random_seed: int | np.random.Generator | None,
+) -> np.ndarray:
+    """
+    Draw the positions of a subsample of combined samples exactly as
+    [`arviz.extract`][] does, so that a seed selects the same draws.
+    """
+    if random_seed is None:
+        rng = np.random.default_rng()
+    elif isinstance(random_seed, (int, np.integer)):
+        rng = np.random.default_rng(random_seed)
+    elif isinstance(random_seed, np.random.Generator):
+        rng = random_seed
+    else:
+        raise ValueError(f"Invalid random_seed value: {random_seed}")
+    return rng.choice(np.arange(n_samples), size=num_samples, replace=False)
+
+
+def _sample_positions(
+    dataset: xr.Dataset,
+    num_samples: int,
+    random_seed: int | np.random.Generator | None,
+) -> tuple[list[str], list[np.ndarray], np.ndarray]:
+    """
+    Draw the samples that [`arviz.extract`][] would select from
+    a group, without stacking it.
+
+    Returns the sample dimensions, the sorted positions along each
+    of them that the selected samples need, and the indices of the
+    selected samples among the stacked samples of those positions.
+    """
+    sample_dims = validate_sample_dims(None, data=dataset)
+    shape = tuple(dataset.sizes[dim] for dim in sample_dims)
+    indices = _sample_indices(int(np.prod(shape)), num_samples, random_seed)
+    # stacking orders samples as in C order over the sample dimensions
+    positions = np.unravel_index(indices, shape)
+    needed = [np.unique(p) for p in positions]
+    reduced_indices = np.ravel_multi_index(
+        [np.searchsorted(n, p) for n, p in zip(needed, positions)],
+        tuple(len(n) for n in needed),
+    )
+    return sample_dims, needed, reduced_indices
+
+
+def _extract_samples(
+    dataset: xr.Dataset,
+    sample_dims: list[str],
+    needed: list[np.ndarray],
+    reduced_indices: np.ndarray,
+    **kwargs,
+) -> xr.Dataset | xr.DataArray:
+    """
+    Extract the samples drawn by `_sample_positions` from a group,
+    reducing it to the positions they need before stacking it.
+    """
+    reduced = dataset.isel(dict(zip(sample_dims, needed)))
+    extracted = az.extract(reduced, sample_dims=sample_dims, **kwargs)
+    sample_dim = "sample" if len(sample_dims) > 1 else sample_dims[0]
+    return extracted.isel({sample_dim: reduced_indices})
+
+
+def _extract(
+    data: xr.DataTree | xr.Dataset,
+    group: str = "posterior",
+    combined: bool = True,
+    var_names: Iterable[str] | None = None,
+    filter_vars: str | None = None,
+    num_samples: int | None = None,
+    keep_dataset: bool = False,
+    random_seed: int | np.random.Generator | None = None,
+) -> xr.Dataset | xr.DataArray:
+    """
+    Drop-in replacement for [`arviz.extract`][] that subsamples
+    before stacking the sample dimensions.
+
+    [`arviz.extract`][] stacks the chain and draw dimensions of all
+    selected variables into a combined sample dimension, and only
+    then selects `num_samples` samples from it. Here the sample
+    positions are drawn first, with the same random number calls,
+    the group is reduced to the chains and draws they need with
+    [`xarray.Dataset.isel`][] (which only reads those slices of data
+    opened lazily from disk), and only the reduced group is stacked.
+    The result is identical to that of [`arviz.extract`][].
+    """
+    kwargs = dict(
+        combined=combined,
+        var_names=var_names,
+        filter_vars=filter_vars,
+        keep_dataset=keep_dataset,
+    )
+    if num_samples is None or not combined:
+        return az.extract(
+            data,
+            group=group,
+            num_samples=num_samples,
+            random_seed=random_seed,
+            **kwargs,
+        )
+    dataset = az.convert_to_dataset(data, group=group)
+    return _extract_samples(
+        dataset,
+        *_sample_positions(dataset, num_samples, random_seed),
+        **kwargs,
+    )
+
+
+def subsample_draws(
+    draws: pl.DataFrame | pl.LazyFrame,
+    num_samples: int,
+    random_seed: int | np.random.Generator | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Subsample the draws of a data frame of tidy draws, keeping the
+    same draws for every variable.
+
+    Samples, i.e. distinct `("chain", "draw")` pairs sorted by
+    chain and then draw, are selected without replacement as by
+    [`arviz.extract`][], so a subsample of the full draws of a
+    DataTree group holds the same samples as a conversion of that
+    group with the same `num_samples` and integer `random_seed`.
+    Rows are then selected with a semi join on the chain and draw
+    columns, which keeps their order.
+
+    Parameters
+    ----------
+    draws
+        Data frame of tidy draws in the wide format of
+        [`spread_draws`][polarbayes.spread.spread_draws] or the long
+        format of [`gather_draws`][polarbayes.gather.gather_draws],
+        with `"chain"` and `"draw"` columns.
+
+    num_samples
+        Number of samples to keep.
+
+    random_seed
+        Seed or generator for the selection.
+
+    Returns
+    -------
+    pl.DataFrame | pl.LazyFrame
+        The rows of `draws` of the selected samples, in their
+        original order. A LazyFrame if `draws` is one, and a
+        DataFrame otherwise.
+    """
+    samples = (
+        draws.lazy()
+        .select(CHAIN_NAME, DRAW_NAME)
+        .unique()
+        .sort(CHAIN_NAME, DRAW_NAME)
+        .collect()
+    )
+    if num_samples > samples.height:
+        raise ValueError(
+            f"Cannot select {num_samples} samples out of {samples.height}."
+        )
+    selected = samples[
+        _sample_indices(samples.height, num_samples, random_seed)
+    ]
+    return draws.join(
+        selected.lazy() if isinstance(draws, pl.LazyFrame) else selected,
+        on=[CHAIN_NAME, DRAW_NAME],
+        how="semi",
+        nulls_equal=True,
+        maintain_order="left",
+    )
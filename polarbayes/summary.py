@@ -0,0 +1,298 @@
+"""
+Point and interval summaries of polars frames of draws. This module
+depends only on polars, so that it can be used without loading the
+dependencies needed to convert xarray data.
+"""
+
+from collections.abc import Sequence
+from typing import Literal
+
+import polars as pl
+from polars._typing import ColumnNameOrSelector
+
+from polarbayes.schema import (
+    CHAIN_NAME,
+    DRAW_NAME,
+    VALUE_NAME,
+    VARIABLE_NAME,
+)
+from polarbayes.unpivot import _default_index
+
+POINTS = ("mean", "median")
+INTERVALS = ("qi", "hdi")
+
+
+def _as_tuple(value) -> tuple:
+    if isinstance(value, (str, float, int)):
+        return (value,)
+    return tuple(value)
+
+
+def _point(column: str, point: str) -> pl.Expr:
+    if point == "mean":
+        return pl.col(column).mean()
+    return pl.col(column).median()
+
+
+def _interval(
+    column: str, interval: str, width: float
+) -> tuple[pl.Expr, pl.Expr]:
+    """
+    Get expressions for the lower and upper bounds of an interval
+    containing a fraction `width` of the draws of a column.
+    """
+    if interval == "qi":
+        return (
+            pl.col(column).quantile((1 - width) / 2, "linear"),
+            pl.col(column).quantile((1 + width) / 2, "linear"),
+        )
+    # highest density interval: the narrowest interval between two
+    # sorted draws that spans floor(width * n) draws, as in ArviZ
+    x = pl.col(column).drop_nulls().sort()
+    span = (x.len() * width).floor().cast(pl.Int64)
+    start = (x.shift(-span) - x).arg_min()
+    return x.get(start), x.get(start + span)
+
+
+def point_interval(
+    draws: pl.DataFrame | pl.LazyFrame,
+    columns: ColumnNameOrSelector
+    | Sequence[ColumnNameOrSelector]
+    | None = None,
+    by: ColumnNameOrSelector | Sequence[ColumnNameOrSelector] | None = None,
+    point: Literal["mean", "median"] | Sequence[str] = "median",
+    interval: Literal["qi", "hdi"] | Sequence[str] = "qi",
+    width: float | Sequence[float] = 0.95,
+    value_name: str | None = None,
+    variable_name: str | None = None,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Summarize draws with point estimates and intervals, as
+    tidybayes's `point_interval`.
+
+    All combinations of point estimates, interval types and widths
+    are computed from a single grouped aggregation of the draws.
+    Given a [`polars.LazyFrame`][], the summary is returned as a
+    LazyFrame, which can be collected with the streaming engine
+    (`collect(engine="streaming")`) to summarize draws larger than
+    memory. For approximate quantile intervals computed batch by
+    batch, see [`QuantileSketch`][polarbayes.sketch.QuantileSketch].
+
+    Parameters
+    ----------
+    draws
+        Data frame of draws, in the long format of
+        [`gather_draws`][polarbayes.gather.gather_draws] or the wide
+        format of [`spread_draws`][polarbayes.spread.spread_draws].
+        Treated as long format if it has a column named
+        `variable_name`.
+
+    columns
+        Columns of draws to summarize. If `None` (default),
+        summarize the value column for long format, and all
+        columns that are not index columns for wide format.
+
+    by
+        Columns to group draws by. If `None` (default), group by
+        all index columns other than `"chain"` and `"draw"`: for
+        long format, all columns other than the value column
+        (including the variable column), and for wide format, any
+        string, categorical or enum columns.
+
+    point
+        Point estimate, or sequence of point estimates, to compute:
+        `"median"` (default) or `"mean"`.
+
+    interval
+        Interval type, or sequence of interval types, to compute:
+        `"qi"` (default) for quantile intervals with equal tail
+        probabilities, or `"hdi"` for highest density intervals.
+
+    width
+        Probability mass, or sequence of probability masses,
+        of the intervals. Default `0.95`.
+
+    value_name
+        Name of the value column of long format frames.
+        If `None` (default), use `"value"`.
+
+    variable_name
+        Name of the variable column of long format frames.
+        If `None` (default), use `"variable"`.
+
+    Returns
+    -------
+    pl.DataFrame | pl.LazyFrame
+        One row per group and combination of width, point estimate
+        and interval type, with the grouping columns, then the point
+        estimate and the `lower` and `upper` bounds of the interval
+        (or, when summarizing several columns, `"{column}"`,
+        `"{column}_lower"` and `"{column}_upper"` for each), then
+        `width`, `point` and `interval` columns. A LazyFrame if
+        `draws` is one, and a DataFrame otherwise.
+
+    Raises
+    ------
+    ValueError
+        If a point estimate or interval type is unknown, or
+        a width is not strictly between 0 and 1.
+    """
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    if value_name is None:
+        value_name = VALUE_NAME
+    points, intervals, widths = map(_as_tuple, (point, interval, width))
+    for name in points:
+        if name not in POINTS:
+            raise ValueError(
+                f"Unknown point estimate '{name}'. "
+                "Expected 'mean' or 'median'."
+            )
+    for name in intervals:
+        if name not in INTERVALS:
+            raise ValueError(
+                f"Unknown interval '{name}'. Expected 'qi' or 'hdi'."
+            )
+    for value in widths:
+        if not 0 < value < 1:
+            raise ValueError(
+                f"Interval widths must be between 0 and 1, not {value}."
+            )
+
+    lazy = draws.lazy()
+    schema = lazy.collect_schema()
+    long = variable_name in schema
+    if by is None:
+        by = [
+            name
+            for name in lazy.select(
+                _default_index(long, variable_name, value_name)
+            )
+            .collect_schema()
+            .names()
+            if name not in (CHAIN_NAME, DRAW_NAME)
+        ] + ([variable_name] if long else [])
+    else:
+        by = lazy.select(by).collect_schema().names()
+    if columns is None:
+        columns = [
+            name
+            for name in schema.names()
+            if name not in (*by, CHAIN_NAME, DRAW_NAME)
+        ]
+    else:
+        columns = lazy.select(columns).collect_schema().names()
+
+    def names(column: str) -> tuple[str, str]:
+        # names of the lower and upper bounds of a column
+        if len(columns) == 1 and column == value_name:
+            return "lower", "upper"
+        return f"{column}_lower", f"{column}_upper"
+
+    # aggregate everything in one pass, under unique temporary
+    # names, then split into one frame per combination
+    aggregations = {}
+    for column in columns:
+        for name in points:
+            aggregations[column, name] = _point(column, name)
+        for name in intervals:
+            for value in widths:
+                lower, upper = _interval(column, name, value)
+                aggregations[column, name, value, "lower"] = lower
+                aggregations[column, name, value, "upper"] = upper
+    keys = {key: f"__{i}" for i, key in enumerate(aggregations)}
+    aggregated = [expr.alias(keys[key]) for key, expr in aggregations.items()]
+    summary = (
+        lazy.group_by(by, maintain_order=True).agg(aggregated)
+        if by
+        else lazy.select(aggregated)
+    )
+    result = pl.concat(
+        [
+            summary.select(
+                *by,
+                *(
+                    pl.col(keys[column, point_name]).alias(column)
+                    for column in columns
+                ),
+                *(
+                    pl.col(keys[column, interval_name, value, bound]).alias(
+                        name
+                    )
+                    for column in columns
+                    for bound, name in zip(("lower", "upper"), names(column))
+                ),
+                width=pl.lit(value),
+                point=pl.lit(point_name),
+                interval=pl.lit(interval_name),
+            )
+            for value in widths
+            for point_name in points
+            for interval_name in intervals
+        ]
+    )
+    return result if isinstance(draws, pl.LazyFrame) else result.collect()
+
+
+def median_qi(
+    draws: pl.DataFrame | pl.LazyFrame,
+    width: float | Sequence[float] = 0.95,
+    **kwargs,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Summarize draws by their median and quantile intervals.
+    Shorthand for
+    [`point_interval`][polarbayes.summary.point_interval]
+    with `point="median"` and `interval="qi"`.
+    """
+    return point_interval(
+        draws, point="median", interval="qi", width=width, **kwargs
+    )
+
+
+def mean_qi(
+    draws: pl.DataFrame | pl.LazyFrame,
+    width: float | Sequence[float] = 0.95,
+    **kwargs,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Summarize draws by their mean and quantile intervals.
+    Shorthand for
+    [`point_interval`][polarbayes.summary.point_interval]
+    with `point="mean"` and `interval="qi"`.
+    """
+    return point_interval(
+        draws, point="mean", interval="qi", width=width, **kwargs
+    )
+
+
+def median_hdi(
+    draws: pl.DataFrame | pl.LazyFrame,
+    width: float | Sequence[float] = 0.95,
+    **kwargs,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Summarize draws by their median and highest density intervals.
+    Shorthand for
+    [`point_interval`][polarbayes.summary.point_interval]
+    with `point="median"` and `interval="hdi"`.
+    """
+    return point_interval(
+        draws, point="median", interval="hdi", width=width, **kwargs
+    )
+
+
+def mean_hdi(
+    draws: pl.DataFrame | pl.LazyFrame,
+    width: float | Sequence[float] = 0.95,
+    **kwargs,
+) -> pl.DataFrame | pl.LazyFrame:
+    """
+    Summarize draws by their mean and highest density intervals.
+    Shorthand for
+    [`point_interval`][polarbayes.summary.point_interval]
+    with `point="mean"` and `interval="hdi"`.
+    """
+    return point_interval(
+        draws, point="mean", interval="hdi", width=width, **kwargs
+    )
@@ -0,0 +1,150 @@
+"""
+Unpivoting of polars frames of spread draws. This module depends
+only on polars, so that it can be used without loading the
+dependencies needed to convert xarray data.
+"""
+
+from collections.abc import Sequence
+from typing import Iterable
+
+import polars as pl
+import polars.selectors as cs
+from polars._typing import ColumnNameOrSelector
+
+from polarbayes.instrument import _record_stage
+from polarbayes.schema import (
+    CHAIN_NAME,
+    DRAW_NAME,
+    VALUE_NAME,
+    VARIABLE_NAME,
+    order_index_column_names,
+)
+
+
+def _assert_not_in_index_columns(
+    arg_name: str, arg_value: str, index_columns: Iterable[str]
+) -> None:
+    """
+    Assert that a specified value is not present in a set of index columns,
+    with an informative error message.
+
+    Parameters
+    ----------
+    arg_name
+        The name of the argument being validated.
+    arg_value
+        The value of the argument to check against index columns.
+    index_columns
+        Iterable of index column names to check against.
+
+    Returns
+    -------
+    None
+       If validation passes.
+
+    Raises
+    ------
+    ValueError
+        If `arg_value` is found in `index_columns`.
+    """
+    if arg_value in index_columns:
+        raise ValueError(
+            f"Specified {arg_name}='{arg_value}' for the output data frame "
+            f"but there is an index column named '{arg_value}' "
+            f"in the input data frame. Either specify a different "
+            f" {arg_name} or rename the index column named '{arg_value}'."
+        )
+    return None
+
+
+def _default_index(
+    long: bool, variable_name: str, value_name: str
+) -> cs.Selector:
+    """
+    Select the index columns of a data frame of draws whose
+    index columns are not known: all columns other than the
+    variable and value columns of a long format frame, and the
+    chain, draw and any string-like columns of a wide format frame.
+    """
+    if long:
+        return cs.exclude(variable_name, value_name)
+    return (
+        cs.by_name(CHAIN_NAME, DRAW_NAME, require_all=False)
+        | cs.string()
+        | cs.categorical()
+        | cs.enum()
+    )
+
+
+def gather_variables(
+    data: pl.LazyFrame | pl.DataFrame,
+    index: ColumnNameOrSelector | Sequence[ColumnNameOrSelector] | None = None,
+    value_name: str | None = None,
+    variable_name: str | None = None,
+):
+    """
+    Gather variable columns into key-value pairs.
+    Light wrapper of [`pl.DataFrame.unpivot`][polars.DataFrame.unpivot]
+    designed for use with
+    [`spread_draws`][polarbayes.spread.spread_draws] output.
+
+    Parameters
+    ----------
+    data
+        Input DataFrame to (un)pivot from wide to long format.
+    index
+        Polars expression selecting mandatory or optional columns to
+        index the gather. Passed as the `index` argument to
+        [`pl.DataFrame.unpivot`][polars.DataFrame.unpivot].
+        If `None` (default), use the columns
+        `["chain", "draw"]` if they are present. Those are the MCMC
+        index columns created when
+        [`spread_draws`][polarbayes.spread.spread_draws] is called on
+        a compatible [`xarray.DataTree`][]
+
+    value_name
+        Name for the value column in the output DataFrame.
+        If `None` (default), use `"value"`.
+
+    variable_name
+        Name for the variable column in the output DataFrame.
+        If `None` (default), use `"variable"`.
+
+    Returns
+    -------
+    pl.LazyFrame | pl.DataFrame
+        Unpivoted (pivoted longer) tidy data frame with index columns plus
+        variable name and value columns.
+
+    Raises
+    ------
+    ValueError
+        If `value_name` or `variable_name` conflicts with requested
+        index columns.
+    """
+    if variable_name is None:
+        variable_name = VARIABLE_NAME
+    if value_name is None:
+        value_name = VALUE_NAME
+    if index is None:
+        index = cs.by_name(CHAIN_NAME, DRAW_NAME, require_all=False)
+
+    index_names = order_index_column_names(
+        data.select(index).collect_schema().names()
+    )
+
+    # more informative error message than `unpivot()` gives on its own
+    [
+        _assert_not_in_index_columns(k, v, index_names)
+        for k, v in dict(
+            value_name=value_name, variable_name=variable_name
+        ).items()
+    ]
+
+    return _record_stage(
+        "gather_variables",
+        "unpivot",
+        lambda: data.unpivot(
+            index=index, variable_name=variable_name, value_name=value_name
+        ).select(index_names + [variable_name, value_name]),  # order columns
+    )
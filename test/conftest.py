@@ -0,0 +1,72 @@
+import arviz_base as az
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+
+@pytest.fixture(scope="session")
+def eight_schools_data():
+    return az.load_arviz_data("non_centered_eight")
+
+
+@pytest.fixture(scope="session")
+def irregular_data():
+    """
+    Posterior with transposed variables, a dimension without
+    coordinates (`k`), and integer and boolean variables.
+    """
+    rng = np.random.default_rng(3125)
+    return xr.DataTree.from_dict(
+        {
+            "posterior": xr.Dataset(
+                {
+                    "a": (("chain", "draw", "k"), rng.random((2, 3, 4))),
+                    "b": (("k", "chain", "draw"), rng.random((4, 2, 3))),
+                    "c": (
+                        ("chain", "draw", "g"),
+                        rng.integers(5, size=(2, 3, 2)),
+                    ),
+                    "d": (("chain", "draw"), rng.random((2, 3)) > 0.5),
+                },
+                coords=dict(chain=[0, 1], draw=[0, 1, 2], g=["x", "y"]),
+            )
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def labelled_irregular_data(irregular_data):
+    """
+    `irregular_data` with an additional non-index coordinate.
+    """
+    return xr.DataTree.from_dict(
+        {
+            "posterior": irregular_data["posterior"]
+            .to_dataset()
+            .assign_coords(g_lab=("g", ["u", "v"]))
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def categorical_data():
+    """
+    Posterior indexed by a pandas Categorical coordinate.
+    """
+    rng = np.random.default_rng(523)
+    return xr.DataTree.from_dict(
+        {
+            "posterior": xr.Dataset(
+                {
+                    "m": (("chain", "draw"), rng.random((2, 3))),
+                    "t": (("chain", "draw", "cat"), rng.random((2, 3, 3))),
+                },
+                coords=dict(
+                    chain=[0, 1],
+                    draw=[0, 1, 2],
+                    cat=pd.Categorical(["lo", "mid", "hi"]),
+                ),
+            )
+        }
+    )
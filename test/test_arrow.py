@@ -0,0 +1,77 @@
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from polarbayes import ArrowDraws, gather_draws
+
+
+@pytest.mark.parametrize("combined", [True, False])
+@pytest.mark.parametrize(
+    "data_name",
+    ["eight_schools_data", "irregular_data", "categorical_data"],
+)
+def test_stream_matches_gather_draws(request, data_name, combined):
+    data = request.getfixturevalue(data_name)
+    draws = ArrowDraws(data, combined=combined)
+    expected = gather_draws(data, combined=combined)
+    # polars reads the stream through the PyCapsule interface
+    assert_frame_equal(pl.DataFrame(draws), expected)
+    assert draws.schema == expected.schema
+    # and it can be read again
+    assert_frame_equal(pl.DataFrame(draws), expected)
+
+
+def test_stream_options(eight_schools_data):
+    kwargs = dict(
+        var_names=["theta"],
+        num_samples=40,
+        random_seed=8,
+        value_name="x",
+        variable_name="param",
+        compact=True,
+    )
+    assert_frame_equal(
+        pl.DataFrame(ArrowDraws(eight_schools_data, **kwargs)),
+        gather_draws(eight_schools_data, **kwargs),
+    )
+
+
+def test_record_batches_share_value_buffers(eight_schools_data):
+    pa = pytest.importorskip("pyarrow")
+    draws = ArrowDraws(eight_schools_data, combined=False, max_rows=500)
+    batches = list(pa.RecordBatchReader.from_stream(draws))
+    assert max(batch.num_rows for batch in batches) <= 500
+    # each batch's values are the next slice of its variable's array
+    posterior = eight_schools_data.posterior
+    arrays = [posterior[var].values for var in posterior.data_vars]
+    offsets = np.cumsum([0, *(batch.num_rows for batch in batches)])
+    variable_offsets = np.cumsum([0, *(array.size for array in arrays)])
+    for batch, offset in zip(batches, offsets):
+        v = np.searchsorted(variable_offsets, offset, side="right") - 1
+        array = arrays[v]
+        address = batch.column("value").buffers()[1].address
+        assert address == (
+            array.ctypes.data + (offset - variable_offsets[v]) * array.itemsize
+        )
+    assert_frame_equal(
+        pl.from_arrow(pa.Table.from_batches(batches)),
+        gather_draws(eight_schools_data, combined=False),
+    )
+
+
+def test_duckdb(eight_schools_data):
+    duckdb = pytest.importorskip("duckdb")
+    draws = ArrowDraws(eight_schools_data, combined=False)  # noqa: F841
+    means = duckdb.sql(
+        "SELECT variable, avg(value) AS value FROM draws "
+        "GROUP BY variable ORDER BY variable"
+    ).pl()
+    expected = (
+        gather_draws(eight_schools_data)
+        .group_by("variable")
+        .agg(pl.col("value").mean())
+        .sort("variable")
+    )
+    np.testing.assert_allclose(means["value"], expected["value"])
+    assert means["variable"].to_list() == expected["variable"].to_list()
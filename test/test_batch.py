@@ -0,0 +1,100 @@
+import numpy as np
+import polars as pl
+import pytest
+import xarray as xr
+from polars.testing import assert_frame_equal
+
+from polarbayes import gather_draws, gather_draws_batch
+
+
+@pytest.fixture(scope="module")
+def fits(eight_schools_data):
+    # the same model fit to two jurisdictions, the second without
+    # the school dimension
+    posterior = eight_schools_data.posterior.to_dataset()
+    other = xr.DataTree.from_dict({"posterior": posterior[["mu", "tau"]] + 1})
+    return {("a", 1): eight_schools_data, ("b", 2): other}
+
+
+def test_gather_draws_batch(fits):
+    result = gather_draws_batch(fits, id_names=["jurisdiction", "week"])
+    expected = [
+        gather_draws(data).select(
+            pl.lit(jurisdiction).alias("jurisdiction"),
+            pl.lit(week).alias("week"),
+            pl.all(),
+        )
+        for (jurisdiction, week), data in fits.items()
+    ]
+    assert result.columns == expected[0].columns
+    # the second fit has no school column, which is null
+    assert_frame_equal(
+        result,
+        pl.concat(expected, how="diagonal_relaxed").select(result.columns),
+    )
+    assert result.filter(jurisdiction="b")["school"].null_count() == 4000
+
+
+def test_gather_draws_batch_positions_and_seed(eight_schools_data):
+    rng = np.random.default_rng(0)
+    result = gather_draws_batch(
+        [eight_schools_data, eight_schools_data],
+        var_names=["mu"],
+        num_samples=10,
+        random_seed=rng,
+    )
+    assert result["model"].to_list() == [0] * 10 + [1] * 10
+    # each source is subsampled from the same generator state
+    first, second = result.partition_by("model", include_key=False)
+    assert_frame_equal(first, second)
+
+
+def test_gather_draws_batch_workers_and_files(fits, tmp_path):
+    # sources given as paths are opened by the workers
+    paths = {}
+    for i, data in enumerate(fits.values()):
+        paths[f"fit{i}"] = tmp_path / f"fit{i}.nc"
+        data.to_netcdf(paths[f"fit{i}"])
+    in_process = gather_draws_batch(paths)
+    assert_frame_equal(in_process, gather_draws_batch(paths, n_workers=2))
+
+    gather_draws_batch(paths, n_workers=2, path=tmp_path / "out")
+    written = pl.read_parquet(tmp_path / "out" / "model=fit1")
+    # files are rewritten to the unified schema
+    assert written.schema == in_process.schema
+    assert_frame_equal(
+        pl.read_parquet(tmp_path / "out", hive_partitioning=False).sort(
+            pl.all()
+        ),
+        in_process.sort(pl.all()),
+    )
+
+
+def test_gather_draws_batch_errors(eight_schools_data, tmp_path):
+    with pytest.raises(ValueError, match="one value for each"):
+        gather_draws_batch({"a": eight_schools_data}, id_names=["x", "y"])
+    with pytest.raises(ValueError, match="No sources"):
+        gather_draws_batch([])
+    with pytest.raises(ValueError, match="n_workers"):
+        gather_draws_batch([eight_schools_data], n_workers=0)
+    (tmp_path / "file").touch()
+    with pytest.raises(FileExistsError):
+        gather_draws_batch([eight_schools_data], path=tmp_path)
+
+
+def test_gather_draws_batch_compact_enums(eight_schools_data):
+    other = xr.DataTree.from_dict(
+        {
+            "posterior": eight_schools_data.posterior.to_dataset()[
+                ["mu"]
+            ].assign(nu=lambda ds: ds["mu"] * 2)
+        }
+    )
+    result = gather_draws_batch(
+        [eight_schools_data, other], compact=True, var_names=["mu"]
+    )
+    assert result.height == 2 * 2000
+    # variable categories are the union of those of each source
+    assert result["variable"].dtype == pl.Enum(
+        ["mu", "theta_t", "tau", "theta", "nu"]
+    )
@@ -0,0 +1,168 @@
+import copy
+import gc
+
+import pytest
+from polars.testing import assert_frame_equal
+
+from polarbayes import (
+    CacheStats,
+    ConversionCache,
+    DiskCache,
+    gather_draws,
+    spread_draws,
+)
+
+
+@pytest.mark.parametrize("fingerprint", ["content", "identity"])
+def test_cache_hits_return_cached_frame(eight_schools_data, fingerprint):
+    cache = ConversionCache(fingerprint=fingerprint)
+    first = cache.gather_draws(eight_schools_data, var_names=["mu", "tau"])
+    second = cache.gather_draws(eight_schools_data, var_names=("mu", "tau"))
+    assert second is first
+    assert_frame_equal(
+        first, gather_draws(eight_schools_data, var_names=["mu", "tau"])
+    )
+    spread = cache.spread_draws(eight_schools_data, combined=False)
+    assert_frame_equal(
+        spread, spread_draws(eight_schools_data, combined=False)
+    )
+    assert cache.spread_draws(eight_schools_data, combined=False) is spread
+    assert cache.stats == CacheStats(
+        hits=2,
+        misses=2,
+        evictions=0,
+        entries=2,
+        bytes=first.estimated_size() + spread.estimated_size(),
+    )
+
+
+def test_cache_keys_on_arguments(eight_schools_data):
+    cache = ConversionCache()
+    cache.gather_draws(eight_schools_data)
+    # same as the defaults, so a hit
+    cache.gather_draws(eight_schools_data, group="posterior", combined=True)
+    cache.gather_draws(eight_schools_data, combined=False)
+    cache.spread_draws(eight_schools_data)
+    assert (cache.stats.hits, cache.stats.misses) == (1, 3)
+
+
+def test_cache_content_fingerprint(eight_schools_data):
+    """
+    Content fingerprints should recognize a copy of the data, and
+    tell apart data whose values differ.
+    """
+    cache = ConversionCache()
+    first = cache.spread_draws(eight_schools_data)
+    assert cache.spread_draws(copy.deepcopy(eight_schools_data)) is first
+    changed = copy.deepcopy(eight_schools_data)
+    changed.posterior["mu"] = changed.posterior["mu"] + 1
+    assert_frame_equal(cache.spread_draws(changed), spread_draws(changed))
+    assert cache.stats.entries == 2
+
+
+def test_cache_skips_random_subsamples(eight_schools_data):
+    cache = ConversionCache()
+    for _ in range(2):
+        cache.gather_draws(eight_schools_data, num_samples=10)
+    assert cache.stats.entries == 0
+    assert cache.stats.misses == 2
+    seeded = cache.gather_draws(
+        eight_schools_data, num_samples=10, random_seed=3
+    )
+    assert (
+        cache.gather_draws(eight_schools_data, num_samples=10, random_seed=3)
+        is seeded
+    )
+
+
+def test_cache_lru_eviction(eight_schools_data):
+    size = max(
+        gather_draws(eight_schools_data, var_names=[name]).estimated_size()
+        for name in ["mu", "tau"]
+    )
+    cache = ConversionCache(max_bytes=2 * size)
+    cache.gather_draws(eight_schools_data, var_names=["mu"])
+    cache.gather_draws(eight_schools_data, var_names=["tau"])
+    # refresh mu, so that tau is least recently used
+    cache.gather_draws(eight_schools_data, var_names=["mu"])
+    cache.gather_draws(eight_schools_data, var_names=["mu"], value_name="v")
+    assert cache.stats.evictions == 1
+    assert cache.stats.bytes <= 2 * size
+    hits = cache.stats.hits
+    cache.gather_draws(eight_schools_data, var_names=["mu"])
+    cache.gather_draws(eight_schools_data, var_names=["tau"])
+    assert cache.stats.hits == hits + 1
+    # frames larger than the budget are never cached
+    cache.gather_draws(eight_schools_data)
+    assert cache.stats.bytes <= 2 * size
+    cache.clear()
+    assert (cache.stats.entries, cache.stats.bytes) == (0, 0)
+
+
+def test_cache_identity_forgets_collected_data(eight_schools_data):
+    cache = ConversionCache(fingerprint="identity")
+    data = copy.deepcopy(eight_schools_data)
+    cache.spread_draws(data)
+    assert cache.stats.entries == 1
+    del data
+    gc.collect()
+    assert cache.stats.entries == 0
+
+
+def test_cache_unknown_fingerprint():
+    with pytest.raises(ValueError, match="Unknown fingerprint 'hash'"):
+        ConversionCache(fingerprint="hash")
+
+
+@pytest.fixture
+def netcdf_path(eight_schools_data, tmp_path):
+    path = tmp_path / "eight_schools.nc"
+    eight_schools_data.to_netcdf(path)
+    return path
+
+
+@pytest.mark.parametrize("validate", ["mtime", "content"])
+def test_disk_cache_reuses_converted_draws(
+    eight_schools_data, netcdf_path, tmp_path, validate
+):
+    cache = DiskCache(tmp_path / "cache", validate=validate)
+    first = cache.gather_draws(netcdf_path, var_names=["mu", "theta"])
+    assert_frame_equal(
+        first, gather_draws(eight_schools_data, var_names=["mu", "theta"])
+    )
+    (cached,) = (tmp_path / "cache").glob("*.arrow")
+    modified = cached.stat().st_mtime_ns
+    # a new cache on the same directory, as after a restart
+    cache = DiskCache(tmp_path / "cache", validate=validate)
+    second = cache.gather_draws(netcdf_path, var_names=("mu", "theta"))
+    assert_frame_equal(second, first)
+    assert cached.stat().st_mtime_ns == modified
+    cache.spread_draws(netcdf_path, combined=False)
+    assert len(list((tmp_path / "cache").glob("*.arrow"))) == 2
+    cache.clear()
+    assert not list((tmp_path / "cache").glob("*.arrow"))
+
+
+@pytest.mark.parametrize("validate", ["mtime", "content"])
+def test_disk_cache_invalidates_modified_source(
+    eight_schools_data, netcdf_path, tmp_path, validate
+):
+    cache = DiskCache(tmp_path / "cache", validate=validate)
+    cache.spread_draws(netcdf_path)
+    changed = copy.deepcopy(eight_schools_data)
+    changed.posterior["mu"] = changed.posterior["mu"] + 1
+    changed.to_netcdf(netcdf_path)
+    assert_frame_equal(cache.spread_draws(netcdf_path), spread_draws(changed))
+    # the stale entry was replaced
+    assert len(list((tmp_path / "cache").glob("*.arrow"))) == 1
+
+
+def test_disk_cache_skips_random_subsamples(netcdf_path, tmp_path):
+    cache = DiskCache(tmp_path / "cache")
+    assert cache.gather_draws(netcdf_path, num_samples=10).height == 180
+    assert not list((tmp_path / "cache").glob("*"))
+
+
+def test_disk_cache_unknown_validation(tmp_path):
+    with pytest.raises(ValueError, match="Unknown validation 'hash'"):
+        DiskCache(tmp_path, validate="hash")
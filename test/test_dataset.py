@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import polars as pl
+import pytest
+import xarray as xr
+
+from polarbayes import (
+    draws_to_dataset,
+    draws_to_datatree,
+    gather_draws,
+    spread_draws,
+)
+
+
+def _posterior(data: xr.DataTree) -> xr.Dataset:
+    posterior = data["posterior"].to_dataset()
+    # dimensions without coordinates come back with integer ones
+    return posterior.assign_coords(
+        {
+            dim: np.arange(size)
+            for dim, size in posterior.sizes.items()
+            if dim not in posterior.coords
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "data_fixture", ["eight_schools_data", "irregular_data"]
+)
+def test_draws_to_dataset_round_trips_gathered_draws(data_fixture, request):
+    data = request.getfixturevalue(data_fixture)
+    posterior = _posterior(data)
+    result = draws_to_dataset(gather_draws(data, combined=False))
+    assert set(result.data_vars) == set(posterior.data_vars)
+    for name, variable in posterior.data_vars.items():
+        assert set(result[name].dims) == set(variable.dims)
+        xr.testing.assert_allclose(
+            result[name].transpose(*variable.dims),
+            variable.astype(float),
+        )
+
+
+def test_draws_to_dataset_round_trips_spread_draws(eight_schools_data):
+    posterior = _posterior(eight_schools_data)
+    draws = spread_draws(eight_schools_data, var_names=["theta"])
+    result = draws_to_dataset(
+        draws.with_columns(shifted=pl.col("theta") + 1).lazy()
+    )
+    assert list(result.dims) == ["chain", "draw", "school"]
+    xr.testing.assert_identical(result["theta"], posterior["theta"])
+    xr.testing.assert_identical(
+        result["shifted"], (posterior["theta"] + 1).rename("shifted")
+    )
+
+
+def test_draws_to_dataset_explicit_index():
+    draws = pl.DataFrame(
+        dict(
+            chain=[0, 0, 0, 0],
+            draw=[1, 1, 0, 0],
+            k=[10, 20, 20, 10],
+            x=[1, 2, 3, 4],
+        )
+    )
+    result = draws_to_dataset(draws, index=["chain", "draw", "k"])
+    assert result["x"].dtype == np.int64
+    np.testing.assert_array_equal(result["k"], [10, 20])
+    np.testing.assert_array_equal(result["x"], [[[4, 3], [1, 2]]])
+
+
+def test_draws_to_dataset_missing_cells():
+    draws = pl.DataFrame(
+        dict(
+            chain=[0, 0, 1],
+            draw=[0, 1, 0],
+            g=["b", "a", "b"],
+            variable=["x"] * 3,
+            value=[1, 2, 3],
+        )
+    )
+    result = draws_to_dataset(draws)
+    np.testing.assert_array_equal(result["g"], ["b", "a"])
+    np.testing.assert_array_equal(
+        result["x"].transpose("chain", "draw", "g"),
+        [[[1, np.nan], [np.nan, 2]], [[3, np.nan], [np.nan, np.nan]]],
+    )
+
+
+def test_draws_to_dataset_duplicate_draws():
+    draws = pl.DataFrame(dict(chain=[0, 0], draw=[0, 0], x=[1.0, 2.0]))
+    with pytest.raises(ValueError, match="uniquely identify each draw"):
+        draws_to_dataset(draws)
+
+
+def test_draws_to_dataset_duplicate_draws_with_missing_cell():
+    # as many draws as cells, but one cell twice and another never
+    draws = pl.DataFrame(
+        dict(chain=[0, 0, 1, 1], draw=[0, 0, 0, 1], x=[1.0, 2.0, 3.0, 4.0])
+    )
+    with pytest.raises(ValueError, match="uniquely identify each draw"):
+        draws_to_dataset(draws)
+
+
+def test_draws_to_dataset_date_coordinates():
+    dates = pd.date_range("2024-01-01", periods=3)
+    data = xr.DataTree.from_dict(
+        {
+            "posterior": xr.Dataset(
+                {
+                    "y": (
+                        ("chain", "draw", "date"),
+                        np.arange(12.0).reshape(2, 2, 3),
+                    ),
+                    "z": (("chain", "draw"), np.ones((2, 2))),
+                },
+                coords=dict(chain=[0, 1], draw=[0, 1], date=dates),
+            )
+        }
+    )
+    result = draws_to_dataset(gather_draws(data, combined=False))
+    xr.testing.assert_identical(
+        result["y"].transpose("chain", "draw", "date"),
+        data.posterior["y"],
+    )
+    xr.testing.assert_identical(result["z"], data.posterior["z"])
+
+
+def test_draws_to_datatree(eight_schools_data):
+    draws = gather_draws(
+        eight_schools_data,
+        group="prior",
+        var_names=["mu", "tau"],
+        variable_name="name",
+        value_name="draw_value",
+    )
+    result = draws_to_datatree(
+        draws, group="prior", variable_name="name", value_name="draw_value"
+    )
+    xr.testing.assert_allclose(
+        result["prior"].to_dataset(),
+        eight_schools_data["prior"].to_dataset()[["mu", "tau"]],
+    )
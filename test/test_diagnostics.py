@@ -0,0 +1,231 @@
+from statistics import NormalDist
+
+import numpy as np
+import polars as pl
+import pytest
+
+from polarbayes import convergence_diagnostics, gather_draws
+
+# per-cell reference implementations, ported from ArviZ
+
+
+def _rankdata(x: np.ndarray) -> np.ndarray:
+    flat = x.ravel()
+    order = np.argsort(flat, kind="stable")
+    ranks = np.empty(len(flat))
+    values = flat[order]
+    start = 0
+    for end in range(1, len(flat) + 1):
+        if end == len(flat) or values[end] != values[start]:
+            ranks[order[start:end]] = (start + end + 1) / 2
+            start = end
+    return ranks.reshape(x.shape)
+
+
+def _z_scale(x: np.ndarray) -> np.ndarray:
+    p = (_rankdata(x) - 0.375) / (x.size + 0.25)
+    return np.vectorize(NormalDist().inv_cdf)(p)
+
+
+def _split_chains(x: np.ndarray) -> np.ndarray:
+    half = x.shape[1] // 2
+    return np.concatenate([x[:, :half], x[:, -half:]])
+
+
+def _rhat(x: np.ndarray) -> float:
+    n = x.shape[1]
+    between = n * np.var(x.mean(axis=1), ddof=1)
+    within = np.mean(np.var(x, axis=1, ddof=1))
+    return np.sqrt((between / within + n - 1) / n)
+
+
+def _ess(x: np.ndarray) -> float:
+    x = np.asarray(x, dtype=float)
+    if np.ptp(x) < np.finfo(float).resolution:
+        return x.size
+    n_chain, n_draw = x.shape
+    centered = x - x.mean(axis=1, keepdims=True)
+    acov = np.stack(
+        [
+            np.correlate(chain, chain, mode="full")[n_draw - 1 :] / n_draw
+            for chain in centered
+        ]
+    )
+    mean_var = np.mean(acov[:, 0]) * n_draw / (n_draw - 1.0)
+    var_plus = mean_var * (n_draw - 1.0) / n_draw
+    if n_chain > 1:
+        var_plus += np.var(x.mean(axis=1), ddof=1)
+    rho = np.zeros(n_draw)
+    even = 1.0
+    rho[0] = even
+    odd = 1.0 - (mean_var - np.mean(acov[:, 1])) / var_plus
+    rho[1] = odd
+    t = 1
+    while t < (n_draw - 3) and (even + odd) > 0.0:
+        even = 1.0 - (mean_var - np.mean(acov[:, t + 1])) / var_plus
+        odd = 1.0 - (mean_var - np.mean(acov[:, t + 2])) / var_plus
+        if (even + odd) >= 0:
+            rho[t + 1] = even
+            rho[t + 2] = odd
+        t += 2
+    max_t = t - 2
+    if even > 0:
+        rho[max_t + 1] = even
+    t = 1
+    while t <= max_t - 2:
+        if (rho[t + 1] + rho[t + 2]) > (rho[t - 1] + rho[t]):
+            rho[t + 1] = (rho[t - 1] + rho[t]) / 2.0
+            rho[t + 2] = rho[t + 1]
+        t += 2
+    tau = (
+        -1.0
+        + 2.0 * np.sum(rho[: max_t + 1])
+        + np.sum(rho[max_t + 1 : max_t + 2])
+    )
+    tau = max(tau, 1 / np.log10(x.size))
+    return x.size / tau
+
+
+def _reference(x: np.ndarray) -> dict[str, float]:
+    folded = np.abs(x - np.median(x))
+    squares = (x - x.mean()) ** 2
+    variance = squares.mean()
+    return dict(
+        rhat=max(
+            _rhat(_z_scale(_split_chains(x))),
+            _rhat(_z_scale(_split_chains(folded))),
+        ),
+        ess_bulk=_ess(_z_scale(_split_chains(x))),
+        ess_tail=min(
+            _ess(_split_chains(x <= np.quantile(x, 0.05))),
+            _ess(_split_chains(x <= np.quantile(x, 0.95))),
+        ),
+        mcse_mean=np.std(x, ddof=1) / np.sqrt(_ess(_split_chains(x))),
+        mcse_sd=np.sqrt(
+            ((squares**2).mean() - variance**2)
+            / _ess(_split_chains(squares))
+            / variance
+            / 4
+        ),
+    )
+
+
+def test_diagnostics_match_reference(eight_schools_data):
+    draws = gather_draws(eight_schools_data)
+    diagnostics = convergence_diagnostics(draws)
+    assert diagnostics.columns == [
+        "school",
+        "variable",
+        "rhat",
+        "ess_bulk",
+        "ess_tail",
+        "mcse_mean",
+        "mcse_sd",
+    ]
+    # one row per cell, in order of first appearance
+    assert diagnostics.select("school", "variable").equals(
+        draws.select("school", "variable").unique(maintain_order=True)
+    )
+    posterior = eight_schools_data.posterior
+    for row in diagnostics.iter_rows(named=True):
+        variable = posterior[row["variable"]]
+        if row["school"] is not None:
+            variable = variable.sel(school=row["school"])
+        expected = _reference(variable.transpose("chain", "draw").values)
+        for name, value in expected.items():
+            assert row[name] == pytest.approx(value, rel=1e-8), name
+
+
+def test_diagnostics_detect_non_convergence():
+    rng = np.random.default_rng(0)
+    n_chains, n_draws = 4, 200
+    # one well mixed cell, and one whose chains sit apart
+    mixed = rng.normal(size=(n_chains, n_draws))
+    stuck = mixed + np.arange(n_chains)[:, None] * 5
+    draws = pl.DataFrame(
+        dict(
+            chain=np.tile(np.repeat(np.arange(n_chains), n_draws), 2),
+            draw=np.tile(np.arange(n_draws), 2 * n_chains),
+            variable=["mixed"] * mixed.size + ["stuck"] * stuck.size,
+            value=np.concatenate([mixed.ravel(), stuck.ravel()]),
+        )
+    )
+    diagnostics = convergence_diagnostics(draws)
+    assert diagnostics["variable"].to_list() == ["mixed", "stuck"]
+    mixed_row, stuck_row = diagnostics.iter_rows(named=True)
+    assert mixed_row["rhat"] < 1.01
+    assert stuck_row["rhat"] > 1.5
+    assert mixed_row["ess_bulk"] > 10 * stuck_row["ess_bulk"]
+    for name, value in _reference(stuck).items():
+        assert stuck_row[name] == pytest.approx(value, rel=1e-8), name
+
+
+def test_diagnostics_ties_and_odd_draws():
+    rng = np.random.default_rng(1)
+    # discrete draws with many ties, and an odd number of draws
+    x = rng.poisson(2, size=(3, 101)).astype(float)
+    draws = pl.DataFrame(
+        dict(
+            chain=np.repeat(np.arange(3), 101),
+            draw=np.tile(np.arange(101), 3),
+            value=x.ravel(),
+        )
+    ).sample(fraction=1, shuffle=True, seed=0)
+    row = convergence_diagnostics(draws).row(0, named=True)
+    for name, value in _reference(x).items():
+        assert row[name] == pytest.approx(value, rel=1e-8), name
+
+
+def test_diagnostics_non_finite_and_constant_cells():
+    draws = pl.DataFrame(
+        dict(
+            chain=[0] * 8 + [1] * 8,
+            draw=list(range(8)) * 2,
+            value=[1.0] * 15 + [None],
+        )
+    ).with_columns(variable=pl.lit("a"))
+    draws = pl.concat(
+        [draws, draws.with_columns(variable=pl.lit("b"), value=pl.lit(1.0))]
+    )
+    diagnostics = convergence_diagnostics(draws)
+    assert diagnostics.filter(variable="a").select(
+        pl.all().exclude("variable")
+    ).row(0) == pytest.approx([np.nan] * 5, nan_ok=True)
+    constant = diagnostics.filter(variable="b").row(0, named=True)
+    assert constant["ess_bulk"] == 16
+    assert np.isnan(constant["rhat"])
+
+
+def test_diagnostics_ragged_cells():
+    draws = pl.DataFrame(
+        dict(
+            chain=[0] * 8 + [1] * 7,
+            draw=list(range(8)) + list(range(7)),
+            value=np.arange(15.0),
+        )
+    )
+    with pytest.raises(ValueError, match="same number of chains"):
+        convergence_diagnostics(draws)
+
+
+def test_diagnostics_match_arviz(eight_schools_data):
+    azs = pytest.importorskip("arviz_stats")
+    diagnostics = convergence_diagnostics(
+        gather_draws(eight_schools_data, var_names=["mu"])
+    ).row(0, named=True)
+    mu = eight_schools_data.posterior["mu"]
+    assert diagnostics["rhat"] == pytest.approx(float(azs.rhat(mu)))
+    assert diagnostics["ess_bulk"] == pytest.approx(
+        float(azs.ess(mu, method="bulk"))
+    )
+    # the 5% and 95% quantiles, rather than the default credible
+    # interval probability of arviz_stats
+    assert diagnostics["ess_tail"] == pytest.approx(
+        float(azs.ess(mu, method="tail", prob=(0.05, 0.95)))
+    )
+    assert diagnostics["mcse_mean"] == pytest.approx(
+        float(azs.mcse(mu, method="mean"))
+    )
+    assert diagnostics["mcse_sd"] == pytest.approx(
+        float(azs.mcse(mu, method="sd"))
+    )
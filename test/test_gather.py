@@ -5,10 +5,13 @@ import numpy as np
 import polars as pl
 import polars.selectors as cs
 import pytest
+import xarray as xr
+from polars.testing import assert_frame_equal
 
 from polarbayes.gather import (
     gather_draws,
     gather_variables,
+    iter_gather_draws,
     _assert_not_in_index_columns,
 )
 from polarbayes.schema import CHAIN_NAME, DRAW_NAME, VALUE_NAME, VARIABLE_NAME
@@ -288,3 +291,291 @@ def test_gather_mixed_types():
         result_int, ["mu_int", "theta_t_int"], index_vars
     )
     assert result_int["value"].dtype.is_integer()
+
+
+@pytest.mark.parametrize(
+    ["data", "gather_args"],
+    [
+        ["eight_schools_data", dict()],
+        ["eight_schools_data", dict(combined=False)],
+        ["eight_schools_data", dict(var_names=["theta", "tau"])],
+        ["eight_schools_data", dict(num_samples=10, random_seed=5)],
+        ["irregular_data", dict()],
+        ["irregular_data", dict(var_names=["c", "d"])],
+        ["irregular_data", dict(combined=False, variable_name="v")],
+        ["categorical_data", dict()],
+        ["categorical_data", dict(var_names=["t"])],
+    ],
+)
+def test_gather_engines_agree(data, gather_args, request):
+    """
+    The single-pass native engine should reproduce the
+    per-variable pandas engine exactly, including row order,
+    null index values and the supertype of the value column.
+    """
+    data = request.getfixturevalue(data)
+    assert_frame_equal(
+        gather_draws(data, **gather_args, engine="native"),
+        gather_draws(data, **gather_args, engine="pandas"),
+    )
+
+
+def test_gather_engines_agree_mixed_types():
+    dat = copy.deepcopy(eight_schools_data)
+    dat.posterior["theta_t_int"] = (
+        dat.posterior["theta_t"].round().astype("int")
+    )
+    dat.posterior["mu_string"] = dat.posterior["mu"].astype("str")
+    for var_names in [["mu", "theta_t_int"], ["theta_t_int", "mu_string"]]:
+        assert_frame_equal(
+            gather_draws(dat, var_names=var_names, engine="native"),
+            gather_draws(dat, var_names=var_names, engine="pandas"),
+        )
+
+
+def test_gather_native_skips_non_index_coords():
+    """
+    The native engine should gather only data variables,
+    whereas the pandas engine also gathers non-index and
+    scalar coordinates as variables.
+    """
+    dat = xr.DataTree.from_dict(
+        {
+            "posterior": xr.Dataset(
+                {"a": (("chain", "draw", "school"), np.ones((2, 3, 2)))},
+                coords=dict(
+                    chain=[0, 1],
+                    draw=[0, 1, 2],
+                    school=["s", "t"],
+                    region=("school", ["north", "south"]),
+                    run=5,
+                ),
+            )
+        }
+    )
+    expected = pl.DataFrame(
+        {
+            "chain": np.repeat([0, 1], 6),
+            "draw": np.tile(np.repeat([0, 1, 2], 2), 2),
+            "school": ["s", "t"] * 6,
+            "variable": ["a"] * 12,
+            "value": np.ones(12),
+        }
+    )
+    native = gather_draws(dat, combined=False, engine="native")
+    assert_frame_equal(native, expected)
+    pandas = gather_draws(dat, combined=False, engine="pandas")
+    assert pandas.height == 3 * native.height
+    assert pandas["value"].dtype == pl.String
+    assert set(pandas["variable"]) == {"a", "region", "run"}
+
+
+@pytest.mark.parametrize("engine", ["native", "pandas"])
+@pytest.mark.parametrize("n_jobs", [2, -1])
+@pytest.mark.parametrize(
+    "data", ["eight_schools_data", "irregular_data", "categorical_data"]
+)
+def test_gather_draws_threads_match_serial(data, engine, n_jobs, request):
+    """
+    Converting variables in a thread pool should reproduce the
+    serial output exactly, including row order.
+    """
+    data = request.getfixturevalue(data)
+    assert_frame_equal(
+        gather_draws(data, engine=engine, n_jobs=n_jobs),
+        gather_draws(data, engine=engine),
+    )
+
+
+def test_gather_draws_threads_mixed_types():
+    dat = copy.deepcopy(eight_schools_data)
+    dat.posterior["mu_string"] = dat.posterior["mu"].astype("str")
+    assert_frame_equal(
+        gather_draws(dat, n_jobs=3), gather_draws(dat, n_jobs=1)
+    )
+
+
+def test_gather_draws_invalid_n_jobs():
+    with pytest.raises(ValueError, match="n_jobs must be a positive"):
+        gather_draws(eight_schools_data, n_jobs=0)
+
+
+def test_gather_native_rejects_reserved_names():
+    with pytest.raises(ValueError, match="Specified value_name='school'"):
+        gather_draws(eight_schools_data, value_name="school")
+
+
+def test_gather_unknown_engine():
+    with pytest.raises(ValueError, match="Unknown engine 'arrow'"):
+        gather_draws(eight_schools_data, engine="arrow")
+
+
+@pytest.mark.parametrize(
+    ["data", "gather_args", "max_rows"],
+    [
+        ["eight_schools_data", dict(), None],
+        ["eight_schools_data", dict(), 1500],
+        ["eight_schools_data", dict(), 7000],
+        ["eight_schools_data", dict(combined=False, value_name="v"), 1500],
+        ["eight_schools_data", dict(num_samples=25, random_seed=3), 7],
+        ["irregular_data", dict(), None],
+        ["irregular_data", dict(), 1],
+        ["irregular_data", dict(combined=False), 5],
+    ],
+)
+def test_iter_gather_draws_by_variable(data, gather_args, max_rows, request):
+    """
+    Batching by variable should yield batches that respect the row
+    budget, share the eager schema, and concatenate back to
+    the eager output.
+    """
+    data = request.getfixturevalue(data)
+    expected = gather_draws(data, **gather_args)
+    batches = list(
+        iter_gather_draws(
+            data, **gather_args, by="variable", max_rows=max_rows
+        )
+    )
+    for batch in batches:
+        assert batch.schema == expected.schema
+        if max_rows is None:
+            assert batch[VARIABLE_NAME].n_unique() == 1
+        else:
+            assert batch.height <= max_rows
+    assert_frame_equal(pl.concat(batches), expected)
+
+
+@pytest.mark.parametrize("combined", [True, False])
+@pytest.mark.parametrize("max_rows", [None, 600])
+def test_iter_gather_draws_by_chain(combined, max_rows):
+    """
+    Batching by chain should yield batches of a single chain
+    that together contain the eager output.
+    """
+    expected = gather_draws(eight_schools_data, combined=combined)
+    batches = list(
+        iter_gather_draws(
+            eight_schools_data,
+            combined=combined,
+            by="chain",
+            max_rows=max_rows,
+        )
+    )
+    for batch in batches:
+        assert batch.schema == expected.schema
+        assert batch[CHAIN_NAME].n_unique() == 1
+        if max_rows is not None:
+            assert batch.height <= max_rows
+    assert_frame_equal(pl.concat(batches), expected, check_row_order=False)
+
+
+@pytest.mark.parametrize(
+    "gather_args",
+    [
+        dict(),
+        dict(combined=False, variable_name="v"),
+        dict(var_names=["theta"], num_samples=10, random_seed=2),
+    ],
+)
+def test_gather_draws_compact(eight_schools_data, gather_args):
+    """
+    Compact output should hold the same values as the default
+    output, with small integer chain and draw columns and Enum
+    variable and school columns whose categories come from the
+    whole group.
+    """
+    expected = gather_draws(eight_schools_data, **gather_args)
+    result = gather_draws(eight_schools_data, **gather_args, compact=True)
+    variable_name = gather_args.get("variable_name", VARIABLE_NAME)
+    assert result.schema[CHAIN_NAME] == pl.UInt8
+    assert result.schema[DRAW_NAME] == pl.UInt32
+    assert result.schema[variable_name] == pl.Enum(
+        list(eight_schools_data.posterior.data_vars)
+    )
+    assert result.schema["school"] == pl.Enum(
+        eight_schools_data.posterior["school"].values.tolist()
+    )
+    assert_frame_equal(result.cast(expected.schema), expected)
+    assert_frame_equal(
+        gather_draws(
+            eight_schools_data, **gather_args, compact=True, engine="pandas"
+        ),
+        result,
+    )
+
+
+@pytest.mark.parametrize("data", ["irregular_data", "categorical_data"])
+def test_iter_gather_draws_compact(data, request):
+    """
+    Compact batches should share the schema of the compact eager
+    output, and leave non-string indexes as they are.
+    """
+    data = request.getfixturevalue(data)
+    expected = gather_draws(data, compact=True)
+    batches = list(iter_gather_draws(data, max_rows=3, compact=True))
+    for batch in batches:
+        assert batch.schema == expected.schema
+    assert_frame_equal(pl.concat(batches), expected)
+    assert expected.schema[VARIABLE_NAME] == pl.Enum(
+        list(data.posterior.data_vars)
+    )
+    for dim in set(expected.columns) & {"k", "cat"}:
+        assert expected.schema[dim] == gather_draws(data).schema[dim]
+
+
+@pytest.fixture
+def chunked_netcdf_path(eight_schools_data, tmp_path):
+    """
+    Eight schools posterior written to NetCDF in chunks of
+    one chain and 100 draws.
+    """
+    path = tmp_path / "posterior.nc"
+    posterior = eight_schools_data["posterior"].to_dataset()
+    xr.DataTree.from_dict({"posterior": posterior}).to_netcdf(
+        path,
+        encoding={
+            "/posterior": {
+                var: {"chunksizes": (1, 100, 8)[: posterior[var].ndim]}
+                for var in posterior.data_vars
+            }
+        },
+    )
+    return path
+
+
+@pytest.mark.parametrize("max_rows", [None, 300])
+def test_iter_gather_draws_by_chunk(chunked_netcdf_path, max_rows):
+    """
+    Batching by chunk should yield one batch per chunk on disk
+    of each variable, which together contain the eager output.
+    """
+    with xr.open_datatree(chunked_netcdf_path) as data:
+        expected = gather_draws(data, combined=False)
+        batches = list(
+            iter_gather_draws(
+                data, combined=False, by="chunk", max_rows=max_rows
+            )
+        )
+    # 4 chains x 5 blocks of draws for each of 4 variables, with
+    # the 800-row blocks of theta and theta_t split in 3 by max_rows
+    assert len(batches) == (80 if max_rows is None else 160)
+    for batch in batches:
+        assert batch.schema == expected.schema
+        assert batch[CHAIN_NAME].n_unique() == 1
+        assert batch[VARIABLE_NAME].n_unique() == 1
+        assert batch.height <= (max_rows or 800)
+    assert_frame_equal(pl.concat(batches), expected, check_row_order=False)
+
+
+def test_iter_gather_draws_by_dask_chunk(chunked_netcdf_path):
+    pytest.importorskip("dask")
+    with xr.open_datatree(chunked_netcdf_path, chunks={"draw": 250}) as data:
+        expected = gather_draws(data)
+        batches = list(iter_gather_draws(data, by="chunk"))
+    assert all(batch.height <= 250 * 8 for batch in batches)
+    assert_frame_equal(pl.concat(batches), expected, check_row_order=False)
+
+
+def test_iter_gather_draws_unknown_batching():
+    with pytest.raises(ValueError, match="Unknown batching 'school'"):
+        next(iter_gather_draws(eight_schools_data, by="school"))
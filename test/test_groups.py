@@ -0,0 +1,123 @@
+import arviz_base as az
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from polarbayes import (
+    gather_draws,
+    gather_groups,
+    spread_draws,
+    spread_groups,
+)
+
+
+def test_spread_groups_aligned(eight_schools_data):
+    frames = spread_groups(
+        eight_schools_data,
+        var_names={"posterior": ["mu", "tau"]},
+        num_samples=100,
+        random_seed=7,
+    )
+    posterior, stats = frames["posterior"], frames["sample_stats"]
+    # both groups have the same draws, in the same order
+    assert_frame_equal(
+        posterior.select("chain", "draw"), stats.select("chain", "draw")
+    )
+    assert posterior.columns == ["chain", "draw", "mu", "tau"]
+    # and each matches a conversion of that group alone
+    assert_frame_equal(
+        posterior,
+        spread_draws(
+            eight_schools_data,
+            var_names=["mu", "tau"],
+            num_samples=100,
+            random_seed=7,
+        ),
+    )
+    assert_frame_equal(
+        stats,
+        spread_draws(
+            eight_schools_data,
+            group="sample_stats",
+            num_samples=100,
+            random_seed=7,
+        ),
+    )
+    combined = pl.concat(
+        [posterior, stats.drop("chain", "draw")], how="horizontal"
+    )
+    assert combined.height == 100
+
+
+def test_gather_groups(eight_schools_data):
+    var_names = {"posterior": ["theta"], "log_likelihood": ["obs"]}
+    draws = gather_groups(
+        eight_schools_data,
+        groups=["posterior", "log_likelihood"],
+        var_names=var_names,
+        group_name="source",
+    )
+    assert draws.columns == [
+        "source",
+        "chain",
+        "draw",
+        "school",
+        "variable",
+        "value",
+    ]
+    for group, names in var_names.items():
+        assert_frame_equal(
+            draws.filter(source=group).drop("source"),
+            gather_draws(eight_schools_data, group=group, var_names=names),
+        )
+
+
+def test_gather_groups_compact(eight_schools_data):
+    draws = gather_groups(
+        eight_schools_data,
+        var_names={
+            "posterior": ["mu"],
+            "sample_stats": ["diverging", "energy"],
+        },
+        num_samples=10,
+        random_seed=0,
+        compact=True,
+    )
+    assert draws.schema["group"] == pl.Enum(["posterior", "sample_stats"])
+    assert draws["variable"].dtype.categories.to_list()[:2] == [
+        "mu",
+        "theta_t",
+    ]
+    # the value column has the supertype of float and bool values
+    assert draws.schema["value"] == pl.Float64
+    # the same ten draws in every group
+    samples = draws.partition_by("variable", maintain_order=True)
+    for frame in samples[1:]:
+        assert_frame_equal(
+            frame.select("chain", "draw"), samples[0].select("chain", "draw")
+        )
+
+
+def test_groups_errors(eight_schools_data):
+    with pytest.raises(ValueError, match="same chains and draws"):
+        spread_groups(eight_schools_data, groups=["posterior", "prior"])
+    with pytest.raises(ValueError, match="not converted"):
+        spread_groups(eight_schools_data, var_names={"prior": ["mu"]})
+    with pytest.raises(ValueError, match="combined=True"):
+        spread_groups(eight_schools_data, combined=False, num_samples=10)
+
+
+def test_groups_subsample_before_stacking(eight_schools_data, monkeypatch):
+    extract = az.extract
+    stacked = []
+
+    def recording_extract(data, *args, **kwargs):
+        stacked.append(dict(data.sizes))
+        return extract(data, *args, **kwargs)
+
+    monkeypatch.setattr(az, "extract", recording_extract)
+    frames = spread_groups(eight_schools_data, num_samples=3, random_seed=2)
+    assert len(stacked) == 2
+    # each group is reduced to the draws of the 3 samples first
+    assert all(sizes["draw"] <= 3 for sizes in stacked)
+    assert frames["sample_stats"].height == 3
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+
+import pytest
+
+import polarbayes
+
+HEAVY_MODULES = ["numpy", "pandas", "xarray", "arviz_base"]
+
+# budget for the cumulative import time of polarbayes itself,
+# in microseconds, as reported by python -X importtime
+IMPORT_BUDGET_US = 50_000
+
+
+def run_fresh(code: str) -> subprocess.CompletedProcess:
+    """
+    Run Python code in a fresh interpreter, so that no modules
+    have been imported yet.
+    """
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+@pytest.mark.parametrize(
+    ["statement", "allowed"],
+    [
+        ["import polarbayes", []],
+        ["import polarbayes.schema", []],
+        ["from polarbayes import gather_variables", ["polars"]],
+        ["from polarbayes import record_stages", ["polars"]],
+    ],
+)
+def test_import_defers_heavy_dependencies(statement, allowed):
+    """
+    Importing polarbayes, or its lightweight parts, should not
+    import the dependencies needed to convert xarray data.
+    """
+    modules = ["polars", *HEAVY_MODULES]
+    result = run_fresh(
+        f"{statement}\nimport sys\n"
+        f"print([m for m in {modules} if m in sys.modules])"
+    )
+    assert result.stdout.strip() == str(allowed)
+
+
+def test_import_time_budget():
+    result = run_fresh("import polarbayes")
+    # lines are "import time: <self> | <cumulative> | <module>"
+    (cumulative,) = [
+        int(line.split("|")[1])
+        for line in result.stderr.splitlines()
+        if line.split("|")[-1].strip() == "polarbayes"
+    ]
+    assert cumulative < IMPORT_BUDGET_US
+
+
+def test_lazy_attributes():
+    from polarbayes.gather import gather_draws
+
+    assert polarbayes.gather_draws is gather_draws
+    assert set(polarbayes.__all__) <= set(dir(polarbayes))
+    with pytest.raises(AttributeError, match="no attribute 'nothing'"):
+        polarbayes.nothing
+
+
+def test_submodule_attributes():
+    result = run_fresh(
+        "import polarbayes\n"
+        "print(polarbayes.spread.__name__, polarbayes.gather.__name__, "
+        "polarbayes.schema.CHAIN_NAME)"
+    )
+    assert result.stdout.split() == [
+        "polarbayes.spread",
+        "polarbayes.gather",
+        "chain",
+    ]
@@ -0,0 +1,87 @@
+import polars as pl
+import pytest
+import xarray as xr
+from polars.testing import assert_frame_equal
+
+from polarbayes import IncrementalGather, gather_draws
+
+
+def _first_draws(data: xr.DataTree, n: int, chains=None) -> xr.DataTree:
+    posterior = data.posterior.to_dataset().isel(draw=slice(0, n))
+    if chains is not None:
+        posterior = posterior.isel(chain=chains)
+    return xr.DataTree.from_dict({"posterior": posterior})
+
+
+@pytest.mark.parametrize("combined", [True, False])
+def test_incremental_matches_full_conversion(eight_schools_data, combined):
+    converter = IncrementalGather(combined=combined)
+    for n in (100, 250, 250, 500):
+        converter.update(_first_draws(eight_schools_data, n))
+    assert converter.n_draws == {0: 500, 1: 500, 2: 500, 3: 500}
+    assert_frame_equal(
+        converter.draws(),
+        gather_draws(eight_schools_data, combined=combined),
+    )
+
+
+@pytest.mark.parametrize("combined", [True, False])
+def test_incremental_irregular_dimension_order(irregular_data, combined):
+    # variable "b" is stored as (k, chain, draw)
+    converter = IncrementalGather(combined=combined)
+    for n in (1, 2, 3):
+        converter.update(_first_draws(irregular_data, n))
+    assert_frame_equal(
+        converter.draws(),
+        gather_draws(irregular_data, combined=combined),
+    )
+
+
+def test_incremental_new_chunks_and_uneven_chains(eight_schools_data):
+    posterior = eight_schools_data.posterior.to_dataset()
+    converter = IncrementalGather(var_names=["mu", "theta"], compact=True)
+    # chains progress unevenly, and updates hold only new draws
+    new = converter.update(_first_draws(eight_schools_data, 200, [0, 1]))
+    assert new.height == 2 * 200 * 9
+    converter.update(_first_draws(eight_schools_data, 100, [2, 3]))
+    chunk = xr.DataTree.from_dict(
+        {"posterior": posterior.isel(draw=slice(100, 200))}
+    )
+    new = converter.update(chunk)
+    # chains 0 and 1 already have these draws
+    assert new["chain"].unique().sort().to_list() == [2, 3]
+    assert converter.n_draws == {0: 200, 1: 200, 2: 200, 3: 200}
+    assert converter.update(chunk).is_empty()
+    assert_frame_equal(
+        converter.draws(),
+        gather_draws(
+            _first_draws(eight_schools_data, 200),
+            var_names=["mu", "theta"],
+            compact=True,
+        ),
+    )
+
+
+def test_incremental_on_disk(eight_schools_data, tmp_path):
+    converter = IncrementalGather(path=tmp_path / "draws", format="ipc")
+    for n in (10, 20):
+        converter.update(_first_draws(eight_schools_data, n))
+    assert sorted(p.name for p in (tmp_path / "draws").iterdir()) == [
+        "part-00000.arrow",
+        "part-00001.arrow",
+    ]
+    expected = gather_draws(_first_draws(eight_schools_data, 20))
+    assert_frame_equal(converter.draws(), expected)
+    # the dataset holds the same draws, in order of conversion
+    assert_frame_equal(
+        pl.read_ipc(tmp_path / "draws").sort(pl.all()),
+        expected.sort(pl.all()),
+    )
+
+
+def test_incremental_errors(tmp_path):
+    with pytest.raises(ValueError, match="No draws"):
+        IncrementalGather().draws()
+    (tmp_path / "file").touch()
+    with pytest.raises(FileExistsError):
+        IncrementalGather(path=tmp_path)
@@ -0,0 +1,111 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from polarbayes import (
+    StageRecord,
+    gather_draws,
+    gather_variables,
+    record_stages,
+    spread_draws,
+)
+from polarbayes.instrument import _record_stage
+
+
+@pytest.mark.parametrize(
+    ["convert", "expected_stages"],
+    [
+        [
+            lambda data: spread_draws(data),
+            [("spread_draws", "extract"), ("spread_draws", "to_polars")],
+        ],
+        [
+            lambda data: spread_draws(data, engine="pandas"),
+            [
+                ("spread_draws", "extract"),
+                ("spread_draws", "to_dataframe"),
+                ("spread_draws", "from_pandas"),
+            ],
+        ],
+        [
+            lambda data: gather_draws(data),
+            [("gather_draws", "extract"), ("gather_draws", "gather")],
+        ],
+        [
+            lambda data: gather_draws(data, var_names=["mu"], engine="pandas"),
+            [
+                ("gather_draws", "extract"),
+                ("spread_draws", "extract"),
+                ("spread_draws", "to_dataframe"),
+                ("spread_draws", "from_pandas"),
+                ("gather_variables", "unpivot"),
+                ("gather_draws", "concat"),
+            ],
+        ],
+    ],
+)
+def test_record_stages(eight_schools_data, convert, expected_stages):
+    """
+    Each conversion should report its stages in order, with
+    the size of the output of each tabular stage.
+    """
+    with record_stages() as stages:
+        result = convert(eight_schools_data)
+    assert [(x.function, x.stage) for x in stages] == expected_stages
+    assert all(isinstance(x, StageRecord) for x in stages)
+    assert all(x.seconds >= 0 and x.peak_bytes is None for x in stages)
+    assert stages[-1].rows == result.height
+    assert stages[-1].bytes == result.estimated_size()
+    assert stages[0].bytes > 0
+    assert pl.DataFrame(stages).height == len(expected_stages)
+
+
+def test_record_stages_callback_and_threads(eight_schools_data):
+    """
+    Callbacks should see every record, including those of
+    stages run in worker threads.
+    """
+    seen = []
+    with record_stages(callback=seen.append) as stages:
+        gather_draws(eight_schools_data, engine="pandas", n_jobs=2)
+    assert seen == stages
+    assert sum(x.stage == "unpivot" for x in stages) == 4
+
+
+def test_record_stages_memory(eight_schools_data):
+    with record_stages(trace_memory=True) as stages:
+        gather_draws(eight_schools_data)
+    assert all(x.peak_bytes is not None for x in stages)
+    gather_stage = stages[-1]
+    assert gather_stage.peak_bytes >= gather_stage.bytes * 0.5
+
+
+def test_record_stages_nested_peaks():
+    """
+    The peak memory of an enclosing stage should include
+    the peaks of the stages it encloses.
+    """
+
+    def allocate():
+        return bytearray(10**7)
+
+    def outer():
+        _record_stage("test", "inner", allocate)
+        return None
+
+    with record_stages(trace_memory=True) as stages:
+        _record_stage("test", "outer", outer)
+    inner, outer_record = stages
+    assert inner.peak_bytes >= 10**7
+    assert outer_record.peak_bytes >= inner.peak_bytes
+
+
+def test_no_records_outside_context(eight_schools_data):
+    with record_stages() as stages:
+        pass
+    df = spread_draws(eight_schools_data)
+    assert stages == []
+    with record_stages() as stages:
+        result = gather_variables(df.lazy())
+    assert stages[0].rows is None
+    assert_frame_equal(result.collect(), gather_variables(df))
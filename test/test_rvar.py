@@ -0,0 +1,68 @@
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from polarbayes import gather_draws, gather_rvars
+
+
+@pytest.mark.parametrize("combined", [True, False])
+@pytest.mark.parametrize(
+    "data_fixture", ["eight_schools_data", "irregular_data"]
+)
+def test_gather_rvars_matches_gather_draws(data_fixture, combined, request):
+    data = request.getfixturevalue(data_fixture)
+    rvars = gather_rvars(data, combined=combined)
+    gathered = gather_draws(data, combined=combined)
+    n_chains = gathered["chain"].n_unique()
+    n_draws = gathered["draw"].n_unique()
+    cell_cols = [
+        col
+        for col in gathered.columns
+        if col not in ("chain", "draw", "variable", "value")
+    ]
+    assert rvars.columns == cell_cols + ["variable", "draws"]
+    assert rvars["draws"].dtype.shape == (
+        (n_chains * n_draws,) if combined else (n_chains, n_draws)
+    )
+    # the draws of each cell, in chain and draw order
+    expected = (
+        gathered.sort("chain", "draw", maintain_order=True)
+        .group_by(cell_cols + ["variable"], maintain_order=True)
+        .agg(draws=pl.col("value").cast(pl.Float64))
+    )
+    assert_frame_equal(
+        rvars.with_columns(
+            pl.col("draws").reshape((-1, n_chains * n_draws)).arr.to_list()
+        ),
+        expected,
+        check_row_order=False,
+    )
+
+
+def test_gather_rvars_is_smaller(eight_schools_data):
+    rvars = gather_rvars(eight_schools_data)
+    gathered = gather_draws(eight_schools_data)
+    assert rvars.estimated_size() * 2 < gathered.estimated_size()
+
+
+def test_gather_rvars_names_and_compact(eight_schools_data):
+    rvars = gather_rvars(
+        eight_schools_data,
+        var_names=["theta"],
+        draws_name="d",
+        variable_name="name",
+        compact=True,
+    )
+    assert rvars.columns == ["school", "name", "d"]
+    assert rvars.schema["school"] == pl.Enum(
+        eight_schools_data.posterior.school.values
+    )
+    np.testing.assert_array_equal(
+        rvars["d"].to_numpy(),
+        eight_schools_data.posterior["theta"].transpose(
+            "school", "chain", "draw"
+        ),
+    )
+    with pytest.raises(ValueError, match="index column named 'school'"):
+        gather_rvars(eight_schools_data, draws_name="school")
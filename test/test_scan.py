@@ -0,0 +1,158 @@
+import arviz_base as az
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+import polarbayes.scan
+from polarbayes.gather import gather_draws
+from polarbayes.scan import (
+    _matching_positions,
+    _pushdown,
+    _split_conjunction,
+    scan_gather_draws,
+    scan_spread_draws,
+)
+from polarbayes.spread import spread_draws
+
+eight_schools_data = az.load_arviz_data("non_centered_eight")
+
+queries = [
+    lambda lf: lf,
+    lambda lf: lf.filter(pl.col("chain") == 1),
+    lambda lf: lf.filter(
+        pl.col("chain").is_in([0, 3]),
+        pl.col("draw") >= 400,
+        pl.col("school") == "Choate",
+    ),
+    lambda lf: lf.filter(
+        (pl.col("draw") > 10) & (pl.col("draw") < 20) | (pl.col("chain") == 2)
+    ),
+    lambda lf: lf.filter(pl.col("draw") > pl.col("draw").max() - 100),
+    lambda lf: lf.filter(pl.col("draw").rank() < 1000),
+    lambda lf: lf.filter(pl.col("chain") == 1).head(7),
+    lambda lf: lf.filter(pl.col("school") == "nowhere"),
+]
+
+
+@pytest.mark.parametrize("query", queries)
+@pytest.mark.parametrize("var_names", [None, ["mu", "theta"], ["theta_t"]])
+def test_scan_spread_draws_matches_eager(query, var_names):
+    """
+    Collecting a query on scan_spread_draws() should give the
+    same result as running it on the eager spread_draws() output.
+    """
+    lf = scan_spread_draws(eight_schools_data, var_names=var_names)
+    expected = spread_draws(
+        eight_schools_data, var_names=var_names, combined=False
+    )
+    assert lf.collect_schema() == expected.schema
+    assert_frame_equal(query(lf).collect(), query(expected.lazy()).collect())
+    assert_frame_equal(
+        query(lf).select("draw", pl.last()).collect(),
+        query(expected.lazy()).select("draw", pl.last()).collect(),
+    )
+
+
+@pytest.mark.parametrize(
+    "query",
+    queries
+    + [
+        lambda lf: lf.filter(pl.col("variable") == "mu"),
+        lambda lf: lf.filter(
+            pl.col("variable").is_in(["tau", "theta"]),
+            pl.col("school") != "Choate",
+            pl.col("value") > 0,
+        ),
+        lambda lf: lf.filter(pl.col("variable") == "nothing"),
+        # only variables without the filtered dimension are selected
+        lambda lf: lf.filter(
+            (pl.col("variable") == "mu") & (pl.col("school") == "Choate")
+        ),
+        lambda lf: lf.filter(
+            pl.col("variable").is_in(["mu", "tau"]),
+            pl.col("school").is_in(["Choate", "Deerfield"]),
+        ),
+    ],
+)
+def test_scan_gather_draws_matches_eager(query):
+    """
+    Collecting a query on scan_gather_draws() should give the
+    same result as running it on the eager gather_draws() output.
+    """
+    lf = scan_gather_draws(eight_schools_data)
+    expected = gather_draws(eight_schools_data, combined=False)
+    assert lf.collect_schema() == expected.schema
+    assert_frame_equal(query(lf).collect(), query(expected.lazy()).collect())
+
+
+def test_scan_pushes_down_into_xarray(monkeypatch):
+    """
+    Pushed-down filters and projections should restrict
+    the data that is converted.
+    """
+    converted = []
+    original = polarbayes.scan._dataset_to_polars
+
+    def recording(data, columns=None):
+        converted.append((dict(data.sizes), columns))
+        return original(data, columns=columns)
+
+    monkeypatch.setattr(polarbayes.scan, "_dataset_to_polars", recording)
+    scan_spread_draws(eight_schools_data).filter(
+        pl.col("chain") == 1,
+        pl.col("draw") >= 450,
+        pl.col("school").is_in(["Choate", "Deerfield"]),
+    ).select("theta").collect()
+    sizes, columns = converted[-1]
+    assert sizes == dict(chain=1, draw=50, school=2)
+    assert columns == {"theta", "chain", "draw", "school"}
+
+
+def test_split_conjunction():
+    a, b, c = pl.col("a") > 1, pl.col("b") == 2, pl.col("c").is_null()
+    assert len(_split_conjunction(a & b & c)) == 3
+    assert len(_split_conjunction(a & (b | c))) == 2
+    assert len(_split_conjunction(a | b)) == 1
+
+
+def test_matching_positions_requires_elementwise():
+    frame = pl.DataFrame({"draw": np.arange(10)})
+    np.testing.assert_array_equal(
+        _matching_positions(frame, pl.col("draw").is_between(3, 5)),
+        [3, 4, 5],
+    )
+    np.testing.assert_array_equal(
+        _matching_positions(frame, (pl.col("draw") % 4 == 1)),
+        [1, 5, 9],
+    )
+    assert (
+        _matching_positions(frame, pl.col("draw") > pl.col("draw").max() - 2)
+        is None
+    )
+    assert (
+        _matching_positions(frame, pl.col("draw") > pl.col("draw").mean())
+        is None
+    )
+    assert _matching_positions(frame, pl.col("draw").len() > 100) is None
+    assert _matching_positions(frame, pl.col("draw").rank() < 3) is None
+    assert _matching_positions(frame, pl.col("draw").shift() > 1) is None
+    assert _matching_positions(frame, pl.col("draw") + 1) is None
+
+
+def test_pushdown_selection():
+    frames = {
+        "sample": pl.DataFrame({"chain": [0, 0, 1, 1], "draw": [0, 1, 0, 1]}),
+        "school": pl.DataFrame({"school": ["a", "b", "c"]}),
+    }
+    selection = _pushdown(
+        frames,
+        (pl.col("chain") == 1)
+        & (pl.col("school") != "b")
+        & (pl.col("draw") == 0)
+        & (pl.col("value") > 0),
+    )
+    assert selection.keys() == {"sample", "school"}
+    np.testing.assert_array_equal(selection["sample"], [2])
+    np.testing.assert_array_equal(selection["school"], [0, 2])
+    assert _pushdown(frames, None) == {}
@@ -0,0 +1,118 @@
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from polarbayes.gather import gather_draws
+from polarbayes.sink import sink_draws
+
+scanners = dict(parquet=pl.scan_parquet, ipc=pl.scan_ipc)
+
+
+@pytest.mark.parametrize("format", ["parquet", "ipc"])
+@pytest.mark.parametrize(
+    "sink_args",
+    [
+        dict(),
+        dict(max_rows=1000),
+        dict(combined=False, var_names=["theta", "tau"]),
+        dict(num_samples=20, random_seed=5, value_name="v"),
+        dict(compact=True),
+    ],
+)
+def test_sink_draws_single_file(
+    eight_schools_data, tmp_path, format, sink_args
+):
+    """
+    Without partitioning, sink_draws() should write a single file
+    that reads back as the output of gather_draws().
+    """
+    path = tmp_path / f"draws.{format}"
+    sink_draws(eight_schools_data, path, format=format, **sink_args)
+    sink_args.pop("max_rows", None)
+    assert_frame_equal(
+        scanners[format](path).collect(),
+        gather_draws(eight_schools_data, **sink_args),
+    )
+
+
+@pytest.mark.parametrize("format", ["parquet", "ipc"])
+@pytest.mark.parametrize(
+    ["partition_by", "expected_dirs"],
+    [
+        [
+            "variable",
+            {f"variable={v}" for v in ["mu", "tau", "theta", "theta_t"]},
+        ],
+        [["chain"], {f"chain={i}" for i in range(4)}],
+        [
+            ["variable", "chain"],
+            {f"variable={v}" for v in ["mu", "tau", "theta", "theta_t"]},
+        ],
+    ],
+)
+@pytest.mark.parametrize("combined", [True, False])
+def test_sink_draws_partitioned(
+    eight_schools_data, tmp_path, format, partition_by, expected_dirs, combined
+):
+    """
+    Partitioned output should be laid out Hive-style and read
+    back with the schema and rows of gather_draws().
+    """
+    sink_draws(
+        eight_schools_data,
+        tmp_path,
+        combined=combined,
+        format=format,
+        partition_by=partition_by,
+        max_rows=2000,
+    )
+    assert {x.name for x in tmp_path.iterdir()} == expected_dirs
+    expected = gather_draws(eight_schools_data, combined=combined)
+    result = scanners[format](tmp_path, hive_partitioning=True).collect()
+    assert result.schema == expected.schema
+    assert_frame_equal(result, expected, check_row_order=False)
+
+
+def test_sink_draws_row_group_size(eight_schools_data, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "draws.parquet"
+    sink_draws(eight_schools_data, path, var_names=["mu"], row_group_size=500)
+    assert pq.ParquetFile(path).num_row_groups == 4
+
+
+def test_sink_draws_errors(eight_schools_data, tmp_path):
+    with pytest.raises(ValueError, match="Unknown format 'csv'"):
+        sink_draws(eight_schools_data, tmp_path / "x", format="csv")
+    with pytest.raises(
+        ValueError, match="only supported for format='parquet'"
+    ):
+        sink_draws(
+            eight_schools_data, tmp_path / "x", format="ipc", row_group_size=5
+        )
+    with pytest.raises(ValueError, match=r"Cannot partition by \['school'\]"):
+        sink_draws(eight_schools_data, tmp_path, partition_by="school")
+    (tmp_path / "stale.parquet").touch()
+    with pytest.raises(FileExistsError, match="non-empty directory"):
+        sink_draws(eight_schools_data, tmp_path, partition_by="variable")
+
+
+@pytest.mark.parametrize("partition_by", [None, "variable"])
+def test_sink_draws_no_draws(
+    eight_schools_data, tmp_path, monkeypatch, partition_by
+):
+    path = tmp_path / "out"
+    with pytest.raises(ValueError, match="No variables to gather"):
+        sink_draws(
+            eight_schools_data,
+            path,
+            combined=False,
+            var_names=["zzz"],
+            filter_vars="like",
+            partition_by=partition_by,
+        )
+    monkeypatch.setattr(
+        "polarbayes.sink.iter_gather_draws", lambda *args, **kwargs: iter([])
+    )
+    with pytest.raises(ValueError, match="No draws to write"):
+        sink_draws(eight_schools_data, path, partition_by=partition_by)
+    assert not path.exists()
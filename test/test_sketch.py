@@ -0,0 +1,123 @@
+import pickle
+
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from polarbayes import (
+    QuantileSketch,
+    gather_draws,
+    iter_gather_draws,
+    median_qi,
+)
+
+
+@pytest.fixture(scope="module")
+def skewed_draws():
+    rng = np.random.default_rng(725)
+    n = 64_000
+    return pl.DataFrame(
+        dict(
+            chain=np.repeat(np.arange(16), n // 16),
+            g=rng.choice(["a", "b", None], n),
+            value=rng.standard_exponential(n) * rng.integers(1, 4, n),
+        )
+    )
+
+
+def _rank_errors(draws: pl.DataFrame, quantiles: pl.DataFrame) -> np.ndarray:
+    errors = []
+    for row in quantiles.iter_rows(named=True):
+        values = np.sort(
+            draws.filter(pl.col("g").eq_missing(row["g"]))["value"]
+        )
+        below = np.searchsorted(values, row["value"], side="left")
+        above = np.searchsorted(values, row["value"], side="right")
+        # distance from the level to the ranks the estimate spans
+        rank = np.clip(row["quantile"] * len(values), below, above)
+        errors.append(abs(rank / len(values) - row["quantile"]))
+    return np.array(errors)
+
+
+@pytest.mark.parametrize("size", [50, 200])
+def test_quantile_sketch_error_bound(skewed_draws, size):
+    sketch = QuantileSketch(size=size)
+    for batch in skewed_draws.partition_by("chain"):
+        sketch.update(batch)
+    levels = [0, 0.025, 0.1, 0.5, 0.9, 0.975, 1]
+    quantiles = sketch.quantile(levels)
+    assert quantiles.columns == ["g", "quantile", "value"]
+    assert quantiles.height == 3 * len(levels)
+    bound = (2 + np.log2(16)) / size
+    assert _rank_errors(skewed_draws, quantiles).max() <= bound
+
+
+def test_quantile_sketch_merge(skewed_draws):
+    """
+    Sketches of disjoint batches, e.g. built by different workers,
+    should merge into a sketch as accurate as a single one.
+    """
+    batches = skewed_draws.partition_by("chain")
+    first, second = QuantileSketch(size=100), QuantileSketch(size=100)
+    for i, batch in enumerate(batches):
+        (first if i % 3 else second).update(batch)
+    merged = first.merge(pickle.loads(pickle.dumps(second)))
+    assert merged.n_batches == 16
+    quantiles = merged.quantile([0.05, 0.5, 0.95])
+    assert _rank_errors(skewed_draws, quantiles).max() <= 6 / 100
+
+
+def test_quantile_sketch_point_interval(eight_schools_data):
+    sketch = QuantileSketch()
+    for batch in iter_gather_draws(eight_schools_data, by="chain"):
+        sketch.update(batch.lazy())
+    summary = sketch.point_interval(point=["median", "mean"], width=[0.5, 0.9])
+    exact = median_qi(
+        gather_draws(eight_schools_data),
+        width=[0.5, 0.9],
+    )
+    assert summary.columns == exact.columns
+    assert summary.height == 2 * exact.height
+    medians = summary.filter(point="median").sort(
+        "variable", "school", "width"
+    )
+    exact = exact.sort("variable", "school", "width")
+    assert_frame_equal(
+        medians.select("variable", "school", "width", "point", "interval"),
+        exact.select("variable", "school", "width", "point", "interval"),
+    )
+    np.testing.assert_allclose(medians["lower"], exact["lower"], rtol=0.2)
+    np.testing.assert_allclose(medians["upper"], exact["upper"], rtol=0.2)
+    # means are exact
+    means = summary.filter(point="mean", width=0.5).sort("variable", "school")
+    expected = (
+        gather_draws(eight_schools_data)
+        .group_by("variable", "school")
+        .agg(pl.col("value").mean())
+        .sort("variable", "school")
+    )
+    np.testing.assert_allclose(means["value"], expected["value"])
+
+
+def test_quantile_sketch_without_groups():
+    sketch = QuantileSketch(by=[], size=10)
+    sketch.update(pl.DataFrame(dict(value=np.arange(101.0))))
+    sketch.update(pl.DataFrame(dict(value=[None, 101.0])))
+    assert sketch.quantile([0, 1])["value"].to_list() == [0.0, 101.0]
+    assert sketch.median_qi(width=0.5).height == 1
+
+
+def test_quantile_sketch_invalid():
+    with pytest.raises(ValueError, match="positive integer"):
+        QuantileSketch(size=0)
+    sketch = QuantileSketch()
+    with pytest.raises(ValueError, match="does not summarize any draws"):
+        sketch.quantile(0.5)
+    sketch.update(pl.DataFrame(dict(variable=["x"], value=[1.0])))
+    with pytest.raises(ValueError, match="between 0 and 1, not 2"):
+        sketch.quantile([0.5, 2])
+    with pytest.raises(ValueError, match="Unknown point estimate 'mode'"):
+        sketch.point_interval(point="mode")
+    with pytest.raises(ValueError, match="different value columns or sizes"):
+        sketch.merge(QuantileSketch(size=10))
@@ -4,6 +4,7 @@ import pytest
 import pandas as pd
 import polars as pl
 import polars.selectors as cs
+from polars.testing import assert_frame_equal
 
 from polarbayes.schema import order_index_column_names, CHAIN_NAME, DRAW_NAME
 
@@ -11,11 +12,12 @@ from polarbayes.spread import (
     spread_draws_to_pandas_,
     spread_draws,
     spread_draws_and_get_index_cols,
+    spread_draws_by_dims,
+    join_spread_draws,
 )
 
 eight_schools_data = az.load_arviz_data("non_centered_eight")
 
-
 spread_args_and_random_seeds = [
     [dict(var_names=["mu", "theta_t"]), None],
     [dict(num_samples=4), 42],
@@ -136,3 +138,92 @@ def test_spread_wraps_spread_with_index(spread_args, random_seed):
     assert result.equals(result_no_index)
     for col in index:
         assert col in result_no_index.columns
+
+
+@pytest.mark.parametrize(
+    ["data", "spread_args", "random_seed"],
+    [["eight_schools_data", *args] for args in spread_args_and_random_seeds]
+    + [
+        ["irregular_data", dict(), None],
+        ["irregular_data", dict(combined=False), None],
+        ["labelled_irregular_data", dict(), None],
+        ["labelled_irregular_data", dict(var_names=["c"]), None],
+        ["categorical_data", dict(), None],
+        ["categorical_data", dict(num_samples=4), 9],
+    ],
+)
+def test_spread_engines_agree(data, spread_args, random_seed, request):
+    """
+    The native engine should reproduce the pandas engine exactly,
+    including row order, column order and dtypes, for datasets with
+    transposed variables, dimensions without coordinates,
+    non-index coordinates and categorical indexes.
+    """
+    data = request.getfixturevalue(data)
+    random_seed_native, random_seed_pandas = get_n_identical_rngs(
+        random_seed, 2
+    )
+    native, native_index = spread_draws_and_get_index_cols(
+        data, **spread_args, random_seed=random_seed_native, engine="native"
+    )
+    pandas, pandas_index = spread_draws_and_get_index_cols(
+        data, **spread_args, random_seed=random_seed_pandas, engine="pandas"
+    )
+    assert native_index == pandas_index
+    assert_frame_equal(native, pandas)
+
+
+def test_spread_unknown_engine():
+    with pytest.raises(ValueError, match="Unknown engine 'arrow'"):
+        spread_draws(eight_schools_data, engine="arrow")
+
+
+@pytest.mark.parametrize(
+    ["data", "spread_args", "expected_keys"],
+    [
+        [
+            "eight_schools_data",
+            dict(),
+            {("chain", "draw"), ("chain", "draw", "school")},
+        ],
+        [
+            "eight_schools_data",
+            dict(var_names=["theta", "theta_t"], combined=False),
+            {("chain", "draw", "school")},
+        ],
+        [
+            "irregular_data",
+            dict(num_samples=3, random_seed=5),
+            {
+                ("chain", "draw"),
+                ("chain", "draw", "k"),
+                ("chain", "draw", "g"),
+            },
+        ],
+    ],
+)
+def test_spread_draws_by_dims(data, spread_args, expected_keys, request):
+    """
+    spread_draws_by_dims() should store each value exactly once,
+    and joining its output should reproduce spread_draws().
+    """
+    data = request.getfixturevalue(data)
+    result = spread_draws_by_dims(data, **spread_args)
+    assert set(result.keys()) == expected_keys
+    extracted = az.extract(data, keep_dataset=True, **spread_args)
+    n_values = sum(
+        df.select(cs.by_name(extracted.data_vars, require_all=False)).width
+        * df.height
+        for df in result.values()
+    )
+    assert n_values == sum(v.size for v in extracted.data_vars.values())
+    for index, df in result.items():
+        assert df.columns[: len(index)] == list(index)
+        assert df.select(index).is_unique().all()
+
+    assert_frame_equal(
+        join_spread_draws(result).collect(),
+        spread_draws(data, **spread_args),
+        check_row_order=False,
+        check_column_order=False,
+    )
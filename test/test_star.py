@@ -0,0 +1,119 @@
+import numpy as np
+import polars as pl
+import pytest
+import xarray as xr
+from polars.testing import assert_frame_equal
+
+from polarbayes import gather_draws, gather_draws_star
+
+
+@pytest.mark.parametrize("combined", [True, False])
+@pytest.mark.parametrize(
+    "data_name",
+    [
+        "eight_schools_data",
+        "irregular_data",
+        "labelled_irregular_data",
+        "categorical_data",
+    ],
+)
+def test_labeled_matches_gather_draws(request, data_name, combined):
+    data = request.getfixturevalue(data_name)
+    star = gather_draws_star(data, combined=combined)
+    assert_frame_equal(
+        star.labeled().collect(), gather_draws(data, combined=combined)
+    )
+
+
+def test_facts_are_numeric(eight_schools_data):
+    star = gather_draws_star(
+        eight_schools_data,
+        var_names=["mu", "theta"],
+        variable_name="param",
+        value_name="x",
+    )
+    assert star.facts.columns == [
+        "chain",
+        "draw",
+        "school_id",
+        "param_id",
+        "x",
+    ]
+    assert all(dtype.is_numeric() for dtype in star.facts.dtypes)
+    assert star.facts["school_id"].dtype == pl.UInt8
+    assert star.facts.height == 9 * 2000
+    # rows of the scalar variable are not indexed by school
+    assert star.facts["school_id"].null_count() == 2000
+    assert_frame_equal(
+        star.lookups["param_id"],
+        pl.DataFrame(
+            {"param_id": [0, 1], "param": ["mu", "theta"]},
+            schema_overrides={"param_id": pl.UInt8},
+        ),
+    )
+    school = eight_schools_data.posterior["school"].values.tolist()
+    assert star.lookups["school_id"]["school"].to_list() == school
+    assert_frame_equal(
+        star.labeled().collect(),
+        gather_draws(
+            eight_schools_data,
+            var_names=["mu", "theta"],
+            variable_name="param",
+            value_name="x",
+        ),
+    )
+
+
+def test_subsampled(eight_schools_data):
+    kwargs = dict(num_samples=50, random_seed=4)
+    assert_frame_equal(
+        gather_draws_star(eight_schools_data, **kwargs).labeled().collect(),
+        gather_draws(eight_schools_data, **kwargs),
+    )
+
+
+def test_multiindex_dimension_shares_one_id():
+    rng = np.random.default_rng(11)
+    posterior = xr.Dataset(
+        {"y": (("chain", "draw", "cell"), rng.random((2, 3, 4)))},
+        coords=dict(chain=[0, 1], draw=[0, 1, 2]),
+    ).assign_coords(
+        xr.Coordinates.from_pandas_multiindex(
+            xr.Dataset(
+                coords=dict(
+                    row=("cell", [0, 0, 1, 1]), col=("cell", list("abab"))
+                )
+            )
+            .set_index(cell=["row", "col"])
+            .indexes["cell"],
+            "cell",
+        )
+    )
+    data = xr.DataTree.from_dict({"posterior": posterior})
+    star = gather_draws_star(data, combined=False)
+    assert star.facts.columns == [
+        "chain",
+        "draw",
+        "cell_id",
+        "variable_id",
+        "value",
+    ]
+    assert star.lookups["cell_id"].columns == ["cell_id", "col", "row"]
+    assert_frame_equal(
+        star.labeled().collect(), gather_draws(data, combined=False)
+    )
+
+
+def test_id_name_clash():
+    data = xr.DataTree.from_dict(
+        {
+            "posterior": xr.Dataset(
+                {
+                    "a": (("chain", "draw", "k"), np.zeros((1, 2, 3))),
+                    "b": (("chain", "draw", "k_id"), np.zeros((1, 2, 2))),
+                }
+            )
+        }
+    )
+    with pytest.raises(ValueError, match="k_id"):
+        gather_draws_star(data)
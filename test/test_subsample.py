@@ -0,0 +1,78 @@
+import arviz_base as az
+import numpy as np
+import polars as pl
+import pytest
+import xarray as xr
+from polars.testing import assert_frame_equal
+
+from polarbayes import gather_draws, spread_draws, subsample_draws
+from polarbayes.subsample import _extract
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        dict(num_samples=25, random_seed=5),
+        dict(num_samples=1, random_seed=0, var_names=["mu"]),
+        dict(num_samples=2000, random_seed=1, keep_dataset=True),
+        dict(num_samples=10, random_seed=2, combined=False, var_names="mu"),
+        dict(var_names=["theta"], keep_dataset=True),
+    ],
+)
+def test_extract_matches_arviz(eight_schools_data, kwargs):
+    if not kwargs.get("combined", True):
+        with pytest.raises(ValueError):
+            _extract(eight_schools_data, **kwargs)
+        return
+    xr.testing.assert_identical(
+        _extract(eight_schools_data, **kwargs),
+        az.extract(eight_schools_data, **kwargs),
+    )
+
+
+def test_extract_generator_seed(eight_schools_data):
+    seeds = [np.random.default_rng(3) for _ in range(2)]
+    for _ in range(2):
+        # the generators advance identically
+        xr.testing.assert_identical(
+            _extract(eight_schools_data, num_samples=5, random_seed=seeds[0]),
+            az.extract(
+                eight_schools_data, num_samples=5, random_seed=seeds[1]
+            ),
+        )
+
+
+def test_subsample_draws(eight_schools_data):
+    draws = gather_draws(eight_schools_data)
+    subsample = subsample_draws(draws, 50, random_seed=4)
+    # the same 50 samples for every variable cell
+    assert subsample.height == 50 * 18
+    assert (subsample.group_by("variable", "school").len()["len"] == 50).all()
+    # the same samples as subsampling during conversion
+    expected = spread_draws(
+        eight_schools_data, var_names=["mu"], num_samples=50, random_seed=4
+    )
+    assert_frame_equal(
+        subsample.select("chain", "draw").unique().sort(pl.all()),
+        expected.select("chain", "draw").sort(pl.all()),
+    )
+    # rows keep their order
+    assert_frame_equal(
+        subsample,
+        draws.filter(
+            pl.struct("chain", "draw").is_in(
+                subsample.select(pl.struct("chain", "draw")).to_series()
+            )
+        ),
+    )
+
+
+def test_subsample_draws_lazy(eight_schools_data):
+    draws = spread_draws(eight_schools_data)
+    lazy = subsample_draws(draws.lazy(), 10, random_seed=0)
+    assert isinstance(lazy, pl.LazyFrame)
+    assert_frame_equal(
+        lazy.collect(), subsample_draws(draws, 10, random_seed=0)
+    )
+    with pytest.raises(ValueError, match="Cannot select"):
+        subsample_draws(draws, 2001)
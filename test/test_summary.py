@@ -0,0 +1,129 @@
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+from polarbayes import (
+    gather_draws,
+    mean_hdi,
+    median_qi,
+    point_interval,
+    spread_draws,
+)
+
+
+def _hdi(x: np.ndarray, width: float) -> tuple[float, float]:
+    x = np.sort(x)
+    span = int(np.floor(width * len(x)))
+    start = np.argmin(x[span:] - x[: len(x) - span])
+    return x[start], x[start + span]
+
+
+def test_median_qi_gathered_draws(eight_schools_data):
+    draws = gather_draws(eight_schools_data)
+    summary = median_qi(draws, width=[0.5, 0.9])
+    assert summary.columns == [
+        "school",
+        "variable",
+        "value",
+        "lower",
+        "upper",
+        "width",
+        "point",
+        "interval",
+    ]
+    # one row per cell and width
+    assert summary.height == 2 * 18
+    theta = eight_schools_data.posterior["theta"].sel(school="Choate").values
+    row = summary.filter(
+        variable="theta", school="Choate", width=0.9
+    ).to_dicts()[0]
+    assert row["value"] == pytest.approx(np.median(theta))
+    assert row["lower"] == pytest.approx(np.quantile(theta, 0.05))
+    assert row["upper"] == pytest.approx(np.quantile(theta, 0.95))
+    assert (row["point"], row["interval"]) == ("median", "qi")
+
+
+def test_mean_hdi_spread_draws(eight_schools_data):
+    draws = spread_draws(eight_schools_data, var_names=["mu", "theta"])
+    summary = mean_hdi(draws, width=0.8)
+    assert summary.columns == [
+        "school",
+        "mu",
+        "theta",
+        "mu_lower",
+        "mu_upper",
+        "theta_lower",
+        "theta_upper",
+        "width",
+        "point",
+        "interval",
+    ]
+    theta = eight_schools_data.posterior["theta"]
+    for row in summary.iter_rows(named=True):
+        values = theta.sel(school=row["school"]).values.ravel()
+        assert row["theta"] == pytest.approx(values.mean())
+        assert (row["theta_lower"], row["theta_upper"]) == pytest.approx(
+            _hdi(values, 0.8)
+        )
+
+
+def test_point_interval_combinations(eight_schools_data):
+    draws = gather_draws(eight_schools_data, var_names=["mu", "tau"])
+    summary = point_interval(
+        draws,
+        point=["mean", "median"],
+        interval=["qi", "hdi"],
+        width=[0.5, 0.95],
+    )
+    assert summary.height == 2 * 2 * 2 * 2
+    assert summary.select("width", "point", "interval").unique().height == 8
+    # each combination matches the summary computed on its own
+    for combination in summary.partition_by("width", "point", "interval"):
+        (width,), (point,), (interval,) = combination.select(
+            "width", "point", "interval"
+        ).unique()
+        assert_frame_equal(
+            combination,
+            point_interval(draws, point=point, interval=interval, width=width),
+        )
+
+
+def test_point_interval_lazy_streaming(eight_schools_data):
+    draws = gather_draws(eight_schools_data)
+    summary = point_interval(draws.lazy(), interval=["qi", "hdi"])
+    assert isinstance(summary, pl.LazyFrame)
+    assert_frame_equal(
+        summary.collect(engine="streaming"),
+        point_interval(draws, interval=["qi", "hdi"]),
+    )
+
+
+def test_point_interval_columns_and_by(eight_schools_data):
+    draws = spread_draws(eight_schools_data, var_names=["mu", "theta"])
+    summary = point_interval(draws, columns="mu", by=[])
+    assert summary.columns == [
+        "mu",
+        "mu_lower",
+        "mu_upper",
+        "width",
+        "point",
+        "interval",
+    ]
+    assert summary.height == 1
+    by_chain = point_interval(draws, columns=["theta"], by=["chain"])
+    assert by_chain["chain"].to_list() == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize(
+    "kwargs, match",
+    [
+        (dict(point="mode"), "Unknown point estimate 'mode'"),
+        (dict(interval="eti"), "Unknown interval 'eti'"),
+        (dict(width=[0.5, 95]), "between 0 and 1, not 95"),
+    ],
+)
+def test_point_interval_invalid(eight_schools_data, kwargs, match):
+    draws = gather_draws(eight_schools_data, var_names=["mu"])
+    with pytest.raises(ValueError, match=match):
+        point_interval(draws, **kwargs)